@@ -0,0 +1,9 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty
+
+"""
+Performance benchmarks against a local stand-in for PyPI and Repology.
+
+Run ``python -m benchmarks --help`` from the source tree.
+"""
@@ -0,0 +1,380 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty
+
+"""
+Benchmark runner.
+
+Each benchmark builds a dependency graph served by a local stand-in server.
+The graph is built in a subprocess, so that peak memory usage is measured
+without the server.
+
+Results are stored as JSON Lines, one record per run:
+
+.. code-block:: console
+
+    $ python -m benchmarks run -o before.jsonl
+    $ git checkout feature
+    $ python -m benchmarks run -o after.jsonl
+    $ python -m benchmarks compare before.jsonl after.jsonl
+"""
+
+import asyncio
+import json
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, TextIO
+
+import aiohttp
+import click
+
+from benchmarks.server import GraphSpec, SyntheticRegistry, package_name, serve
+
+#: Graph sizes measured by default.
+DEFAULT_SIZES = (100, 1_000, 10_000, 50_000)
+
+#: Compared metrics and whether higher values are better.
+METRICS = {
+    "nodes_per_second": True,
+    "latency_p99": False,
+    "peak_rss": False,
+    "requests": False,
+}
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """
+    Nearest-rank percentile.
+
+    >>> percentile([1, 2, 3, 4, 5, 6, 7, 8, 9, 10], 90)
+    9
+    >>> percentile([], 50)
+    0.0
+    """
+
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, -(-len(ordered) * q // 100) - 1))
+    return ordered[int(rank)]
+
+
+def latency_trace_config(latencies: list[float]) -> aiohttp.TraceConfig:
+    """
+    :param latencies: list to append request durations in seconds to
+
+    :returns: request tracing callbacks
+    """
+
+    async def on_request_start(session: aiohttp.ClientSession,
+                               ctx: SimpleNamespace,
+                               params: aiohttp.TraceRequestStartParams) -> None:
+        ctx.start = time.perf_counter()
+
+    async def on_request_done(session: aiohttp.ClientSession,
+                              ctx: SimpleNamespace, params: Any) -> None:
+        latencies.append(time.perf_counter() - ctx.start)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_done)
+    trace_config.on_request_exception.append(on_request_done)
+    return trace_config
+
+
+def connection_trace_config(counts: Counter[str]) -> aiohttp.TraceConfig:
+    """
+    :param counts: counter of created connections, increased under the
+        ``connections`` key
+
+    :returns: connection tracing callbacks
+    """
+
+    async def on_connection_create_end(session: aiohttp.ClientSession,
+                                       ctx: SimpleNamespace, params: Any) -> None:
+        counts["connections"] += 1
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    return trace_config
+
+
+async def build_graph(url: str, mapped: bool, mode: str, workers: int,
+                      parse_pool: str) -> dict[str, Any]:
+    """
+    Build the dependency graph of the synthetic root package.
+
+    :param url: stand-in server URL
+    :param mapped: whether to map packages with the Repology plug-in
+    :param mode: graph traversal strategy
+    :param workers: number of workers in the level mode
+    :param parse_pool: where PyPI metadata is parsed
+
+    :returns: measurements
+    """
+
+    import repology_client._client.tools
+
+    from how_much_work.app.__main__ import get_plugin_manager
+    from how_much_work.app.depgraph.builder import CrawlMode, DependencyGraph
+    from how_much_work.core.metrics import metrics
+    from how_much_work.core.types import Package
+    from how_much_work.core.utils import aiohttp_session
+    from how_much_work.plugins.pypi.options import ParsePool, plugin_options
+    from how_much_work.plugins.repology.distromap import make_distromap_func
+    from how_much_work.plugins.repology.resolver import Resolver
+
+    plugin_options.index_url = url
+    plugin_options.cache = False
+    plugin_options.parse_pool = ParsePool(parse_pool)
+
+    distromap = None
+    if mapped:
+        # repology-client has no way to change the server URL.
+        repology_client._client.tools.TOOL_PROJECT_BY_URL = f"{url}/tools/project-by"
+        distromap = make_distromap_func(Resolver(), "pypi", ["gentoo"])
+
+    latencies: list[float] = []
+    counts: Counter[str] = Counter()
+    trace_configs = [latency_trace_config(latencies), connection_trace_config(counts)]
+    async with (
+        metrics.monitor_loop_lag(),
+        aiohttp_session(trace_configs=trace_configs) as session,
+    ):
+        builder = DependencyGraph(get_plugin_manager(), aiohttp_session=session,
+                                  pkg_distromap=distromap, mode=CrawlMode(mode),
+                                  workers=workers)
+        start = time.perf_counter()
+        await builder.add_depgraphs([Package(name=package_name(0), repo_name="pypi")])
+        seconds = time.perf_counter() - start
+
+    loop_lag = next(hist for hist in metrics.to_json()["histograms"]
+                    if hist["name"] == "event_loop_lag_seconds")
+
+    graph = builder.graph
+    return {
+        "nodes": graph.number_of_nodes(),
+        "edges": graph.number_of_edges(),
+        "seconds": seconds,
+        "nodes_per_second": graph.number_of_nodes() / seconds,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p90": percentile(latencies, 90),
+        "latency_p99": percentile(latencies, 99),
+        "latency_max": max(latencies, default=0.0),
+        "connections": counts["connections"],
+        # Upper bounds of histogram buckets.
+        "loop_lag_p50": loop_lag["p50"],
+        "loop_lag_p99": loop_lag["p99"],
+        # Kilobytes on Linux.
+        "peak_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    }
+
+
+async def run_benchmark(spec: GraphSpec, mode: str, workers: int,
+                        parse_pool: str) -> dict[str, Any]:
+    """
+    Serve a synthetic graph and build it in a subprocess.
+
+    :param spec: graph and server parameters
+    :param mode: graph traversal strategy
+    :param workers: number of workers in the level mode
+    :param parse_pool: where PyPI metadata is parsed
+
+    :returns: result record
+    """
+
+    registry = SyntheticRegistry(spec)
+    async with serve(registry) as url:
+        args = ["--url", url, "--mode", mode, "--workers", str(workers),
+                "--parse-pool", parse_pool]
+        if spec.mapped > 0:
+            args.append("--mapped")
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "benchmarks", "client", *args,
+            stdout=asyncio.subprocess.PIPE
+        )
+        stdout, _ = await proc.communicate()
+        if proc.returncode != 0:
+            raise click.ClickException(f"Benchmark client failed: {spec}")
+
+    result = json.loads(stdout)
+    result["requests"] = sum(count for endpoint, count in registry.requests.items()
+                             if endpoint != "error")
+    result["requests_by_endpoint"] = dict(registry.requests)
+    # Keep scenarios comparable with results recorded before padded
+    # releases and parse pools existed.
+    scenario = spec.model_dump(exclude={"releases_size"} if not spec.releases_size else None)
+    scenario |= {"mode": mode, "workers": workers}
+    if parse_pool != "inline":
+        scenario["parse_pool"] = parse_pool
+    return {"scenario": scenario, "result": result}
+
+
+def get_revision() -> str | None:
+    """
+    :returns: current Git revision of the source tree, if known
+    """
+
+    try:
+        proc = subprocess.run(["git", "describe", "--always", "--dirty"],
+                              capture_output=True, text=True, check=True,
+                              cwd=Path(__file__).parent)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return proc.stdout.strip()
+
+
+def scenario_key(record: dict[str, Any]) -> str:
+    return json.dumps(record["scenario"], sort_keys=True)
+
+
+def load_results(file: TextIO) -> dict[str, dict[str, float]]:
+    """
+    Read results and take the median of repeated runs.
+
+    :returns: metrics by scenario key
+    """
+
+    runs: dict[str, list[dict[str, Any]]] = {}
+    for line in file:
+        if line.strip():
+            record = json.loads(line)
+            runs.setdefault(scenario_key(record), []).append(record["result"])
+
+    return {
+        key: {metric: statistics.median(result[metric] for result in results)
+              for metric in METRICS}
+        for key, results in runs.items()
+    }
+
+
+def format_scenario(key: str) -> str:
+    scenario = json.loads(key)
+    return " ".join(f"{name}={value}" for name, value in scenario.items())
+
+
+@click.group(context_settings={"help_option_names": ["-h", "--help"]})
+def cli() -> None:
+    """
+    Benchmark how-much-work against a local stand-in server.
+    """
+
+
+@click.option("-s", "--size", "sizes", type=click.IntRange(min=1), multiple=True,
+              default=DEFAULT_SIZES, show_default=True,
+              help="Number of packages in the graph (repeatable).")
+@click.option("--fanout", type=click.IntRange(min=1), default=4, show_default=True,
+              help="Number of new packages each package depends on.")
+@click.option("--shared", type=click.IntRange(min=0), default=2, show_default=True,
+              help="Number of additional dependencies on existing packages.")
+@click.option("--extras-density", type=click.FloatRange(0, 1), default=0.1,
+              show_default=True,
+              help="Share of dependencies using optional features.")
+@click.option("--mapped", type=click.FloatRange(0, 1), default=0.0, show_default=True,
+              help="Share of packages mapped to another repository on Repology.")
+@click.option("--latency", type=click.FloatRange(min=0), default=0.0, show_default=True,
+              help="Mean server response delay in seconds.")
+@click.option("--error-rate", type=click.FloatRange(0, 1), default=0.0,
+              show_default=True,
+              help="Share of requests failing with a server error.")
+@click.option("--releases-size", type=click.IntRange(min=0), default=0,
+              show_default=True,
+              help="Size in bytes of release information in PyPI responses.")
+@click.option("--seed", type=int, default=0, show_default=True,
+              help="Random seed for graph generation and server behavior.")
+@click.option("-m", "--mode", type=click.Choice(["recursive", "level"]),
+              default="recursive", show_default=True,
+              help="Graph traversal strategy.")
+@click.option("-w", "--workers", type=click.IntRange(min=1), default=16,
+              show_default=True, help="Number of workers in the 'level' mode.")
+@click.option("--parse-pool", type=click.Choice(["inline", "thread", "process"]),
+              default="inline", show_default=True,
+              help="Where PyPI metadata is parsed.")
+@click.option("-n", "--repeat", type=click.IntRange(min=1), default=1,
+              show_default=True, help="Number of runs of each benchmark.")
+@click.option("-o", "--output", type=click.File("a"), default="-",
+              help="Append results to this JSON Lines file.")
+@cli.command()
+def run(sizes: Iterable[int], output: TextIO, mode: str, workers: int,
+        parse_pool: str, repeat: int, **params: Any) -> None:
+    """
+    Run benchmarks and record results.
+    """
+
+    revision = get_revision()
+    for size in sizes:
+        spec = GraphSpec(size=size, **params)
+        for _ in range(repeat):
+            record = asyncio.run(run_benchmark(spec, mode, workers, parse_pool))
+            record |= {"revision": revision, "timestamp": time.time(),
+                       "python": platform.python_version()}
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+
+            result = record["result"]
+            click.echo(f"size={size}: {result['nodes']} nodes in "
+                       f"{result['seconds']:.2f}s, {result['requests']} requests, "
+                       f"{result['connections']} connections, "
+                       f"p99 {result['latency_p99'] * 1000:.1f}ms, "
+                       f"loop lag p99 {result['loop_lag_p99'] * 1000:.1f}ms, "
+                       f"peak RSS {result['peak_rss'] / 2**20:.0f} MiB", err=True)
+
+
+@click.option("--url", required=True)
+@click.option("--mapped", is_flag=True)
+@click.option("--mode", default="recursive")
+@click.option("--workers", type=int, default=16)
+@click.option("--parse-pool", default="inline")
+@cli.command(hidden=True)
+def client(url: str, mapped: bool, mode: str, workers: int, parse_pool: str) -> None:
+    """
+    Build the graph and print measurements as JSON.
+    """
+
+    click.echo(json.dumps(asyncio.run(build_graph(url, mapped, mode, workers,
+                                                  parse_pool))))
+
+
+@click.argument("new", type=click.File())
+@click.argument("old", type=click.File())
+@click.option("-t", "--threshold", type=click.FloatRange(min=0), default=0.1,
+              show_default=True,
+              help="Relative change of a metric considered a regression.")
+@cli.command()
+def compare(old: TextIO, new: TextIO, threshold: float) -> None:
+    """
+    Compare two result files.
+
+    Exits with a non-zero status if any metric regressed by more than the
+    threshold.
+    """
+
+    old_results = load_results(old)
+    new_results = load_results(new)
+
+    regressions = 0
+    for key in old_results.keys() & new_results.keys():
+        click.echo(format_scenario(key))
+        for metric, higher_is_better in METRICS.items():
+            before = old_results[key][metric]
+            after = new_results[key][metric]
+            change = (after - before) / before if before else 0.0
+            regressed = (-change if higher_is_better else change) > threshold
+            regressions += regressed
+            click.echo(f"  {metric:<18} {before:>14.4g} -> {after:<14.4g} "
+                       f"{change:+.1%}{'  REGRESSION' if regressed else ''}")
+
+    if regressions != 0:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    cli()
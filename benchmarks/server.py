@@ -0,0 +1,184 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty
+
+"""
+Local HTTP server serving synthetic dependency graphs.
+"""
+
+import asyncio
+import random
+from collections import Counter
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+
+from aiohttp import web
+from pydantic import BaseModel, ConfigDict, Field
+
+#: Name of the optional dependency group of synthetic packages.
+EXTRA_NAME = "feat"
+
+
+class GraphSpec(BaseModel):
+    """
+    Shape of a synthetic dependency graph and behavior of the server.
+    """
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
+    #: Number of packages reachable from the root package.
+    size: int = Field(gt=0)
+
+    #: Number of packages each package adds to the graph.
+    fanout: int = Field(default=4, gt=0)
+
+    #: Number of additional dependencies on already existing packages.
+    shared: int = Field(default=2, ge=0)
+
+    #: Share of dependencies requesting or defining optional features.
+    extras_density: float = Field(default=0.1, ge=0, le=1)
+
+    #: Share of packages found in the target repository on Repology.
+    mapped: float = Field(default=0.0, ge=0, le=1)
+
+    #: Mean response delay in seconds, exponentially distributed.
+    latency: float = Field(default=0.0, ge=0)
+
+    #: Share of requests failing with "503 Service Unavailable".
+    error_rate: float = Field(default=0.0, ge=0, le=1)
+
+    #: Size in bytes of release information in PyPI responses.
+    releases_size: int = Field(default=0, ge=0)
+
+    #: Random seed, graphs with the same parameters and seed are identical.
+    seed: int = 0
+
+
+def package_name(index: int) -> str:
+    """
+    >>> package_name(42)
+    'pkg-42'
+    """
+
+    return f"pkg-{index}"
+
+
+class SyntheticRegistry:
+    """
+    Stand-in for the PyPI JSON API and the Repology "project by" tool.
+
+    Package ``pkg-0`` is the root, and every package is reachable from it.
+    Requests for the root never fail, so that the graph is always built.
+    Requests are counted by endpoint.
+    """
+
+    def __init__(self, spec: GraphSpec):
+        """
+        :param spec: graph and server parameters
+        """
+
+        self.spec = spec
+
+        #: Number of handled requests by endpoint, failed ones are counted
+        #: under the ``error`` key too.
+        self.requests: Counter[str] = Counter()
+
+        self._random = random.Random(spec.seed)
+        self._requires = [self._make_requires(i) for i in range(spec.size)]
+        self._mapped = [self._random.random() < spec.mapped
+                        for _ in range(spec.size)]
+        self._releases = ({"1.0": [{"comment_text": "x" * spec.releases_size}]}
+                          if spec.releases_size > 0 else {})
+
+    def _make_requires(self, index: int) -> list[str]:
+        spec = self.spec
+        deps = list(range(index * spec.fanout + 1,
+                          min((index + 1) * spec.fanout + 1, spec.size)))
+        if index > 0:
+            deps += self._random.sample(range(index),
+                                        min(spec.shared, index))
+
+        result: list[str] = []
+        for dep in dict.fromkeys(deps):
+            name = package_name(dep)
+            if self._random.random() < spec.extras_density:
+                name += f"[{EXTRA_NAME}]"
+            if self._random.random() < spec.extras_density:
+                name += f'; extra == "{EXTRA_NAME}"'
+            result.append(name)
+        return result
+
+    def requires_dist(self, name: str) -> list[str] | None:
+        """
+        :param name: package name
+
+        :returns: dependencies of a package or ``None`` if it doesn't exist
+        """
+
+        prefix, _, index = name.partition("-")
+        if prefix != "pkg" or not index.isdecimal() or int(index) >= self.spec.size:
+            return None
+        return self._requires[int(index)]
+
+    async def _respond(self, endpoint: str, name: str) -> None:
+        self.requests[endpoint] += 1
+        if self.spec.latency > 0:
+            await asyncio.sleep(self._random.expovariate(1 / self.spec.latency))
+        if name != package_name(0) and self._random.random() < self.spec.error_rate:
+            self.requests["error"] += 1
+            raise web.HTTPServiceUnavailable()
+
+    async def pypi_project(self, request: web.Request) -> web.Response:
+        name = request.match_info["name"]
+        await self._respond("pypi", name)
+
+        if (requires_dist := self.requires_dist(name)) is None:
+            raise web.HTTPNotFound()
+        return web.json_response({
+            "info": {"name": name, "requires_dist": requires_dist or None},
+            "releases": self._releases,
+        })
+
+    async def repology_project_by(self, request: web.Request) -> web.Response:
+        name = request.query.get("name", "")
+        await self._respond("repology", name)
+
+        if self.requires_dist(name) is None or not self._mapped[int(name[4:])]:
+            raise web.HTTPNotFound()
+        return web.json_response([
+            {"repo": "pypi", "srcname": name, "visiblename": name,
+             "version": "1.0", "status": "newest"},
+            {"repo": "gentoo", "srcname": f"dev-python/{name}",
+             "visiblename": f"dev-python/{name}", "version": "1.0",
+             "status": "newest"},
+        ])
+
+    def app(self) -> web.Application:
+        """
+        :returns: web application serving both APIs
+        """
+
+        app = web.Application()
+        app.router.add_get("/pypi/{name}/json", self.pypi_project)
+        app.router.add_get("/tools/project-by", self.repology_project_by)
+        return app
+
+
+@asynccontextmanager
+async def serve(registry: SyntheticRegistry) -> AsyncGenerator[str, None]:
+    """
+    Run the server on a random local port.
+
+    :param registry: synthetic registry to serve
+
+    :returns: base URL of the server
+    """
+
+    runner = web.AppRunner(registry.app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0, backlog=1024)
+    await site.start()
+    try:
+        host, port = runner.addresses[0][:2]
+        yield f"http://{host}:{port}"
+    finally:
+        await runner.cleanup()
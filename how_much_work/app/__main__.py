@@ -2,11 +2,13 @@
 # SPDX-FileCopyrightText: 2024-2026 Anna <cyber@sysrq.in>
 # No warranty
 
-import asyncio
 import functools
+import json
 import os
-import tomllib
+import re
+from collections.abc import Iterable, Sequence
 from pathlib import Path
+from typing import TYPE_CHECKING, Any, TextIO
 
 import click
 import pluggy
@@ -19,12 +21,16 @@ from how_much_work.core.constants import (
     PACKAGE,
     VERSION,
 )
-from how_much_work.core.options import MainOptions
 from how_much_work.core.plugin_api import (
     DistromapPluginSpec,
     PackageRegistryPluginSpec,
 )
 
+if TYPE_CHECKING:
+    # Heavy modules are imported by commands to keep startup fast.
+    from how_much_work.core.concurrency import HostLimit
+    from how_much_work.core.options import MainOptions
+
 
 @functools.cache
 def get_plugin_manager() -> pluggy.PluginManager:
@@ -39,6 +45,8 @@ def get_plugin_manager() -> pluggy.PluginManager:
     plugman = pluggy.PluginManager(PACKAGE)
     plugman.add_hookspecs(PackageRegistryPluginSpec)
     plugman.load_setuptools_entrypoints(REGISTRY_PLUGINS_ENTRY_POINT)
+    plugman.add_hookspecs(DistromapPluginSpec)
+    plugman.load_setuptools_entrypoints(DISTROMAP_PLUGINS_ENTRY_POINT)
 
     return plugman
 
@@ -50,6 +58,8 @@ def load_config(basename: str) -> object:
     :returns: parsed config
     """
 
+    import tomllib
+
     path = Path(os.getenv("XDG_CONFIG_HOME", "~/.config")).expanduser()
     path = path / PACKAGE / basename
     if path.is_file():
@@ -58,55 +68,287 @@ def load_config(basename: str) -> object:
     return {}
 
 
+def parse_host_limits(ctx: click.Context, param: click.Option,
+                      value: Sequence[str]) -> dict[str, "HostLimit"]:
+    """
+    Parse ``HOST=INITIAL[,MAXIMUM]`` concurrency limits.
+    """
+    from how_much_work.core.concurrency import HostLimit
+
+    result: dict[str, HostLimit] = {}
+    for spec in value:
+        host, _, limits = spec.partition("=")
+        initial, _, maximum = limits.partition(",")
+        try:
+            result[host] = HostLimit(initial=int(initial),
+                                     maximum=int(maximum or initial))
+        except ValueError as err:
+            raise click.BadParameter(f"invalid limit: {spec}") from err
+    return result
+
+
+def read_package_list(lines: Iterable[str]) -> list[str]:
+    """
+    Extract package names from a requirements-style list.
+
+    Comments, empty lines and option lines are skipped. Version specifiers,
+    extras and environment markers are ignored.
+
+    >>> read_package_list(["# comment", "-r other.txt", "foo>=1.0", "Bar[x]; os_name == 'nt'"])
+    ['foo', 'Bar']
+    """
+
+    result: list[str] = []
+    for line in lines:
+        line = line.partition("#")[0].strip()
+        if not line or line.startswith("-"):
+            continue
+        if (match := re.match(r"[^\s\[\]<>=!~;@(),]+", line)) is not None:
+            result.append(match.group())
+    return result
+
+
+def write_stats(stats_format: str | None, textfile: Path | None) -> None:
+    """
+    Output runtime metrics collected during the run.
+
+    :param stats_format: format of metrics printed to the standard error
+    :param textfile: Prometheus textfile location
+    """
+    from how_much_work.core.metrics import metrics
+
+    if stats_format == "json":
+        click.echo(json.dumps(metrics.to_json(), indent=2), err=True)
+    if textfile is not None:
+        metrics.write_textfile(textfile)
+
+
+def configure_concurrency(options: "MainOptions", config: object) -> None:
+    """
+    Apply concurrency limits from the :file:`config.toml` configuration file.
+    """
+    from pydantic import ValidationError
+
+    from how_much_work.core.concurrency import HostLimit
+
+    if not isinstance(config, dict):
+        return
+
+    concurrency = dict(config.get("concurrency", {}))
+    try:
+        options.host_limits = concurrency.pop("hosts", {})
+        options.host_limit = HostLimit.model_validate(concurrency)
+    except ValidationError as err:
+        raise click.ClickException(f"Invalid concurrency settings: {err}")
+
+
+def configure_retries(config: object, overrides: dict[str, Any]) -> None:
+    """
+    Apply retry settings from the :file:`config.toml` configuration file,
+    overridden by command-line options.
+    """
+    from pydantic import ValidationError
+
+    from how_much_work.core.retry import RetryPolicy, retrier
+
+    settings = {}
+    if isinstance(config, dict):
+        settings = dict(config.get("retry", {}))
+    settings.update({key: value for key, value in overrides.items()
+                     if value is not None})
+    try:
+        retrier.policy = RetryPolicy.model_validate(settings)
+    except ValidationError as err:
+        raise click.ClickException(f"Invalid retry settings: {err}")
+
+
 @click.group(cls=ClickAliasedGroup,
              context_settings={"help_option_names": ["-h", "--help"]})
 @click.option("-r", "--repo", metavar="REPO", required=True,
               help="Repository specification.")
+@click.option("--host-limit", metavar="HOST=N[,MAX]", multiple=True,
+              callback=parse_host_limits,
+              help="Start with N parallel requests to HOST, allowing up to MAX.")
+@click.option("--retries", metavar="N", type=click.IntRange(min=0),
+              help="Retry transient request failures up to N times (default: 2).")
+@click.option("--hedge-quantile", metavar="Q",
+              type=click.FloatRange(0, 1, min_open=True, max_open=True),
+              help="Start a duplicate request when a response takes longer "
+                   "than this quantile of the host's latency (default: "
+                   "disabled).")
+@click.option("--connect-timeout", metavar="SECONDS",
+              type=click.FloatRange(min=0, min_open=True),
+              help="Connection timeout (default: 30).")
+@click.option("--read-timeout", metavar="SECONDS",
+              type=click.FloatRange(min=0, min_open=True),
+              help="Timeout for reading the next part of a response "
+                   "(default: 30).")
+@click.option("--stats", "stats_format", type=click.Choice(["json"]),
+              help="Print runtime metrics to standard error when finished.")
+@click.option("--stats-textfile", metavar="FILE",
+              type=click.Path(dir_okay=False, writable=True, path_type=Path),
+              help="Write runtime metrics to this file in the Prometheus text "
+                   "format when finished.")
 @click.version_option(VERSION, "-V", "--version")
 @click.pass_context
-def cli(ctx: click.Context, repo: str) -> None:
+def cli(ctx: click.Context, repo: str, host_limit: dict[str, "HostLimit"],
+        retries: int | None, hedge_quantile: float | None,
+        connect_timeout: float | None, read_timeout: float | None,
+        stats_format: str | None, stats_textfile: Path | None) -> None:
     """
     Estimate the amount of work needed to package a project.
 
     See `man how-much-work` for the full help.
     """
+    from how_much_work.core.options import MainOptions
 
     ctx.ensure_object(MainOptions)
     options: MainOptions = ctx.obj
 
+    if stats_format is not None or stats_textfile is not None:
+        ctx.call_on_close(functools.partial(write_stats, stats_format,
+                                            stats_textfile))
+
+    config = load_config("config.toml")
+    configure_concurrency(options, config)
+    options.host_limits |= host_limit
+    configure_retries(config, {
+        "attempts": retries + 1 if retries is not None else None,
+        "hedge_quantile": hedge_quantile,
+        "connect_timeout": connect_timeout,
+        "read_timeout": read_timeout,
+    })
+
     from_repo, *to_repo = repo.split(":", maxsplit=1)
     options.from_repo = from_repo
     if len(to_repo) != 0:
         options.to_repo = to_repo[0]
 
         plugman = get_plugin_manager()
-        plugman.add_hookspecs(DistromapPluginSpec)
-        plugman.load_setuptools_entrypoints(DISTROMAP_PLUGINS_ENTRY_POINT)
         plugman.hook.setup_distromap_plugin(
             options=options, config=load_config("distromap.toml")
         )
 
 
-@click.argument("package")
+@click.argument("packages", metavar="[PACKAGE]...", nargs=-1)
+@click.option("-f", "--file", "files", type=click.File(), multiple=True,
+              help="Read package names from a requirements file ('-' for "
+                   "standard input).")
+@click.option("--reachability", type=click.Path(dir_okay=False, writable=True),
+              help="Write packages reachable from each root to this JSON file.")
+@click.option("-F", "--format", "output_format",
+              type=click.Choice(["graphviz", "dot", "jsonl"]), default="graphviz",
+              help="Output format: DOT rendered by Graphviz at the end "
+                   "(graphviz), or DOT and JSON Lines streamed as the graph "
+                   "is built (dot, jsonl). Default: graphviz.")
+@click.option("--since-snapshot", metavar="FILE",
+              type=click.Path(dir_okay=False, path_type=Path),
+              help="Reuse children of packages with unchanged metadata from a "
+                   "saved snapshot, if it exists.")
+@click.option("--save-snapshot", metavar="FILE",
+              type=click.Path(dir_okay=False, writable=True, path_type=Path),
+              help="Save a snapshot of the graph for later incremental "
+                   "rebuilds (can be the same file as --since-snapshot).")
+@click.option("--snapshot-max-age", metavar="SECONDS",
+              type=click.FloatRange(min=0), default=0,
+              help="Reuse snapshot entries without revalidation for this "
+                   "long (default: 0).")
+@click.option("--trace", metavar="FILE",
+              type=click.Path(dir_okay=False, writable=True, path_type=Path),
+              help="Write package processing spans in the Chrome Trace Event "
+                   "format (viewable in Perfetto) and print the critical path "
+                   "to standard error.")
+@click.option("--profile", metavar="FILE", envvar="HOW_MUCH_WORK_PROFILE",
+              type=click.Path(dir_okay=False, writable=True, path_type=Path),
+              help="Profile the command and write results to this file "
+                   "(env: HOW_MUCH_WORK_PROFILE).")
+@click.option("--profile-format", type=click.Choice(["pstats", "collapsed"]),
+              default="pstats", envvar="HOW_MUCH_WORK_PROFILE_FORMAT",
+              help="Profile format: deterministic profile for pstats, or "
+                   "sampled stacks for flame graphs (collapsed). Default: "
+                   "pstats.")
 @click.option("-D", "--max-depth", type=int, default=6,
               help="Maximum depth level (default: 6).")
+@click.option("-m", "--mode", type=click.Choice(["recursive", "level"]),
+              default="recursive",
+              help="Graph traversal strategy (default: recursive).")
+@click.option("-w", "--workers", type=click.IntRange(min=1), default=16,
+              help="Maximum number of packages processed at once in the "
+                   "'level' mode (default: 16).")
 @cli.command(aliases=["dep", "dg", "d"])
 @click.pass_obj
-def depgraph(options: MainOptions, package: str, max_depth: int) -> None:
+def depgraph(options: "MainOptions", packages: tuple[str, ...],
+             files: tuple[TextIO, ...], output_format: str,
+             reachability: str | None,
+             since_snapshot: Path | None, save_snapshot: Path | None,
+             snapshot_max_age: float, trace: Path | None,
+             profile: Path | None, profile_format: str, max_depth: int,
+             mode: str, workers: int) -> None:
     """
-    Compute a dependency graph.
+    Compute a combined dependency graph of one or more packages.
 
-    The result will be printed to the standard output in the DOT format.
+    The result will be printed to the standard output in the DOT format
+    or as JSON Lines.
     """
+    from how_much_work.app.depgraph.builder import CrawlMode
     from how_much_work.app.depgraph.cli import build_depgraph
     from how_much_work.app.depgraph.options import DepgraphOptions
+    from how_much_work.app.depgraph.writers import OutputFormat
+
+    names = list(packages)
+    for file in files:
+        names += read_package_list(file)
+    if not names:
+        raise click.UsageError("No packages specified.")
 
     plugman = get_plugin_manager()
     options.children["depgraph"] = DepgraphOptions(
-        package=package, max_depth=max_depth
+        packages=list(dict.fromkeys(names)), max_depth=max_depth,
+        mode=CrawlMode(mode), workers=workers,
+        output_format=OutputFormat(output_format), reachability=reachability,
+        since_snapshot=since_snapshot, save_snapshot=save_snapshot,
+        snapshot_max_age=snapshot_max_age, trace=trace
     )
 
-    asyncio.run(build_depgraph(plugman, options))
+    if profile is not None:
+        from how_much_work.app.profiling import ProfileFormat, run_profiled
+        run_profiled(build_depgraph(plugman, options), profile,
+                     ProfileFormat(profile_format))
+    else:
+        import asyncio
+        asyncio.run(build_depgraph(plugman, options))
+
+
+@click.option("--host", default="127.0.0.1",
+              help="Address to listen on (default: 127.0.0.1).")
+@click.option("--port", type=click.IntRange(0, 65535), default=8080,
+              help="TCP port to listen on (default: 8080).")
+@click.option("--socket", "socket_path", metavar="PATH",
+              type=click.Path(dir_okay=False, path_type=Path),
+              help="Listen on a Unix socket instead of TCP.")
+@cli.command()
+@click.pass_obj
+def serve(options: "MainOptions", host: str, port: int,
+          socket_path: Path | None) -> None:
+    """
+    Answer dependency graph queries over HTTP.
+
+    Plugins, connections and caches are kept warm between queries, and
+    concurrent queries share in-flight requests. Graphs are returned as
+    JSON by the /depgraph endpoint, for example:
+    /depgraph?package=requests&max_depth=3.
+    """
+    import asyncio
+
+    from how_much_work.app.depgraph.server import run_server
+
+    plugman = get_plugin_manager()
+    try:
+        asyncio.run(run_server(plugman, options, host=host, port=port,
+                               socket_path=socket_path))
+    except KeyboardInterrupt:
+        pass
 
 
 get_plugin_manager().hook.setup_registry_plugin_options(click_group=cli)
+get_plugin_manager().hook.setup_distromap_plugin_commands(click_group=cli)
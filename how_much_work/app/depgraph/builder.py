@@ -7,11 +7,22 @@ Build a dependency graph for any package.
 """
 
 import asyncio
+import contextlib
 import dataclasses
+import inspect
 import math
-from collections.abc import AsyncIterator, Awaitable, Callable, Collection
-from enum import Enum
-from typing import SupportsFloat
+import time
+from collections.abc import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Collection,
+    Iterable,
+    Iterator,
+    Sequence,
+)
+from enum import StrEnum
+from typing import Any, SupportsFloat, TypeVar
 
 import aiohttp
 import networkx as nx
@@ -21,38 +32,50 @@ from how_much_work.core.exceptions import (
     PackageDependenciesFetchError,
     PackageValidationError,
 )
+from how_much_work.core.metrics import metrics
 from how_much_work.core.types import Package
 
+from how_much_work.app.depgraph.nodes import GraphListener, NodeStatus, NodeTable
+from how_much_work.app.depgraph.snapshot import (
+    Snapshot,
+    SnapshotChild,
+    SnapshotNode,
+    options_fingerprint,
+)
+from how_much_work.app.depgraph.tracing import Phase, Tracer
+
+T = TypeVar("T")
+R = TypeVar("R")
 
-@dataclasses.dataclass(frozen=True)
-class SpecialNode:
+
+class CrawlMode(StrEnum):
     """
-    Special node with attributes.
+    Dependency graph traversal strategies.
     """
 
-    #: Short node status description.
-    status: str
-
-    #: Color used to fill the background of a node.
-    fillcolor: str
+    #: Expand every child as soon as it's discovered.
+    RECURSIVE = "recursive"
 
+    #: Expand the graph breadth-first using a fixed pool of workers.
+    #:
+    #: Each node is expanded at its shortest depth, and the resulting graph
+    #: doesn't depend on the order network requests finish in.
+    LEVEL = "level"
 
-class NodeStatus(SpecialNode, Enum):
-    """
-    Pre-defined nodes.
-    """
 
-    #: This node is incomplete because the maximum depth was reached.
-    INCOMPLETE = ("incomplete", "yellow")
+@dataclasses.dataclass
+class _Expansion:
+    #: Packages from another repository replacing this one.
+    replacements: Collection[Package] = frozenset()
 
-    #: This node is invalid because it could not be normalized.
-    INVALID = ("invalid", "red")
+    #: Direct children, ``None`` if they still have to be fetched.
+    children: list[SnapshotChild] | None = None
 
-    #: This node has matching package(s) from another repository.
-    DONE = ("done", "green")
+    #: Current validator of package metadata.
+    validator: str | None = None
 
-    #: This node is from another repository.
-    VIRTUAL = ("virtual", "white")
+    #: Whether fetching children didn't fail.
+    ok: bool = True
 
 
 class DependencyGraph:
@@ -65,7 +88,16 @@ class DependencyGraph:
         aiohttp_session: aiohttp.ClientSession,
         maxdepth: SupportsFloat = math.inf,
         pkg_filter: Callable[[Package], bool] | None = None,
-        pkg_distromap: Callable[..., Awaitable[Collection[Package]]] | None = None
+        pkg_prefilter: Callable[[Package], bool] | None = None,
+        pkg_distromap: Callable[..., Awaitable[Collection[Package]]] | None = None,
+        mode: CrawlMode = CrawlMode.RECURSIVE,
+        workers: int = 16,
+        batch_size: int = 100,
+        snapshot: Snapshot | None = None,
+        snapshot_max_age: float = 0,
+        record: bool = False,
+        listener: GraphListener | None = None,
+        tracer: Tracer | None = None
     ):
         """
         :param plugman: pluggy plugin manager
@@ -74,40 +106,159 @@ class DependencyGraph:
             single branch
         :param pkg_filter: callback to allow or block processing the current
             package (can be also used for progress reporting)
+        :param pkg_prefilter: callback to block processing a package before
+            it's normalized, so that no requests are made for it
         :param pkg_distromap: callback to connect the original package with
             packages from another repository
+        :param mode: graph traversal strategy
+        :param workers: maximum number of packages processed at once in the
+            :py:attr:`CrawlMode.LEVEL` mode
+        :param batch_size: maximum number of packages passed to batch hooks
+            at once
+        :param snapshot: previously saved graph, children of packages with
+            unchanged metadata are taken from it, unless it was saved with
+            different registry plugin options
+        :param snapshot_max_age: number of seconds snapshot entries are used
+            without revalidation
+        :param record: keep information needed to create a snapshot with
+            :py:meth:`snapshot`
+        :param listener: receiver of graph modification events, called as
+            soon as nodes, edges and statuses are discovered
+        :param tracer: recorder of package processing spans
         """
 
         self._maxdepth = maxdepth
+        self._mode = mode
+        self._workers = workers
+        self._batch_size = batch_size
         self._plugman = plugman
         self._aiohttp_session = aiohttp_session
         self._pkg_filter = pkg_filter
+        self._pkg_prefilter = pkg_prefilter
         self._pkg_distromap = pkg_distromap
-
+        self._fingerprint = options_fingerprint(
+            plugman.hook.get_registry_options_fingerprint()
+        )
+        if snapshot is not None and snapshot.fingerprint != self._fingerprint:
+            # Children might have been filtered differently.
+            snapshot = None
+        self._snapshot = snapshot
+        self._snapshot_max_age = snapshot_max_age
+        self._record = record
+        self._tracer = tracer
+
+        # Expanded nodes, kept for the next snapshot.
+        self._expansions: dict[Package, SnapshotNode] = {}
+
+        # Distromap lookups started before packages are expanded.
+        self._overrides: dict[Package, asyncio.Task[Collection[Package]]] = {}
+        self._override_slots = asyncio.Semaphore(workers)
+
+        # Working graph, converted to NetworkX on demand.
+        self._nodes = NodeTable(listener)
         self._graph: "nx.DiGraph[Package]" = nx.DiGraph()
-        self._visited: set[Package] = set()
-        self._in_processing: dict[Package, asyncio.Event] = {}
+        self._graph_version = 0
+        self._roots: dict[Package, None] = {}
 
     async def normalize_package(self, pkg: Package) -> Package:
-        return await self._plugman.hook.normalize_package(
-            pkg=pkg, aiohttp_session=self._aiohttp_session
-        )
+        with metrics.timer("hook_seconds", hook="normalize_package"):
+            return await self._plugman.hook.normalize_package(
+                pkg=pkg, aiohttp_session=self._aiohttp_session
+            )
 
     def get_package_children(self, pkg: Package) -> AsyncIterator[Package]:
         return self._plugman.hook.get_package_children(
             pkg=pkg, aiohttp_session=self._aiohttp_session
         )
 
+    async def normalize_packages(self, pkgs: Sequence[Package]) -> list[Package | None]:
+        """
+        Normalize multiple packages, in batches if plugins support it.
+
+        Packages are grouped by repository. Groups not taken by any plugin
+        as a batch are normalized one by one.
+
+        :param pkgs: package objects
+
+        :returns: normalized packages in the same order, with ``None`` for
+            invalid packages
+        """
+
+        def call_batch(batch: list[Package]) -> Awaitable[Sequence[Package | None]] | None:
+            return self._plugman.hook.normalize_packages_batch(
+                pkgs=batch, aiohttp_session=self._aiohttp_session
+            )
+
+        return await self._dispatch_batches(pkgs, call_batch, self._try_normalize,
+                                            hook="normalize_packages_batch")
+
+    async def get_packages_children(
+        self, pkgs: Sequence[Package]
+    ) -> list[Sequence[Package] | None]:
+        """
+        Get direct children of multiple packages, in batches if plugins
+        support it.
+
+        Packages are grouped by repository. Groups not taken by any plugin
+        as a batch are processed one by one.
+
+        :param pkgs: package objects
+
+        :returns: children of each package in the same order, with ``None``
+            for packages whose dependencies could not be fetched
+        """
+
+        def call_batch(
+            batch: list[Package]
+        ) -> Awaitable[Sequence[Sequence[Package] | None]] | None:
+            return self._plugman.hook.get_packages_children_batch(
+                pkgs=batch, aiohttp_session=self._aiohttp_session
+            )
+
+        return await self._dispatch_batches(pkgs, call_batch, self._try_get_children,
+                                            hook="get_packages_children_batch")
+
+    async def get_package_validator(self, pkg: Package,
+                                    previous: str | None) -> str | None:
+        result = self._plugman.hook.get_package_validator(
+            pkg=pkg, previous=previous, aiohttp_session=self._aiohttp_session
+        )
+        if result is None:
+            return None
+        with metrics.timer("hook_seconds", hook="get_package_validator"):
+            return await result
+
     def filter_pkg(self, pkg: Package) -> bool:
         if callable(self._pkg_filter):
             return self._pkg_filter(pkg)
         return True
 
+    def prefilter_pkg(self, pkg: Package) -> bool:
+        if callable(self._pkg_prefilter):
+            return self._pkg_prefilter(pkg)
+        return True
+
     async def get_package_children_override(self, pkg: Package) -> Collection[Package]:
         if callable(self._pkg_distromap):
-            return await self._pkg_distromap(pkg, aiohttp_session=self._aiohttp_session)
+            with self._span(pkg, Phase.DISTROMAP), \
+                    metrics.timer("hook_seconds", hook="distromap"):
+                return await self._pkg_distromap(pkg,
+                                                 aiohttp_session=self._aiohttp_session)
         return frozenset()
 
+    def _trace(self, pkg: Package, phase: Phase, start: float, end: float, *,
+               parent: Package | None = None) -> None:
+        if self._tracer is not None:
+            self._tracer.record(pkg, phase, start, end, parent=parent)
+
+    @contextlib.contextmanager
+    def _span(self, pkg: Package, phase: Phase) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._trace(pkg, phase, start, time.perf_counter())
+
     @property
     def graph(self) -> "nx.DiGraph[Package]":
         """
@@ -117,12 +268,56 @@ class DependencyGraph:
 
         Some nodes can have ``status`` attribute set, providing insight into the
         circumstances they were added.
+
+        The graph is built from the internal representation on first access
+        after modifications.
         """
 
+        if self._graph_version != self._nodes.version:
+            self._graph = self._nodes.to_networkx()
+            self._graph_version = self._nodes.version
         return self._graph.copy(as_view=True)
 
     def mark_node(self, pkg: Package, *, marker: NodeStatus) -> None:
-        self._graph.nodes[pkg].update(dataclasses.asdict(marker))
+        self._nodes.set_status(pkg, marker)
+
+    @property
+    def roots(self) -> list[Package]:
+        """
+        Packages the graph was built from, in order they were added.
+        """
+
+        return list(self._roots)
+
+    def reachability(self) -> dict[Package, list[Package]]:
+        """
+        Find packages reachable from each root.
+
+        :returns: mapping of roots to their reachable packages
+        """
+
+        return {root: self._nodes.descendants(root) for root in self._roots}
+
+    def snapshot(self) -> Snapshot:
+        """
+        Create a snapshot of the graph.
+
+        Children of nodes are only included if the builder was created with
+        ``record`` enabled.
+
+        :returns: new snapshot
+        """
+
+        graph = self.graph
+        index = {pkg: i for i, pkg in enumerate(graph)}
+
+        nodes: list[SnapshotNode] = []
+        for pkg, status in graph.nodes(data="status"):
+            node = self._expansions.get(pkg, SnapshotNode(package=pkg))
+            nodes.append(node.model_copy(update={"status": status}))
+
+        return Snapshot(roots=self.roots, nodes=nodes, fingerprint=self._fingerprint,
+                        edges=[(index[u], index[v]) for u, v in graph.edges])
 
     async def add_depgraph(self, pkg: Package) -> None:
         """
@@ -134,68 +329,100 @@ class DependencyGraph:
           method to compare them between repositories.
 
         :param pkg: package object
+
+        :raises PackageValidationError: if the package could not be normalized
         """
 
         pkg = await self.normalize_package(pkg)
-        if pkg in self._visited:
-            # Consider the following consequent calls:
-            # >>> await builder.add_depgraph(example)
-            # >>> await builder.add_depgraph(dependency_of_example)
-            # >>> await builder.add_depgraph(ignored_dependency_of_example")
-            return
+        await self._add_roots([pkg])
 
-        self._graph.add_node(pkg)
-        await self._add_depgraph(pkg, depth=float(self._maxdepth) - 1)
-
-    async def _add_depgraph(self, pkg: Package, *, depth: SupportsFloat) -> None:
+    async def add_depgraphs(self, pkgs: Iterable[Package]) -> None:
+        """
+        Add multiple packages with their dependencies to the graph at once.
 
-        self._visited.add(pkg)
+        All packages are crawled concurrently, sharing common dependencies.
+        Packages that could not be normalized are added to the graph and
+        marked as invalid.
 
-        if len(pkg_subst := await self.get_package_children_override(pkg)) != 0:
-            # Add replacements as children and terminate further processing.
-            #
-            # Marking replacements as visited is not needed: if it's a real
-            # dependency for some other package, let it be processed as
-            # usual.
-            self.mark_node(pkg, marker=NodeStatus.DONE)
-            for other in pkg_subst:
-                self._graph.add_edge(pkg, other)
-                self.mark_node(other, marker=NodeStatus.VIRTUAL)
-            return
+        :param pkgs: package objects
+        """
 
-        tasks = [asyncio.create_task(self._process_child(pkg, child, depth=depth))
-                 async for child in self.get_package_children(pkg)]
-        try:
-            await asyncio.gather(*tasks)
-        except PackageDependenciesFetchError:
-            # Fetching dependencies failed.
-            # Mark the package as incomplete.
-            self.mark_node(pkg, marker=NodeStatus.INCOMPLETE)
+        pkgs = list(pkgs)
+        normalized = await self.normalize_packages(pkgs)
+
+        roots: list[Package] = []
+        for pkg, result in zip(pkgs, normalized):
+            if result is not None:
+                roots.append(result)
+            elif not self._nodes.is_visited(pkg):
+                self._nodes.mark_visited(pkg)
+                self._nodes.add_node(pkg)
+                self.mark_node(pkg, marker=NodeStatus.INVALID)
+                self._roots[pkg] = None
+        await self._add_roots(roots)
+
+    async def _add_roots(self, pkgs: Iterable[Package]) -> None:
+        depth = float(self._maxdepth) - 1
+
+        new_roots: list[Package] = []
+        for pkg in pkgs:
+            if self._nodes.is_visited(pkg):
+                # Consider the following consequent calls:
+                # >>> await builder.add_depgraph(example)
+                # >>> await builder.add_depgraph(dependency_of_example)
+                # >>> await builder.add_depgraph(ignored_dependency_of_example")
+                if pkg in self._nodes:
+                    self._roots[pkg] = None
+                continue
+
+            self._nodes.mark_visited(pkg)
+            self._nodes.add_node(pkg)
+            self._roots[pkg] = None
+            new_roots.append(pkg)
+
+        if self._mode == CrawlMode.LEVEL:
+            await self._add_depgraph_by_level([(pkg, depth) for pkg in new_roots])
+        else:
+            await asyncio.gather(*(self._add_depgraph(pkg, depth=depth)
+                                   for pkg in new_roots))
+
+    def _add_replacements(self, pkg: Package, pkg_subst: Collection[Package]) -> None:
+        # Add replacements as children and terminate further processing.
+        #
+        # Marking replacements as visited is not needed: if it's a real
+        # dependency for some other package, let it be processed as
+        # usual.
+        self.mark_node(pkg, marker=NodeStatus.DONE)
+        for other in pkg_subst:
+            self._nodes.add_edge(pkg, other)
+            self.mark_node(other, marker=NodeStatus.VIRTUAL)
+
+    def _add_invalid_child(self, parent: Package, child: Package) -> None:
+        # Add invalid package and mark it as visited.
+        self._nodes.mark_visited(child)
+        self._nodes.add_edge(parent, child)
+        self.mark_node(child, marker=NodeStatus.INVALID)
+
+    def _add_child(self, parent: Package, child: Package, *,
+                   depth: SupportsFloat) -> bool:
+        """
+        Link a normalized child to its parent.
 
-    async def _process_child(self, parent: Package, child: Package, *,
-                             depth: SupportsFloat) -> None:
-        try:
-            child = await self.normalize_package(child)
-        except PackageValidationError:
-            # Add invalid package and mark it as visited.
-            self._visited.add(child)
-            self._graph.add_edge(parent, child)
-            self.mark_node(child, marker=NodeStatus.INVALID)
-            return
+        :returns: whether the child should be expanded
+        """
 
-        if child in self._visited:
-            if child in self._graph:
+        if self._nodes.is_visited(child):
+            if child in self._nodes:
                 # Existing nodes should always be linked.
-                self._graph.add_edge(parent, child)
+                self._nodes.add_edge(parent, child)
         elif float(depth) > 0:
-            if not self.filter_pkg(child):
-                # Skipped by the filters.
-                # Mark as visited without adding to the graph.
-                self._visited.add(child)
-            else:
+            # Skipped packages are marked as visited without adding to the
+            # graph.
+            self._nodes.mark_visited(child)
+            if self.filter_pkg(child):
                 # Package not marked as visited yet - going deeper.
-                self._graph.add_edge(parent, child)
-                await self._add_depgraph(child, depth=float(depth) - 1)
+                self._nodes.add_edge(parent, child)
+                return True
         else:
             # Not allowed to go deeper - mark current node as
             # incomplete.
@@ -203,3 +430,387 @@ class DependencyGraph:
             # As it's been marked as visited, incomplete status will
             # stay.
             self.mark_node(parent, marker=NodeStatus.INCOMPLETE)
+        return False
+
+    async def _add_depgraph(self, pkg: Package, *, depth: SupportsFloat) -> None:
+
+        self._nodes.mark_visited(pkg)
+
+        with self._span(pkg, Phase.EXPAND):
+            with metrics.gauge("expansions_in_flight").track():
+                if len(pkg_subst := await self.get_package_children_override(pkg)) != 0:
+                    self._add_replacements(pkg, pkg_subst)
+                    return
+
+                try:
+                    with self._span(pkg, Phase.FETCH):
+                        children = await self._get_children(pkg)
+                except PackageDependenciesFetchError:
+                    # Fetching dependencies failed.
+                    # Mark the package as incomplete.
+                    self.mark_node(pkg, marker=NodeStatus.INCOMPLETE)
+                    return
+
+            await asyncio.gather(*(self._process_child(pkg, child, depth=depth)
+                                   for child in children))
+
+    async def _process_child(self, parent: Package, child: SnapshotChild, *,
+                             depth: SupportsFloat) -> None:
+        if not self.prefilter_pkg(child.package):
+            # Skipped by the filters before any requests are made.
+            return
+
+        normalized, start, end = await self._normalize_child_timed(child)
+        if normalized is None:
+            self._add_invalid_child(parent, child.package)
+            return
+
+        if self._add_child(parent, normalized, depth=depth):
+            self._trace(normalized, Phase.NORMALIZE, start, end, parent=parent)
+            await self._add_depgraph(normalized, depth=float(depth) - 1)
+
+    async def _get_children(self, pkg: Package) -> list[SnapshotChild]:
+        """
+        Get direct children of a package, reusing the previous snapshot if
+        package metadata has not changed.
+
+        :raises PackageDependenciesFetchError: on network errors
+        """
+
+        children, validator = await self._get_cached_children(pkg)
+        if children is not None:
+            return children
+
+        with metrics.timer("hook_seconds", hook="get_package_children"):
+            fetched = [child async for child in self.get_package_children(pkg)]
+        return self._store_children(pkg, validator, fetched)
+
+    async def _get_cached_children(
+        self, pkg: Package
+    ) -> tuple[list[SnapshotChild] | None, str | None]:
+        """
+        Get direct children of a package from the previous snapshot if
+        package metadata has not changed.
+
+        :raises PackageDependenciesFetchError: on network errors
+
+        :returns: children or ``None`` if they have to be fetched, and the
+            current validator
+        """
+
+        validator: str | None = None
+        previous = self._snapshot.lookup(pkg) if self._snapshot is not None else None
+        if previous is not None and previous.children is not None:
+            if previous.is_fresh(self._snapshot_max_age):
+                metrics.inc("cache_requests_total", cache="snapshot", result="hit")
+                return self._reuse_children(previous), previous.validator
+
+            validator = await self.get_package_validator(pkg, previous.validator)
+            if validator is not None and validator == previous.validator:
+                metrics.inc("cache_requests_total", cache="snapshot",
+                            result="revalidated")
+                return self._reuse_children(previous, fetched=time.time()), validator
+            metrics.inc("cache_requests_total", cache="snapshot", result="stale")
+        elif self._record:
+            validator = await self.get_package_validator(pkg, None)
+        return None, validator
+
+    def _store_children(self, pkg: Package, validator: str | None,
+                        children: Iterable[Package]) -> list[SnapshotChild]:
+        return self._record_children(
+            SnapshotNode(package=pkg, validator=validator, fetched=time.time(),
+                         children=[SnapshotChild(package=child) for child in children])
+        )
+
+    def _reuse_children(self, node: SnapshotNode, **update: Any) -> list[SnapshotChild]:
+        # Normalization might have failed because of a transient error, so
+        # invalid children are normalized again.
+        children = [child.model_copy(update={"invalid": False}) if child.invalid else child
+                    for child in node.children or []]
+        return self._record_children(node.model_copy(update={"children": children, **update}))
+
+    def _record_children(self, node: SnapshotNode) -> list[SnapshotChild]:
+        if self._record:
+            self._expansions[node.package] = node
+        return node.children or []
+
+    async def _normalize_child(self, child: SnapshotChild) -> Package | None:
+        """
+        Normalize a child unless it was done before.
+
+        :returns: normalized package or ``None`` if the child is invalid
+        """
+
+        if child.normalized is None and not child.invalid:
+            try:
+                child.normalized = await self.normalize_package(child.package)
+            except PackageValidationError:
+                child.invalid = True
+        return child.normalized
+
+    async def _normalize_child_timed(
+        self, child: SnapshotChild
+    ) -> tuple[Package | None, float, float]:
+        start = time.perf_counter()
+        result = await self._normalize_child(child)
+        return result, start, time.perf_counter()
+
+    async def _map_bounded(self, func: Callable[[T], Awaitable[R]],
+                           items: Sequence[T]) -> list[R]:
+        """
+        Apply a coroutine function to all items using a fixed number of
+        workers.
+
+        :returns: results in the order of items
+        """
+
+        results: dict[int, R] = {}
+        queue = iter(enumerate(items))
+
+        async def worker() -> None:
+            for i, item in queue:
+                results[i] = await func(item)
+
+        workers = [asyncio.create_task(worker())
+                   for _ in range(min(self._workers, len(items)))]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+        return [results[i] for i in range(len(items))]
+
+    async def _dispatch_batches(
+        self, pkgs: Sequence[Package],
+        call_batch: Callable[[list[Package]], Awaitable[Sequence[R]] | None],
+        call_single: Callable[[Package], Awaitable[R]], *, hook: str
+    ) -> list[R]:
+        """
+        Split packages into per-repository batches and process them using a
+        fixed number of workers.
+
+        Batches the hook returns ``None`` for are processed one package at a
+        time, by the same workers.
+
+        :returns: results in the order of packages
+        """
+
+        by_repo: dict[str, list[int]] = {}
+        for i, pkg in enumerate(pkgs):
+            by_repo.setdefault(pkg.repo_name, []).append(i)
+
+        jobs: list[tuple[list[int], Awaitable[Sequence[R]] | None]] = []
+        for indices in by_repo.values():
+            for start in range(0, len(indices), self._batch_size):
+                batch = indices[start:start + self._batch_size]
+                if (awaitable := call_batch([pkgs[i] for i in batch])) is not None:
+                    jobs.append((batch, awaitable))
+                else:
+                    jobs += [([i], None) for i in batch]
+
+        async def run(job: tuple[list[int], Awaitable[Sequence[R]] | None]) -> Sequence[R]:
+            batch, awaitable = job
+            if awaitable is None:
+                return [await call_single(pkgs[batch[0]])]
+            with metrics.timer("hook_seconds", hook=hook):
+                batch_results = await awaitable
+            if len(batch_results) != len(batch):
+                raise RuntimeError(f"{hook} returned {len(batch_results)} results "
+                                   f"for {len(batch)} packages")
+            return batch_results
+
+        try:
+            job_results = await self._map_bounded(run, jobs)
+        finally:
+            # Batches not started because of an error.
+            for _, awaitable in jobs:
+                if inspect.iscoroutine(awaitable):
+                    awaitable.close()
+
+        results: dict[int, R] = {}
+        for (batch, _), batch_results in zip(jobs, job_results):
+            results.update(zip(batch, batch_results))
+        return [results[i] for i in range(len(pkgs))]
+
+    async def _try_get_children(self, pkg: Package) -> Sequence[Package] | None:
+        try:
+            with metrics.timer("hook_seconds", hook="get_package_children"):
+                return [child async for child in self.get_package_children(pkg)]
+        except PackageDependenciesFetchError:
+            return None
+
+    async def _expand(self, pkg: Package) -> _Expansion:
+        """
+        Fetch replacements and children of a package.
+        """
+
+        with self._span(pkg, Phase.EXPAND), metrics.gauge("expansions_in_flight").track():
+            if len(pkg_subst := await self._get_override(pkg)) != 0:
+                return _Expansion(replacements=pkg_subst)
+
+            try:
+                with self._span(pkg, Phase.FETCH):
+                    return _Expansion(children=await self._get_children(pkg))
+            except PackageDependenciesFetchError:
+                return _Expansion(ok=False)
+
+    async def _prepare_expansion(self, pkg: Package) -> _Expansion:
+        """
+        Fetch replacements of a package and its children from the snapshot,
+        leaving the rest of children to be fetched in batches.
+        """
+
+        if len(pkg_subst := await self._get_override(pkg)) != 0:
+            return _Expansion(replacements=pkg_subst)
+
+        try:
+            children, validator = await self._get_cached_children(pkg)
+        except PackageDependenciesFetchError:
+            return _Expansion(ok=False)
+        return _Expansion(children=children, validator=validator)
+
+    async def _expand_batched(self, pkgs: Sequence[Package]) -> list[_Expansion]:
+        """
+        Fetch replacements and children of multiple packages, using batch
+        hooks for children.
+        """
+
+        start = time.perf_counter()
+        with metrics.gauge("expansions_in_flight").track():
+            expanded = await self._map_bounded(self._prepare_expansion, pkgs)
+            pending = [i for i, expansion in enumerate(expanded)
+                       if expansion.ok and expansion.children is None
+                       and len(expansion.replacements) == 0]
+
+            fetch_start = time.perf_counter()
+            fetched = await self.get_packages_children([pkgs[i] for i in pending])
+            end = time.perf_counter()
+
+        for i, children in zip(pending, fetched):
+            expansion = expanded[i]
+            if children is None:
+                expansion.ok = False
+            else:
+                expansion.children = self._store_children(
+                    pkgs[i], expansion.validator, children
+                )
+            self._trace(pkgs[i], Phase.FETCH, fetch_start, end)
+
+        for pkg in pkgs:
+            self._trace(pkg, Phase.EXPAND, start, end)
+        return expanded
+
+    async def _normalize_children_batched(
+        self, children: Sequence[SnapshotChild]
+    ) -> list[tuple[Package | None, float, float]]:
+        """
+        Normalize children not normalized before, using batch hooks.
+
+        :returns: normalized packages with start and end times of the batch
+        """
+
+        pending = list(dict.fromkeys(child.package for child in children
+                                     if child.normalized is None and not child.invalid))
+        start = time.perf_counter()
+        normalized = dict(zip(pending, await self.normalize_packages(pending)))
+        end = time.perf_counter()
+
+        for child in children:
+            if child.normalized is None and not child.invalid:
+                child.normalized = normalized[child.package]
+                child.invalid = child.normalized is None
+        return [(child.normalized, start, end) for child in children]
+
+    def _has_batch_hook(self, name: str) -> bool:
+        return len(getattr(self._plugman.hook, name).get_hookimpls()) != 0
+
+    def _prefetch_overrides(self, pkgs: Iterable[Package]) -> None:
+        """
+        Start distromap lookups for packages that are about to be expanded,
+        so that they run concurrently with fetching children of other
+        packages.
+
+        At most ``workers`` lookups are made at once, the rest wait in order.
+        """
+
+        if not callable(self._pkg_distromap):
+            return
+
+        for pkg in pkgs:
+            if pkg not in self._overrides:
+                self._overrides[pkg] = asyncio.create_task(self._prefetch_override(pkg))
+
+    async def _prefetch_override(self, pkg: Package) -> Collection[Package]:
+        async with self._override_slots:
+            return await self.get_package_children_override(pkg)
+
+    async def _get_override(self, pkg: Package) -> Collection[Package]:
+        if (task := self._overrides.pop(pkg, None)) is not None:
+            return await task
+        return await self.get_package_children_override(pkg)
+
+    def _cancel_overrides(self) -> None:
+        for task in self._overrides.values():
+            if not task.cancel() and not task.cancelled():
+                # Don't warn about exceptions nobody is waiting for.
+                task.exception()
+        self._overrides.clear()
+
+    async def _try_normalize(self, pkg: Package) -> Package | None:
+        try:
+            return await self.normalize_package(pkg)
+        except PackageValidationError:
+            return None
+
+    async def _add_depgraph_by_level(
+        self, roots: list[tuple[Package, SupportsFloat]]
+    ) -> None:
+
+        try:
+            await self._crawl_levels(roots)
+        finally:
+            self._cancel_overrides()
+
+    async def _crawl_levels(
+        self, frontier: list[tuple[Package, SupportsFloat]]
+    ) -> None:
+
+        # Network requests are made concurrently, but the graph is only
+        # modified in order of discovery.
+        while frontier:
+            # Distromap lookups of the whole level are queued at once, and
+            # both they and expansion are limited to a fixed number of
+            # workers.
+            self._prefetch_overrides(node for node, _ in frontier)
+            nodes = [node for node, _ in frontier]
+            if self._has_batch_hook("get_packages_children_batch"):
+                expanded = await self._expand_batched(nodes)
+            else:
+                expanded = await self._map_bounded(self._expand, nodes)
+
+            pending: list[tuple[Package, SnapshotChild, SupportsFloat]] = []
+            for (node, node_depth), expansion in zip(frontier, expanded):
+                if len(expansion.replacements) != 0:
+                    self._add_replacements(node, expansion.replacements)
+                    continue
+                if not expansion.ok:
+                    # Fetching dependencies failed.
+                    # Mark the package as incomplete.
+                    self.mark_node(node, marker=NodeStatus.INCOMPLETE)
+                pending += [(node, child, node_depth) for child in expansion.children or []
+                            if self.prefilter_pkg(child.package)]
+
+            children = [child for _, child, _ in pending]
+            if self._has_batch_hook("normalize_packages_batch"):
+                normalized = await self._normalize_children_batched(children)
+            else:
+                normalized = await self._map_bounded(self._normalize_child_timed, children)
+
+            frontier = []
+            for (parent, child, node_depth), (result, start, end) in zip(pending,
+                                                                         normalized):
+                if result is None:
+                    self._add_invalid_child(parent, child.package)
+                elif self._add_child(parent, result, depth=node_depth):
+                    self._trace(result, Phase.NORMALIZE, start, end, parent=parent)
+                    frontier.append((result, float(node_depth) - 1))
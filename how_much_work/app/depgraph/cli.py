@@ -6,32 +6,80 @@
 Implementation of CLI commands for the Depgraph module.
 """
 
+import json
 import sys
 
 import networkx as nx
 from pluggy import PluginManager
 
+from how_much_work.core.concurrency import ConcurrencyController
+from how_much_work.core.metrics import metrics
 from how_much_work.core.options import MainOptions
 from how_much_work.core.types import Package
 from how_much_work.core.utils import aiohttp_session
 
 from how_much_work.app.depgraph.builder import DependencyGraph
 from how_much_work.app.depgraph.options import DepgraphOptions
+from how_much_work.app.depgraph.snapshot import Snapshot
+from how_much_work.app.depgraph.tracing import Tracer
+from how_much_work.app.depgraph.writers import WRITERS, OutputFormat
 
 
 async def build_depgraph(plugman: PluginManager, options: MainOptions) -> None:
     cmd_options = DepgraphOptions.model_validate(options.children["depgraph"])
-    pkg = Package(name=cmd_options.package, repo_name=options.from_repo)
+    pkgs = [Package(name=name, repo_name=options.from_repo)
+            for name in cmd_options.packages]
 
-    async with aiohttp_session() as session:
+    snapshot: Snapshot | None = None
+    if (path := cmd_options.since_snapshot) is not None and path.is_file():
+        snapshot = Snapshot.load(path)
+
+    writer = None
+    if (writer_class := WRITERS.get(cmd_options.output_format)) is not None:
+        writer = writer_class(sys.stdout)
+        writer.start()
+
+    tracer = Tracer() if cmd_options.trace is not None else None
+
+    controller = ConcurrencyController(options.host_limit, options.host_limits)
+    async with (
+        metrics.monitor_loop_lag(),
+        aiohttp_session(controller, [metrics.trace_config()]) as session,
+    ):
         builder = DependencyGraph(plugman, maxdepth=cmd_options.max_depth,
                                   pkg_filter=options.pkg_filter,
+                                  pkg_prefilter=options.pkg_prefilter,
                                   pkg_distromap=options.pkg_distromap,
+                                  mode=cmd_options.mode,
+                                  workers=cmd_options.workers,
+                                  snapshot=snapshot,
+                                  snapshot_max_age=cmd_options.snapshot_max_age,
+                                  record=cmd_options.save_snapshot is not None,
+                                  listener=writer,
+                                  tracer=tracer,
                                   aiohttp_session=session)
-        await builder.add_depgraph(pkg)
+        await builder.add_depgraphs(pkgs)
+
+    if writer is not None:
+        writer.finish()
+
+    if tracer is not None and cmd_options.trace is not None:
+        tracer.save(cmd_options.trace)
+        print(tracer.summary(), file=sys.stderr)
+
+    if cmd_options.save_snapshot is not None:
+        builder.snapshot().save(cmd_options.save_snapshot)
+
+    if cmd_options.reachability is not None:
+        reachability = {
+            str(root): sorted(map(str, reachable))
+            for root, reachable in builder.reachability().items()
+        }
+        with open(cmd_options.reachability, "w") as file:
+            json.dump(reachability, file, indent=2)
 
-    # GraphViz
-    pgv = nx.nx_agraph.to_agraph(builder.graph)
-    pgv.graph_attr.update(rankdir="LR")  # Left to right
-    pgv.node_attr.update(shape="box", style="filled", fillcolor="lightgrey")
-    pgv.write(sys.stdout)
+    if cmd_options.output_format == OutputFormat.GRAPHVIZ:
+        pgv = nx.nx_agraph.to_agraph(builder.graph)
+        pgv.graph_attr.update(rankdir="LR")  # Left to right
+        pgv.node_attr.update(shape="box", style="filled", fillcolor="lightgrey")
+        pgv.write(sys.stdout)
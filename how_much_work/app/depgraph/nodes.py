@@ -0,0 +1,307 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2024-2026 Anna <cyber@sysrq.in>
+# No warranty
+
+"""
+Compact storage for dependency graph nodes.
+"""
+
+import dataclasses
+import sys
+from array import array
+from enum import Enum
+
+import networkx as nx
+
+from how_much_work.core.types import Package
+
+# Node flags.
+_IN_GRAPH = 1
+_VISITED = 2
+
+
+@dataclasses.dataclass(frozen=True)
+class SpecialNode:
+    """
+    Special node with attributes.
+    """
+
+    #: Short node status description.
+    status: str
+
+    #: Color used to fill the background of a node.
+    fillcolor: str
+
+
+class NodeStatus(SpecialNode, Enum):
+    """
+    Pre-defined nodes.
+    """
+
+    #: This node is incomplete because the maximum depth was reached.
+    INCOMPLETE = ("incomplete", "yellow")
+
+    #: This node is invalid because it could not be normalized.
+    INVALID = ("invalid", "red")
+
+    #: This node has matching package(s) from another repository.
+    DONE = ("done", "green")
+
+    #: This node is from another repository.
+    VIRTUAL = ("virtual", "white")
+
+
+# Status codes stored in the node table, zero means no status.
+_STATUSES: tuple[NodeStatus | None, ...] = (None, *NodeStatus)
+_STATUS_CODES = {status: code for code, status in enumerate(_STATUSES)}
+
+
+class GraphListener:
+    """
+    Receiver of graph modification events.
+
+    All methods do nothing by default.
+    """
+
+    def node_added(self, pkg: Package) -> None:
+        """
+        Called when a node is added to the graph.
+
+        :param pkg: package object
+        """
+
+    def edge_added(self, parent: Package, child: Package) -> None:
+        """
+        Called when an edge is added to the graph, after both nodes.
+
+        :param parent: parent package
+        :param child: child package
+        """
+
+    def status_changed(self, pkg: Package, status: NodeStatus) -> None:
+        """
+        Called when a node gets a new status.
+
+        :param pkg: package object
+        :param status: new status
+        """
+
+
+class NodeTable:
+    """
+    Interning table of packages with array-backed adjacency lists.
+
+    Each distinct package gets a small integer identifier, and package
+    properties are stored in columns instead of model instances. Packages
+    can be interned without being added to the graph, for example to mark
+    them as visited.
+    """
+
+    __slots__ = (
+        "_ids", "_names", "_repos", "_conditions",
+        "_flags", "_statuses", "_successors", "_version", "_listener",
+    )
+
+    def __init__(self, listener: GraphListener | None = None) -> None:
+        """
+        :param listener: receiver of graph modification events
+        """
+
+        self._ids: dict[tuple[str, str, str | None], int] = {}
+        self._names: list[str] = []
+        self._repos: list[str] = []
+        self._conditions: list[str | None] = []
+        self._flags = bytearray()
+        self._statuses = array("B")
+        self._successors: list[array[int] | None] = []
+        self._version = 0
+        self._listener = listener
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, pkg: Package) -> bool:
+        node = self.lookup(pkg)
+        return node is not None and bool(self._flags[node] & _IN_GRAPH)
+
+    @property
+    def version(self) -> int:
+        """
+        Counter incremented on every graph modification.
+        """
+
+        return self._version
+
+    def lookup(self, pkg: Package) -> int | None:
+        """
+        Get identifier of an already interned package.
+
+        :param pkg: package object
+
+        :returns: node identifier or ``None``
+        """
+
+        return self._ids.get((pkg.name, pkg.repo_name, pkg.condition))
+
+    def intern(self, pkg: Package) -> int:
+        """
+        Get identifier of a package, adding it to the table if needed.
+
+        :param pkg: package object
+
+        :returns: node identifier
+        """
+
+        key = (pkg.name, pkg.repo_name, pkg.condition)
+        if (node := self._ids.get(key)) is None:
+            node = self._ids[key] = len(self._names)
+            self._names.append(sys.intern(pkg.name))
+            self._repos.append(sys.intern(pkg.repo_name))
+            self._conditions.append(pkg.condition)
+            self._flags.append(0)
+            self._statuses.append(0)
+            self._successors.append(None)
+        return node
+
+    def package(self, node: int) -> Package:
+        """
+        Construct a package object from its identifier.
+
+        :param node: node identifier
+        """
+
+        return Package(name=self._names[node], repo_name=self._repos[node],
+                       condition=self._conditions[node])
+
+    def is_visited(self, pkg: Package) -> bool:
+        """
+        Check whether a package was marked as visited.
+
+        :param pkg: package object
+        """
+
+        node = self.lookup(pkg)
+        return node is not None and bool(self._flags[node] & _VISITED)
+
+    def mark_visited(self, pkg: Package) -> None:
+        """
+        Mark a package as visited.
+
+        :param pkg: package object
+        """
+
+        self._flags[self.intern(pkg)] |= _VISITED
+
+    def add_node(self, pkg: Package) -> int:
+        """
+        Add a package to the graph.
+
+        :param pkg: package object
+
+        :returns: node identifier
+        """
+
+        node = self.intern(pkg)
+        if not self._flags[node] & _IN_GRAPH:
+            self._flags[node] |= _IN_GRAPH
+            self._version += 1
+            if self._listener is not None:
+                self._listener.node_added(pkg)
+        return node
+
+    def add_edge(self, parent: Package, child: Package) -> None:
+        """
+        Add an edge to the graph, adding both packages if needed.
+
+        :param parent: parent package
+        :param child: child package
+        """
+
+        u = self.add_node(parent)
+        v = self.add_node(child)
+        if (successors := self._successors[u]) is None:
+            successors = self._successors[u] = array("I")
+        if v not in successors:
+            successors.append(v)
+            self._version += 1
+            if self._listener is not None:
+                self._listener.edge_added(parent, child)
+
+    def set_status(self, pkg: Package, status: NodeStatus) -> None:
+        """
+        Set status of a graph node.
+
+        :param pkg: package object
+        :param status: new status
+
+        :raises KeyError: if the package is not in the graph
+        """
+
+        if pkg not in self:
+            raise KeyError(pkg)
+
+        node = self.intern(pkg)
+        code = _STATUS_CODES[status]
+        if self._statuses[node] != code:
+            self._statuses[node] = code
+            self._version += 1
+            if self._listener is not None:
+                self._listener.status_changed(pkg, status)
+
+    def status(self, pkg: Package) -> NodeStatus | None:
+        """
+        Get status of a graph node.
+
+        :param pkg: package object
+        """
+
+        if (node := self.lookup(pkg)) is None:
+            return None
+        return _STATUSES[self._statuses[node]]
+
+    def descendants(self, pkg: Package) -> list[Package]:
+        """
+        Find all graph nodes reachable from a package.
+
+        :param pkg: package object
+
+        :returns: reachable packages (excluding the package itself, unless
+            it's a part of a cycle)
+        """
+
+        if pkg not in self:
+            return []
+
+        seen: set[int] = set()
+        stack = [self.intern(pkg)]
+        while stack:
+            for child in self._successors[stack.pop()] or ():
+                if child not in seen:
+                    seen.add(child)
+                    stack.append(child)
+        return [self.package(node) for node in sorted(seen)]
+
+    def to_networkx(self) -> "nx.DiGraph[Package]":
+        """
+        Build a NetworkX graph with :py:class:`Package` nodes.
+
+        Node statuses are stored as node attributes.
+        """
+
+        graph: "nx.DiGraph[Package]" = nx.DiGraph()
+        packages: dict[int, Package] = {}
+        for node, flags in enumerate(self._flags):
+            if not flags & _IN_GRAPH:
+                continue
+
+            packages[node] = pkg = self.package(node)
+            if (status := _STATUSES[self._statuses[node]]) is not None:
+                graph.add_node(pkg, **dataclasses.asdict(status))
+            else:
+                graph.add_node(pkg)
+
+        for node, successors in enumerate(self._successors):
+            if successors is not None:
+                graph.add_edges_from((packages[node], packages[child])
+                                     for child in successors)
+        return graph
@@ -6,18 +6,47 @@
 Depgraph subcommand options.
 """
 
+from pathlib import Path
+
 from pydantic import Field
 
 from how_much_work.core.options import OptionsBase
 
+from how_much_work.app.depgraph.builder import CrawlMode
+from how_much_work.app.depgraph.writers import OutputFormat
+
 
 class DepgraphOptions(OptionsBase):
     """
     Depgraph subcommand options.
     """
 
-    #: Package name.
-    package: str = Field(min_length=1)
+    #: Root package names.
+    packages: list[str] = Field(min_length=1)
 
     #: Maximum depth level.
     max_depth: int = Field(gt=0)
+
+    #: Graph traversal strategy.
+    mode: CrawlMode = CrawlMode.RECURSIVE
+
+    #: Maximum number of packages processed at once.
+    workers: int = Field(default=16, gt=0)
+
+    #: Output format.
+    output_format: OutputFormat = OutputFormat.GRAPHVIZ
+
+    #: File to write per-root reachability information to.
+    reachability: Path | None = None
+
+    #: Previously saved snapshot to reuse unchanged parts of the graph from.
+    since_snapshot: Path | None = None
+
+    #: File to save a snapshot of the graph to.
+    save_snapshot: Path | None = None
+
+    #: Number of seconds snapshot entries are used without revalidation.
+    snapshot_max_age: float = Field(default=0, ge=0)
+
+    #: File to write package processing spans to.
+    trace: Path | None = None
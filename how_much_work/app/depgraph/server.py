@@ -0,0 +1,223 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty
+
+"""
+HTTP API answering dependency graph queries from a long-running process.
+
+Plugins, the HTTP connection pool and registry caches stay warm between
+queries. Registries share in-flight fetches of the same package, so
+concurrent queries with common dependencies don't repeat requests.
+Identical queries running at the same time share the whole build.
+"""
+
+import asyncio
+import signal
+import sys
+from pathlib import Path
+from typing import Any
+
+import aiohttp
+from aiohttp import web
+from pluggy import PluginManager
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+
+from how_much_work.core.concurrency import ConcurrencyController
+from how_much_work.core.metrics import metrics
+from how_much_work.core.options import MainOptions
+from how_much_work.core.types import Package
+from how_much_work.core.utils import aiohttp_session
+
+from how_much_work.app.depgraph.builder import CrawlMode, DependencyGraph
+
+
+class DepgraphQuery(BaseModel):
+    """
+    Dependency graph query.
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    #: Root package names.
+    packages: tuple[str, ...] = Field(min_length=1)
+
+    #: Maximum depth level.
+    max_depth: int = Field(default=6, gt=0)
+
+    #: Graph traversal strategy.
+    mode: CrawlMode = CrawlMode.RECURSIVE
+
+    #: Maximum number of packages processed at once.
+    workers: int = Field(default=16, gt=0)
+
+
+def graph_to_json(builder: DependencyGraph) -> dict[str, Any]:
+    """
+    Convert a dependency graph to a JSON-serializable object.
+
+    Nodes are referenced by their ``id``, same as in the JSON Lines output.
+
+    :param builder: dependency graph builder
+
+    :returns: object with ``roots``, ``nodes`` and ``edges`` keys
+    """
+
+    graph = builder.graph
+    nodes: list[dict[str, Any]] = []
+    for pkg, status in graph.nodes(data="status"):
+        node = {"id": str(pkg), **pkg.model_dump(exclude_none=True)}
+        if status is not None:
+            node["status"] = status
+        nodes.append(node)
+
+    return {
+        "roots": [str(pkg) for pkg in builder.roots],
+        "nodes": nodes,
+        "edges": [{"source": str(parent), "target": str(child)}
+                  for parent, child in graph.edges],
+    }
+
+
+class DepgraphServer:
+    """
+    Dependency graph query handler.
+    """
+
+    def __init__(self, plugman: PluginManager, options: MainOptions,
+                 session: aiohttp.ClientSession):
+        """
+        :param plugman: pluggy plugin manager
+        :param options: main application options
+        :param session: :py:mod:`aiohttp` client session shared by all
+            queries
+        """
+
+        self._plugman = plugman
+        self._options = options
+        self._session = session
+
+        # Queries being answered, waited for by one or more clients.
+        self._queries: dict[DepgraphQuery, asyncio.Task[dict[str, Any]]] = {}
+
+    async def _build(self, query: DepgraphQuery) -> dict[str, Any]:
+        builder = DependencyGraph(self._plugman, maxdepth=query.max_depth,
+                                  pkg_filter=self._options.pkg_filter,
+                                  pkg_prefilter=self._options.pkg_prefilter,
+                                  pkg_distromap=self._options.pkg_distromap,
+                                  mode=query.mode, workers=query.workers,
+                                  aiohttp_session=self._session)
+        with metrics.timer("query_seconds"):
+            await builder.add_depgraphs(
+                Package(name=name, repo_name=self._options.from_repo)
+                for name in dict.fromkeys(query.packages)
+            )
+        return graph_to_json(builder)
+
+    def _finish(self, query: DepgraphQuery, task: asyncio.Task[Any]) -> None:
+        del self._queries[query]
+        # Clients might have disconnected while the graph was being built.
+        if not task.cancelled():
+            task.exception()
+
+    async def query(self, query: DepgraphQuery) -> dict[str, Any]:
+        """
+        Build a dependency graph, or wait for an identical query to finish.
+
+        Builds are not cancelled when clients disconnect, so their results
+        still warm the caches.
+
+        :param query: dependency graph query
+
+        :returns: graph converted by :py:func:`graph_to_json`
+        """
+
+        if (task := self._queries.get(query)) is None:
+            metrics.inc("queries_total", result="built")
+            task = asyncio.ensure_future(self._build(query))
+            self._queries[query] = task
+            task.add_done_callback(lambda task: self._finish(query, task))
+        else:
+            metrics.inc("queries_total", result="coalesced")
+        return await asyncio.shield(task)
+
+    async def handle_depgraph(self, request: web.Request) -> web.Response:
+        """
+        Answer a query given either as URL parameters (``package`` can be
+        repeated) or as a JSON object in the request body.
+        """
+
+        try:
+            if request.method == "POST":
+                query = DepgraphQuery.model_validate_json(await request.read())
+            else:
+                params: dict[str, Any] = {
+                    key: request.query[key]
+                    for key in ("max_depth", "mode", "workers")
+                    if key in request.query
+                }
+                params["packages"] = request.query.getall("package", [])
+                query = DepgraphQuery.model_validate(params)
+        except ValidationError as err:
+            return web.json_response({"error": str(err)}, status=400)
+
+        return web.json_response(await self.query(query))
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        """
+        Export runtime metrics in the Prometheus text format.
+        """
+
+        return web.Response(text=metrics.to_prometheus(),
+                            content_type="text/plain")
+
+    def make_app(self) -> web.Application:
+        """
+        Create the web application.
+
+        :returns: application with ``/depgraph`` and ``/metrics`` routes
+        """
+
+        app = web.Application()
+        app.add_routes([
+            web.get("/depgraph", self.handle_depgraph),
+            web.post("/depgraph", self.handle_depgraph),
+            web.get("/metrics", self.handle_metrics),
+        ])
+        return app
+
+
+async def run_server(plugman: PluginManager, options: MainOptions, *,
+                     host: str = "127.0.0.1", port: int = 8080,
+                     socket_path: Path | None = None) -> None:
+    """
+    Serve dependency graph queries until interrupted or terminated.
+
+    :param plugman: pluggy plugin manager
+    :param options: main application options
+    :param host: TCP host to listen on
+    :param port: TCP port to listen on
+    :param socket_path: Unix socket to listen on instead of TCP
+    """
+
+    controller = ConcurrencyController(options.host_limit, options.host_limits)
+    async with (
+        metrics.monitor_loop_lag(),
+        aiohttp_session(controller, [metrics.trace_config()]) as session,
+    ):
+        server = DepgraphServer(plugman, options, session)
+        runner = web.AppRunner(server.make_app())
+        await runner.setup()
+        try:
+            site: web.BaseSite
+            if socket_path is not None:
+                site = web.UnixSite(runner, socket_path)
+            else:
+                site = web.TCPSite(runner, host, port)
+            await site.start()
+            print(f"Listening on {site.name}", file=sys.stderr)
+
+            stopped = asyncio.Event()
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopped.set)
+            await stopped.wait()
+        finally:
+            await runner.cleanup()
@@ -0,0 +1,154 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty
+
+"""
+Saved dependency graphs used for incremental rebuilds.
+"""
+
+import functools
+import hashlib
+import time
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Final, Literal
+
+from pydantic import BaseModel, Field
+
+from how_much_work.core.types import Package
+
+#: Current snapshot format version.
+SNAPSHOT_VERSION: Final = 1
+
+
+def options_fingerprint(values: Iterable[str]) -> str | None:
+    """
+    Combine descriptions of registry plugin options.
+
+    >>> options_fingerprint([])
+    >>> options_fingerprint(["b", "a"]) == options_fingerprint(["a", "b"])
+    True
+
+    :param values: strings returned by plugins
+
+    :returns: hash of the strings or ``None`` if there are none
+    """
+
+    if not (values := sorted(values)):
+        return None
+    return hashlib.sha256("\0".join(values).encode()).hexdigest()
+
+
+class SnapshotChild(BaseModel):
+    """
+    Direct child of a package, as returned by the registry.
+    """
+
+    #: Child package before normalization.
+    package: Package
+
+    #: Normalized child package, ``None`` if it was never normalized or is
+    #: invalid.
+    normalized: Package | None = None
+
+    #: Whether the child could not be normalized. Such children are
+    #: normalized again when the snapshot is reused.
+    invalid: bool = False
+
+
+class SnapshotNode(BaseModel):
+    """
+    Graph node with information needed to reuse its children.
+    """
+
+    #: Package object.
+    package: Package
+
+    #: Node status description, see :py:class:`NodeStatus`.
+    status: str | None = None
+
+    #: Opaque token identifying the state of package metadata the children
+    #: were fetched from.
+    validator: str | None = None
+
+    #: Time (seconds since the Epoch) the children were fetched or last
+    #: revalidated.
+    fetched: float | None = None
+
+    #: Direct children, ``None`` if the node was not expanded.
+    children: list[SnapshotChild] | None = None
+
+    def is_fresh(self, max_age: float) -> bool:
+        """
+        Check whether children can be reused without revalidation.
+
+        :param max_age: maximum age in seconds
+        """
+
+        return self.fetched is not None and time.time() - self.fetched < max_age
+
+
+class Snapshot(BaseModel):
+    """
+    Serializable dependency graph.
+    """
+
+    #: Format version.
+    version: Literal[1] = SNAPSHOT_VERSION
+
+    #: Time (seconds since the Epoch) the snapshot was created.
+    created: float = Field(default_factory=time.time)
+
+    #: Fingerprint of registry plugin options the children were fetched
+    #: with, see :py:func:`options_fingerprint`.
+    fingerprint: str | None = None
+
+    #: Root packages.
+    roots: list[Package] = Field(default_factory=list)
+
+    #: Graph nodes.
+    nodes: list[SnapshotNode] = Field(default_factory=list)
+
+    #: Graph edges, as pairs of node indices.
+    edges: list[tuple[int, int]] = Field(default_factory=list)
+
+    @functools.cached_property
+    def _index(self) -> dict[Package, SnapshotNode]:
+        return {node.package: node for node in self.nodes}
+
+    def lookup(self, pkg: Package) -> SnapshotNode | None:
+        """
+        Find a node by package.
+
+        :param pkg: normalized package object
+
+        :returns: snapshot node or ``None``
+        """
+
+        return self._index.get(pkg)
+
+    @classmethod
+    def load(cls, path: Path) -> "Snapshot":
+        """
+        Read a snapshot from a file.
+
+        :param path: file path
+
+        :raises OSError: if the file could not be read
+        :raises ValueError: if the file is not a valid snapshot
+
+        :returns: loaded snapshot
+        """
+
+        return cls.model_validate_json(path.read_bytes())
+
+    def save(self, path: Path) -> None:
+        """
+        Write the snapshot to a file, replacing it atomically.
+
+        :param path: file path
+        """
+
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(self.model_dump_json(exclude_none=True))
+        tmp_path.replace(path)
@@ -0,0 +1,229 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty
+
+"""
+Per-package spans of graph building and critical path analysis.
+"""
+
+import dataclasses
+import json
+from enum import StrEnum
+from pathlib import Path
+from typing import Any
+
+from how_much_work.core.types import Package
+
+
+class Phase(StrEnum):
+    """
+    Stages of processing a package.
+    """
+
+    #: Normalizing the package found as a child of its parent.
+    NORMALIZE = "normalize"
+
+    #: Looking up replacements in another repository.
+    DISTROMAP = "distromap"
+
+    #: Fetching direct children.
+    FETCH = "fetch"
+
+    #: Processing the package, including its children in the recursive
+    #: crawl mode.
+    EXPAND = "expand"
+
+
+#: Phases that are the package's own work, as opposed to waiting for its
+#: children.
+OWN_PHASES = (Phase.NORMALIZE, Phase.DISTROMAP, Phase.FETCH)
+
+
+@dataclasses.dataclass
+class PackageTrace:
+    """
+    Spans of a single package.
+    """
+
+    #: Package that caused this one to be expanded, ``None`` for roots.
+    parent: Package | None = None
+
+    #: Start and end times of each phase, as returned by
+    #: :py:func:`time.perf_counter`.
+    spans: dict[Phase, tuple[float, float]] = dataclasses.field(default_factory=dict)
+
+    @property
+    def start(self) -> float:
+        return min(start for start, _ in self.spans.values())
+
+    @property
+    def end(self) -> float:
+        return max(end for _, end in self.spans.values())
+
+    @property
+    def ready(self) -> float:
+        """
+        Time the package's own work was finished.
+        """
+
+        return max((self.spans[phase][1] for phase in OWN_PHASES
+                    if phase in self.spans), default=self.start)
+
+    def duration(self, phase: Phase) -> float:
+        if (span := self.spans.get(phase)) is None:
+            return 0.0
+        return span[1] - span[0]
+
+
+@dataclasses.dataclass(frozen=True)
+class CriticalStep:
+    """
+    Package on the critical path.
+    """
+
+    package: Package
+
+    #: Seconds between the parent's work being finished and this package's
+    #: work being started, i.e. time spent in queues.
+    wait: float
+
+    #: Seconds spent in each phase of the package's own work.
+    phases: dict[Phase, float]
+
+
+class Tracer:
+    """
+    Recorder of package processing spans.
+
+    Parent links follow the graph edges packages were expanded through, so
+    the chain of packages bounding the total time can be found.
+    """
+
+    def __init__(self) -> None:
+        self._packages: dict[Package, PackageTrace] = {}
+
+    def record(self, pkg: Package, phase: Phase, start: float, end: float, *,
+               parent: Package | None = None) -> None:
+        """
+        Record a span.
+
+        :param pkg: package object
+        :param phase: processing phase
+        :param start: start time from :py:func:`time.perf_counter`
+        :param end: end time from :py:func:`time.perf_counter`
+        :param parent: package that caused this one to be expanded
+        """
+
+        trace = self._packages.setdefault(pkg, PackageTrace())
+        trace.spans[phase] = (start, end)
+        if parent is not None:
+            trace.parent = parent
+
+    def critical_path(self) -> list[CriticalStep]:
+        """
+        Find the chain of packages ending with the package whose own work
+        was finished last.
+
+        :returns: steps from a root to the last package
+        """
+
+        if not self._packages:
+            return []
+
+        last = max(self._packages, key=lambda pkg: self._packages[pkg].ready)
+        chain: list[Package] = []
+        pkg: Package | None = last
+        while pkg is not None and pkg in self._packages and pkg not in chain:
+            chain.append(pkg)
+            pkg = self._packages[pkg].parent
+        chain.reverse()
+
+        result: list[CriticalStep] = []
+        previous_ready: float | None = None
+        for pkg in chain:
+            trace = self._packages[pkg]
+            wait = trace.start - previous_ready if previous_ready is not None else 0.0
+            result.append(CriticalStep(
+                package=pkg, wait=max(wait, 0.0),
+                phases={phase: trace.duration(phase) for phase in OWN_PHASES
+                        if phase in trace.spans}
+            ))
+            previous_ready = trace.ready
+        return result
+
+    def summary(self) -> str:
+        """
+        :returns: human-readable description of the critical path
+        """
+
+        steps = self.critical_path()
+        if not steps:
+            return "Critical path: no packages traced"
+
+        traces = [self._packages[step.package] for step in steps]
+        lines = [f"Critical path: {len(steps)} packages, "
+                 f"{traces[-1].ready - traces[0].start:.3f}s"]
+        for step in steps:
+            phases = ", ".join(f"{phase} {seconds:.3f}s"
+                               for phase, seconds in step.phases.items())
+            lines.append(f"  {step.package}: wait {step.wait:.3f}s, {phases}")
+        return "\n".join(lines)
+
+    def to_chrome_trace(self) -> dict[str, Any]:
+        """
+        Convert spans to the Chrome Trace Event format, viewable in
+        Perfetto.
+
+        Every package gets its own track, and parent links are shown as
+        flow arrows. Packages on the critical path are marked with the
+        ``critical`` argument.
+
+        :returns: JSON-serializable trace
+        """
+
+        if not self._packages:
+            return {"traceEvents": []}
+
+        origin = min(trace.start for trace in self._packages.values())
+        tids = {pkg: tid for tid, pkg in enumerate(self._packages, start=1)}
+        critical = {step.package for step in self.critical_path()}
+
+        def usec(value: float) -> float:
+            return round((value - origin) * 1e6, 3)
+
+        events: list[dict[str, Any]] = []
+        for pkg, trace in self._packages.items():
+            tid = tids[pkg]
+            events.append({"ph": "M", "name": "thread_name", "pid": 1, "tid": tid,
+                           "args": {"name": str(pkg)}})
+            events.append({"ph": "X", "name": str(pkg), "cat": "package",
+                           "pid": 1, "tid": tid, "ts": usec(trace.start),
+                           "dur": usec(trace.end) - usec(trace.start),
+                           "args": {"critical": pkg in critical}})
+            for phase, (start, end) in trace.spans.items():
+                events.append({"ph": "X", "name": str(phase), "cat": "phase",
+                               "pid": 1, "tid": tid, "ts": usec(start),
+                               "dur": usec(end) - usec(start)})
+
+            if (parent := trace.parent) is not None and parent in tids:
+                parent_trace = self._packages[parent]
+                # Flow events are bound to slices enclosing their timestamps.
+                flow_start = min(parent_trace.ready, trace.start)
+                events.append({"ph": "s", "name": "child", "cat": "flow",
+                               "id": tid, "pid": 1, "tid": tids[parent],
+                               "ts": max(usec(flow_start) - 1, usec(parent_trace.start))})
+                events.append({"ph": "f", "bp": "e", "name": "child", "cat": "flow",
+                               "id": tid, "pid": 1, "tid": tid,
+                               "ts": usec(trace.start)})
+
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save(self, path: Path) -> None:
+        """
+        Write the trace in the Chrome Trace Event format.
+
+        :param path: file path
+        """
+
+        with open(path, "w") as file:
+            json.dump(self.to_chrome_trace(), file)
@@ -0,0 +1,123 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty
+
+"""
+Streaming dependency graph writers.
+"""
+
+import json
+from enum import StrEnum
+from typing import TextIO
+
+from how_much_work.core.types import Package
+
+from how_much_work.app.depgraph.nodes import GraphListener, NodeStatus
+
+
+class OutputFormat(StrEnum):
+    """
+    Graph output formats.
+    """
+
+    #: DOT rendered by Graphviz once the graph is complete.
+    GRAPHVIZ = "graphviz"
+
+    #: DOT written as the graph is built.
+    DOT = "dot"
+
+    #: JSON Lines written as the graph is built.
+    JSONL = "jsonl"
+
+
+def _dot_id(value: str) -> str:
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+class GraphWriter(GraphListener):
+    """
+    Base class for writers emitting graph elements as they are discovered.
+
+    Output is flushed after every element, so consumers can process it
+    while the graph is being built.
+    """
+
+    def __init__(self, file: TextIO):
+        """
+        :param file: output file
+        """
+
+        self._file = file
+
+    def _write(self, text: str) -> None:
+        self._file.write(text)
+        self._file.flush()
+
+    def start(self) -> None:
+        """
+        Write the header, if any.
+        """
+
+    def finish(self) -> None:
+        """
+        Write the footer, if any.
+        """
+
+
+class DotWriter(GraphWriter):
+    """
+    Writer of the Graphviz DOT format.
+
+    Statuses are written as repeated node statements, which override
+    attributes of earlier ones.
+    """
+
+    def start(self) -> None:
+        self._write(
+            'strict digraph "" {\n'
+            "\tgraph [rankdir=LR];\n"
+            "\tnode [fillcolor=lightgrey, shape=box, style=filled];\n"
+        )
+
+    def finish(self) -> None:
+        self._write("}\n")
+
+    def node_added(self, pkg: Package) -> None:
+        self._write(f"\t{_dot_id(str(pkg))};\n")
+
+    def edge_added(self, parent: Package, child: Package) -> None:
+        self._write(f"\t{_dot_id(str(parent))} -> {_dot_id(str(child))};\n")
+
+    def status_changed(self, pkg: Package, status: NodeStatus) -> None:
+        self._write(f"\t{_dot_id(str(pkg))} [status={_dot_id(status.status)}, "
+                    f"fillcolor={_dot_id(status.fillcolor)}];\n")
+
+
+class JsonLinesWriter(GraphWriter):
+    """
+    Writer of JSON Lines, one event object per line.
+
+    Events have the ``event`` key set to ``node``, ``edge`` or ``status``.
+    Nodes are referenced by their ``id``, which is the string representation
+    of the package.
+    """
+
+    def _event(self, **kwargs: object) -> None:
+        self._write(json.dumps(kwargs) + "\n")
+
+    def node_added(self, pkg: Package) -> None:
+        self._event(event="node", id=str(pkg), **pkg.model_dump(exclude_none=True))
+
+    def edge_added(self, parent: Package, child: Package) -> None:
+        self._event(event="edge", source=str(parent), target=str(child))
+
+    def status_changed(self, pkg: Package, status: NodeStatus) -> None:
+        self._event(event="status", id=str(pkg), status=status.status)
+
+
+#: Streaming writer classes by output format.
+WRITERS: dict[OutputFormat, type[GraphWriter]] = {
+    OutputFormat.DOT: DotWriter,
+    OutputFormat.JSONL: JsonLinesWriter,
+}
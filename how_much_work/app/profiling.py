@@ -0,0 +1,166 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty
+
+"""
+Profiling of asynchronous commands.
+"""
+
+import asyncio
+import cProfile
+import os
+import sys
+import threading
+from collections import Counter
+from collections.abc import Coroutine, Iterator
+from enum import StrEnum
+from pathlib import Path
+from types import CodeType, FrameType
+from typing import Any
+
+
+class ProfileFormat(StrEnum):
+    """
+    Profile output formats.
+    """
+
+    #: Deterministic profile in the :py:mod:`pstats` format.
+    #:
+    #: Time the event loop spends waiting for I/O is attributed to the
+    #: ``select`` method of the selector from :py:mod:`selectors`.
+    PSTATS = "pstats"
+
+    #: Sampled stacks in the collapsed format of FlameGraph tools, one
+    #: ``frame;frame;... count`` line per unique stack.
+    #:
+    #: Stacks are prefixed with ``running`` when the event loop runs Python
+    #: code and with ``waiting`` when it waits for I/O, i.e. is inside the
+    #: selector's ``select`` method from :py:mod:`selectors`. Waiting
+    #: samples are taken from every suspended task, following ``await``
+    #: chains of coroutines.
+    COLLAPSED = "collapsed"
+
+
+def _label(code: CodeType) -> str:
+    """
+    >>> _label(_label.__code__)  # doctest: +ELLIPSIS
+    '_label (profiling.py:...)'
+    """
+
+    filename = os.path.basename(code.co_filename)
+    return f"{code.co_qualname} ({filename}:{code.co_firstlineno})"
+
+
+def _frame_stack(frame: FrameType | None) -> list[str]:
+    stack: list[str] = []
+    while frame is not None:
+        stack.append(_label(frame.f_code))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _await_chain(coro: Any) -> Iterator[str]:
+    # Coroutines awaiting other coroutines, down to a future or an
+    # asynchronous generator.
+    while (code := getattr(coro, "cr_code", None)) is not None:
+        yield _label(code)
+        coro = coro.cr_await
+    if coro is not None:
+        yield type(coro).__qualname__
+
+
+class StackSampler:
+    """
+    Sampling profiler of a thread running an event loop.
+
+    Samples are taken from a background thread. It can only run when the
+    profiled thread releases the GIL, so the interval is a lower bound.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, interval: float = 0.005):
+        """
+        :param loop: event loop running in the current thread
+        :param interval: number of seconds between samples
+        """
+
+        self._loop = loop
+        self._interval = interval
+        self._thread_id = threading.get_ident()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+        #: Number of samples of each stack.
+        self.samples: Counter[tuple[str, ...]] = Counter()
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self._interval):
+            self._sample()
+
+    def _sample(self) -> None:
+        frame = sys._current_frames().get(self._thread_id)
+        if frame is None:
+            return
+
+        # The innermost frame is the selector's select() while the loop is
+        # waiting, as polling functions are not Python code.
+        if not frame.f_code.co_filename.endswith("selectors.py"):
+            self.samples[("running", *_frame_stack(frame))] += 1
+            return
+
+        try:
+            tasks = asyncio.all_tasks(self._loop)
+        except RuntimeError:
+            # The loop changed its tasks while they were being listed.
+            return
+        for task in tasks:
+            self.samples[("waiting", *_await_chain(task.get_coro()))] += 1
+
+    def write_collapsed(self, path: Path) -> None:
+        """
+        Write samples in the collapsed stack format.
+
+        :param path: output file path
+        """
+
+        with open(path, "w") as file:
+            for stack, count in sorted(self.samples.items()):
+                file.write(";".join(stack) + f" {count}\n")
+
+
+def run_profiled(coro: Coroutine[Any, Any, None], path: Path,
+                 profile_format: ProfileFormat) -> None:
+    """
+    Run a coroutine in a new event loop and save its profile.
+
+    The profile is saved even if the coroutine fails.
+
+    :param coro: coroutine to run
+    :param path: output file path
+    :param profile_format: output format
+    """
+
+    with asyncio.Runner() as runner:
+        if profile_format == ProfileFormat.PSTATS:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                runner.run(coro)
+            finally:
+                profiler.disable()
+                profiler.dump_stats(path)
+        else:
+            sampler = StackSampler(runner.get_loop())
+            sampler.start()
+            try:
+                runner.run(coro)
+            finally:
+                sampler.stop()
+                sampler.write_collapsed(path)
@@ -0,0 +1,165 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty
+
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Collection, Sequence
+from typing import Any
+
+import aiohttp
+import pluggy
+import pytest
+
+from how_much_work.core.plugin_api import hook_impl
+from how_much_work.core.types import Package
+from how_much_work.app.depgraph.builder import CrawlMode, DependencyGraph
+from how_much_work.app.depgraph.nodes import NodeStatus
+
+DEPENDENCIES = {
+    "app": ["lib", "util", "missing", "broken", "legacy"],
+    "lib": ["util", "legacy"],
+    "util": [],
+    "broken": [],
+    "legacy": [],
+}
+
+
+def children(pkg: Package) -> list[Package] | None:
+    if pkg.name == "broken":
+        return None
+    return [Package(name=name, repo_name="single" if name == "legacy" else "bulk")
+            for name in DEPENDENCIES[pkg.name]]
+
+
+class BulkRegistry:
+    """
+    Registry answering packages of the "bulk" repository in batches.
+    """
+
+    def __init__(self) -> None:
+        self.batches: list[list[str]] = []
+
+    async def _normalize_batch(self, pkgs: Sequence[Package]) -> list[Package | None]:
+        self.batches.append([pkg.name for pkg in pkgs])
+        return [pkg if pkg.name in DEPENDENCIES else None for pkg in pkgs]
+
+    async def _children_batch(self, pkgs: Sequence[Package]) -> list[list[Package] | None]:
+        self.batches.append([pkg.name for pkg in pkgs])
+        return [children(pkg) for pkg in pkgs]
+
+    @hook_impl
+    def normalize_packages_batch(
+        self, pkgs: Sequence[Package], aiohttp_session: aiohttp.ClientSession
+    ) -> Awaitable[list[Package | None]] | None:
+        if pkgs[0].repo_name == "bulk":
+            return self._normalize_batch(pkgs)
+        return None
+
+    @hook_impl
+    def get_packages_children_batch(
+        self, pkgs: Sequence[Package], aiohttp_session: aiohttp.ClientSession
+    ) -> Awaitable[list[list[Package] | None]] | None:
+        if pkgs[0].repo_name == "bulk":
+            return self._children_batch(pkgs)
+        return None
+
+
+class SingleRegistry:
+    """
+    Registry answering packages of any repository one at a time.
+    """
+
+    async def _normalize(self, pkg: Package) -> Package:
+        return pkg
+
+    async def _children(self, pkg: Package) -> AsyncIterator[Package]:
+        for child in children(pkg) or []:
+            yield child
+
+    @hook_impl(trylast=True)
+    def normalize_package(
+        self, pkg: Package, aiohttp_session: aiohttp.ClientSession
+    ) -> Awaitable[Package]:
+        return self._normalize(pkg)
+
+    @hook_impl(trylast=True)
+    def get_package_children(
+        self, pkg: Package, aiohttp_session: aiohttp.ClientSession
+    ) -> AsyncIterator[Package]:
+        return self._children(pkg)
+
+
+@pytest.mark.asyncio
+async def test_batch_hooks(plugman: pluggy.PluginManager,
+                           session: aiohttp.ClientSession) -> None:
+    bulk = BulkRegistry()
+    plugman.register(bulk)
+    plugman.register(SingleRegistry())
+
+    builder = DependencyGraph(plugman, aiohttp_session=session, mode=CrawlMode.LEVEL,
+                              batch_size=2)
+    await builder.add_depgraphs([Package(name="app", repo_name="bulk")])
+
+    graph = builder.graph
+    assert set(map(str, graph)) == {
+        "app::bulk", "lib::bulk", "util::bulk", "missing::bulk", "broken::bulk",
+        "legacy::single",
+    }
+    assert graph.nodes[Package(name="missing", repo_name="bulk")]["status"] == \
+        NodeStatus.INVALID.status
+    assert graph.nodes[Package(name="broken", repo_name="bulk")]["status"] == \
+        NodeStatus.INCOMPLETE.status
+    assert bulk.batches == [
+        ["app"],  # normalizing roots
+        ["app"],  # fetching children of the first level
+        ["lib", "util"], ["missing", "broken"],  # normalizing them
+        ["lib", "util"], ["broken"],  # second level
+        ["util"],
+    ]
+
+
+class WideRegistry:
+    """
+    Registry of a single package with many children.
+    """
+
+    async def _normalize(self, pkg: Package) -> Package:
+        return pkg
+
+    async def _children(self, pkg: Package) -> AsyncIterator[Package]:
+        if pkg.name == "app":
+            for i in range(20):
+                yield Package(name=f"dep-{i}", repo_name="wide")
+
+    @hook_impl
+    def normalize_package(
+        self, pkg: Package, aiohttp_session: aiohttp.ClientSession
+    ) -> Awaitable[Package]:
+        return self._normalize(pkg)
+
+    @hook_impl
+    def get_package_children(
+        self, pkg: Package, aiohttp_session: aiohttp.ClientSession
+    ) -> AsyncIterator[Package]:
+        return self._children(pkg)
+
+
+@pytest.mark.asyncio
+async def test_level_distromap_bounded(plugman: pluggy.PluginManager,
+                                       session: aiohttp.ClientSession) -> None:
+    plugman.register(WideRegistry())
+    in_flight = max_in_flight = 0
+
+    async def distromap(pkg: Package, **kwargs: Any) -> Collection[Package]:
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.001)
+        in_flight -= 1
+        return frozenset()
+
+    builder = DependencyGraph(plugman, aiohttp_session=session, mode=CrawlMode.LEVEL,
+                              workers=3, pkg_distromap=distromap)
+    await builder.add_depgraphs([Package(name="app", repo_name="wide")])
+    assert builder.graph.number_of_nodes() == 21
+    assert max_in_flight == 3
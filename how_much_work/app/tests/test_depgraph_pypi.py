@@ -1,7 +1,8 @@
 # SPDX-License-Identifier: WTFPL
-# SPDX-FileCopyrightText: 2024-2025 Anna <cyber@sysrq.in>
+# SPDX-FileCopyrightText: 2024-2026 Anna <cyber@sysrq.in>
 # No warranty.
 
+from collections.abc import Collection, Generator
 from typing import Any
 
 import aiohttp
@@ -9,8 +10,10 @@ import pluggy
 import pytest
 import pytest_asyncio
 
+from how_much_work.core.plugin_api import hook_impl
 from how_much_work.core.types import Package
 from how_much_work.app.depgraph.builder import (
+    CrawlMode,
     DependencyGraph,
     NodeStatus,
 )
@@ -22,6 +25,29 @@ except ImportError:
     HAS_PYPI_PLUGIN = False
 
 
+class CallRecorder:
+    """
+    Plugin recording packages passed to registry hooks and distromap.
+    """
+
+    def __init__(self) -> None:
+        self.calls: list[tuple[str, Package]] = []
+
+    @hook_impl(wrapper=True)
+    def normalize_package(self, pkg: Package) -> Generator[None, Any, Any]:
+        self.calls.append(("normalize", pkg))
+        return (yield)
+
+    @hook_impl(wrapper=True)
+    def get_package_children(self, pkg: Package) -> Generator[None, Any, Any]:
+        self.calls.append(("children", pkg))
+        return (yield)
+
+    async def distromap(self, pkg: Package, **kwargs: Any) -> Collection[Package]:
+        self.calls.append(("distromap", pkg))
+        return frozenset()
+
+
 @pytest_asyncio.fixture(scope="function")
 async def builder(
     request: pytest.FixtureRequest,
@@ -74,3 +100,63 @@ class TestDepgraphPypi:
         dep = Package(name="urllib3", repo_name="pypi")
         assert dep in graph
         assert graph.nodes[dep].get("status") == NodeStatus.INCOMPLETE.status
+
+    @pytest.mark.vcr
+    @pytest.mark.default_cassette("TestDepgraphPypi.test_depgraph_maxdepth.yaml")
+    @pytest.mark.builder_args(maxdepth=2, mode=CrawlMode.LEVEL, workers=4)
+    async def test_depgraph_level(self, builder: DependencyGraph):
+        pkg = Package(name="requests", repo_name="pypi")
+        await builder.add_depgraph(pkg)
+
+        graph = builder.graph
+        dep = Package(name="urllib3", repo_name="pypi")
+        assert (pkg, dep) in graph.edges
+        assert graph.nodes[dep].get("status") == NodeStatus.INCOMPLETE.status
+
+    @pytest.mark.vcr
+    @pytest.mark.default_cassette("TestDepgraphPypi.test_depgraph_maxdepth.yaml")
+    @pytest.mark.builder_args(
+        maxdepth=2, pkg_prefilter=lambda pkg: pkg.condition != 'extra == "socks"'
+    )
+    async def test_depgraph_prefilter(self, builder: DependencyGraph):
+        pkg = Package(name="requests", repo_name="pypi")
+        await builder.add_depgraph(pkg)
+
+        graph = builder.graph
+        assert Package(name="urllib3", repo_name="pypi") in graph
+        assert pkg.model_copy(update={"condition": 'extra == "socks"'}) not in graph
+
+    @pytest.mark.vcr
+    @pytest.mark.default_cassette("TestDepgraphPypi.test_depgraph_maxdepth.yaml")
+    async def test_depgraph_prefilter_calls(self, plugman: pluggy.PluginManager,
+                                            session: aiohttp.ClientSession):
+        recorder = CallRecorder()
+        plugman.register(how_much_work.plugins.pypi)
+        plugman.register(recorder)
+        builder = DependencyGraph(
+            plugman, aiohttp_session=session, maxdepth=2,
+            pkg_prefilter=lambda pkg: pkg.condition != 'extra == "socks"',
+            pkg_distromap=recorder.distromap
+        )
+
+        pkg = Package(name="requests", repo_name="pypi")
+        await builder.add_depgraph(pkg)
+
+        # Pruned subtrees make no registry or distromap calls.
+        assert ("children", pkg) in recorder.calls
+        assert ("distromap", pkg) in recorder.calls
+        assert [(hook, called) for hook, called in recorder.calls
+                if called.condition == 'extra == "socks"'] == []
+
+    @pytest.mark.vcr
+    @pytest.mark.default_cassette("TestDepgraphPypi.test_depgraph_maxdepth.yaml")
+    @pytest.mark.builder_args(maxdepth=2)
+    async def test_depgraph_multiroot(self, builder: DependencyGraph):
+        pkg = Package(name="requests", repo_name="pypi")
+        dep = Package(name="certifi", repo_name="pypi")
+        await builder.add_depgraphs([pkg, dep])
+
+        assert builder.roots == [pkg, dep]
+        reachability = builder.reachability()
+        assert dep in reachability[pkg]
+        assert pkg not in reachability[dep]
@@ -0,0 +1,47 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty.
+
+import subprocess
+import sys
+
+# Top-level packages that must not be imported before a command is run.
+HEAVY_MODULES = frozenset({
+    "aiohttp",
+    "asyncio",
+    "lru",
+    "networkx",
+    "poetry",
+    "pydantic",
+    "pygraphviz",
+    "repology_client",
+})
+
+
+def import_times(module: str) -> dict[str, int]:
+    """
+    Import a module in a fresh interpreter.
+
+    :returns: cumulative import times (in microseconds) of all imported
+        modules
+    """
+
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, check=True, text=True
+    )
+
+    result: dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        if cumulative.strip().isdigit():
+            result[name.strip()] = int(cumulative)
+    return result
+
+
+def test_cli_startup_imports():
+    times = import_times("how_much_work.app.__main__")
+    imported = {name.partition(".")[0] for name in times}
+    assert imported.isdisjoint(HEAVY_MODULES), imported & HEAVY_MODULES
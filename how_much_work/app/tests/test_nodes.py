@@ -0,0 +1,28 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty.
+
+from how_much_work.core.types import Package
+from how_much_work.app.depgraph.nodes import NodeStatus, NodeTable
+
+
+def test_node_table():
+    table = NodeTable()
+    parent = Package(name="parent", repo_name="example")
+    child = Package(name="child", repo_name="example", condition="x")
+    skipped = Package(name="skipped", repo_name="example")
+
+    table.mark_visited(skipped)
+    table.add_edge(parent, child)
+    table.add_edge(parent, child)
+    table.set_status(child, NodeStatus.INVALID)
+
+    assert len(table) == 3
+    assert table.is_visited(skipped)
+    assert skipped not in table
+    assert table.intern(child) == table.intern(child.model_copy())
+
+    graph = table.to_networkx()
+    assert list(graph.nodes) == [parent, child]
+    assert list(graph.edges) == [(parent, child)]
+    assert graph.nodes[child] == {"status": "invalid", "fillcolor": "red"}
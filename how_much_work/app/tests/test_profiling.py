@@ -0,0 +1,32 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty
+
+import asyncio
+import pstats
+from pathlib import Path
+
+from how_much_work.app.profiling import ProfileFormat, run_profiled
+
+
+async def sleeper() -> None:
+    await asyncio.sleep(0.1)
+
+
+async def workload() -> None:
+    await asyncio.gather(sleeper(), sleeper())
+
+
+def test_profile_pstats(tmp_path: Path):
+    path = tmp_path / "profile.pstats"
+    run_profiled(workload(), path, ProfileFormat.PSTATS)
+    stats = pstats.Stats(str(path))
+    assert "sleeper" in stats.get_stats_profile().func_profiles
+
+
+def test_profile_collapsed(tmp_path: Path):
+    path = tmp_path / "profile.txt"
+    run_profiled(workload(), path, ProfileFormat.COLLAPSED)
+    lines = path.read_text().splitlines()
+    assert any(line.startswith("waiting;sleeper (test_profiling.py:")
+               for line in lines)
@@ -0,0 +1,125 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty
+
+import asyncio
+from collections import Counter
+from collections.abc import AsyncIterator, Awaitable
+
+import aiohttp
+import pluggy
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+import how_much_work.plugins.pypi
+from how_much_work.core.options import MainOptions
+from how_much_work.core.plugin_api import hook_impl
+from how_much_work.core.types import Package
+from how_much_work.plugins.pypi.options import plugin_options
+from how_much_work.app.depgraph.server import DepgraphServer
+
+DEPENDENCIES = {
+    "app": ["lib", "util"],
+    "lib": ["util"],
+    "util": [],
+}
+
+
+class FakeRegistry:
+    def __init__(self) -> None:
+        self.fetches: Counter[str] = Counter()
+
+    async def _normalize(self, pkg: Package) -> Package:
+        return pkg
+
+    async def _children(self, pkg: Package) -> AsyncIterator[Package]:
+        self.fetches[pkg.name] += 1
+        await asyncio.sleep(0.01)
+        for name in DEPENDENCIES[pkg.name]:
+            yield Package(name=name, repo_name="fake")
+
+    @hook_impl
+    def normalize_package(
+        self, pkg: Package, aiohttp_session: aiohttp.ClientSession
+    ) -> Awaitable[Package]:
+        return self._normalize(pkg)
+
+    @hook_impl
+    def get_package_children(
+        self, pkg: Package, aiohttp_session: aiohttp.ClientSession
+    ) -> AsyncIterator[Package]:
+        return self._children(pkg)
+
+
+@pytest.mark.asyncio
+@pytest.mark.block_network(allowed_hosts=["127.0.0.1"])
+async def test_serve_depgraph(plugman: pluggy.PluginManager,
+                              session: aiohttp.ClientSession) -> None:
+    registry = FakeRegistry()
+    plugman.register(registry)
+    server = DepgraphServer(plugman, MainOptions(from_repo="fake"), session)
+
+    async with TestClient(TestServer(server.make_app())) as client:
+        responses = await asyncio.gather(
+            client.get("/depgraph", params={"package": "app"}),
+            client.get("/depgraph", params={"package": "app"}),
+            client.post("/depgraph", json={"packages": ["lib"], "max_depth": 1}),
+        )
+        first, second, third = [await response.json() for response in responses]
+
+        assert first == second
+        assert first["roots"] == ["app::fake"]
+        assert len(first["nodes"]) == 3
+        assert {"source": "lib::fake", "target": "util::fake"} in first["edges"]
+        assert third["nodes"] == [
+            {"id": "lib::fake", "name": "lib", "repo_name": "fake",
+             "status": "incomplete"},
+        ]
+        assert registry.fetches["app"] == 1
+
+        response = await client.get("/depgraph", params={"max_depth": "0"})
+        assert response.status == 400
+
+        response = await client.get("/metrics")
+        assert 'how_much_work_queries_total{result="coalesced"}' in await response.text()
+
+
+@pytest.mark.asyncio
+@pytest.mark.block_network(allowed_hosts=["127.0.0.1"])
+async def test_serve_revalidates(plugman: pluggy.PluginManager,
+                                 session: aiohttp.ClientSession,
+                                 monkeypatch: pytest.MonkeyPatch) -> None:
+    requests: list[tuple[str, int]] = []
+
+    async def project_json(request: web.Request) -> web.Response:
+        name = request.match_info["name"]
+        if request.headers.get("If-None-Match") == f'"{name}"':
+            requests.append((name, 304))
+            return web.Response(status=304)
+        requests.append((name, 200))
+        requires = ["serve-lib"] if name == "serve-app" else []
+        return web.json_response({"info": {"name": name, "requires_dist": requires}},
+                                 headers={"ETag": f'"{name}"'})
+
+    index = web.Application()
+    index.router.add_get("/pypi/{name}/json", project_json)
+
+    plugman.register(how_much_work.plugins.pypi)
+    server = DepgraphServer(plugman, MainOptions(from_repo="pypi"), session)
+    async with (
+        TestServer(index) as index_server,
+        TestClient(TestServer(server.make_app())) as client,
+    ):
+        monkeypatch.setattr(plugin_options, "index_url", str(index_server.make_url("/")))
+        monkeypatch.setattr(plugin_options, "cache_ttl", 0.5)
+
+        for _ in range(2):
+            response = await client.get("/depgraph", params={"package": "serve-app"})
+            assert len((await response.json())["nodes"]) == 2
+        assert requests == [("serve-app", 200), ("serve-lib", 200)]
+
+        await asyncio.sleep(0.6)
+        response = await client.get("/depgraph", params={"package": "serve-app"})
+        assert len((await response.json())["nodes"]) == 2
+        assert requests[2:] == [("serve-app", 304), ("serve-lib", 304)]
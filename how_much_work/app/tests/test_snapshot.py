@@ -0,0 +1,131 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty.
+
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+import aiohttp
+import pluggy
+import pytest
+
+from how_much_work.core.exceptions import PackageValidationError
+from how_much_work.core.plugin_api import hook_impl
+from how_much_work.core.types import Package
+from how_much_work.app.depgraph.builder import CrawlMode, DependencyGraph
+from how_much_work.app.depgraph.nodes import NodeStatus
+from how_much_work.app.depgraph.snapshot import Snapshot
+
+
+class FakeRegistry:
+    """
+    Registry with predefined dependencies and metadata versions.
+    """
+
+    def __init__(self, deps: dict[str, list[str]]):
+        self.deps = deps
+        self.validators = dict.fromkeys(deps, "1")
+        self.options = "default"
+        self.failing: set[str] = set()
+        self.fetched: list[str] = []
+
+    @hook_impl
+    async def normalize_package(self, pkg: Package,
+                                aiohttp_session: aiohttp.ClientSession) -> Package:
+        if pkg.name in self.failing:
+            raise PackageValidationError(pkg)
+        return pkg
+
+    @hook_impl
+    async def get_package_children(
+        self, pkg: Package, aiohttp_session: aiohttp.ClientSession
+    ) -> AsyncIterator[Package]:
+        self.fetched.append(pkg.name)
+        for name in self.deps[pkg.name]:
+            yield Package(name=name, repo_name="fake")
+
+    @hook_impl
+    async def get_package_validator(
+        self, pkg: Package, previous: str | None,
+        aiohttp_session: aiohttp.ClientSession
+    ) -> str | None:
+        return self.validators[pkg.name]
+
+    @hook_impl
+    def get_registry_options_fingerprint(self) -> str:
+        return self.options
+
+
+@pytest.mark.asyncio
+async def test_incremental_rebuild(plugman: pluggy.PluginManager,
+                                   session: aiohttp.ClientSession,
+                                   tmp_path: Path):
+    registry = FakeRegistry({"a": ["b", "c"], "b": ["d"], "c": [], "d": []})
+    plugman.register(registry)
+    root = Package(name="a", repo_name="fake")
+
+    builder = DependencyGraph(plugman, aiohttp_session=session, record=True)
+    await builder.add_depgraph(root)
+    builder.snapshot().save(tmp_path / "snapshot.json")
+    assert sorted(registry.fetched) == ["a", "b", "c", "d"]
+
+    registry.deps["c"] = ["e"]
+    registry.deps["e"] = []
+    registry.validators |= {"c": "2", "e": "1"}
+    registry.fetched.clear()
+
+    snapshot = Snapshot.load(tmp_path / "snapshot.json")
+    builder = DependencyGraph(plugman, aiohttp_session=session,
+                              snapshot=snapshot, record=True)
+    await builder.add_depgraph(root)
+    assert sorted(registry.fetched) == ["c", "e"]
+    assert (Package(name="c", repo_name="fake"),
+            Package(name="e", repo_name="fake")) in builder.graph.edges
+
+    snapshot = builder.snapshot()
+    assert snapshot.roots == [root]
+    assert len(snapshot.edges) == 4
+
+
+@pytest.mark.asyncio
+async def test_options_mismatch(plugman: pluggy.PluginManager,
+                                session: aiohttp.ClientSession):
+    registry = FakeRegistry({"a": ["b"], "b": []})
+    plugman.register(registry)
+    root = Package(name="a", repo_name="fake")
+
+    builder = DependencyGraph(plugman, aiohttp_session=session, record=True)
+    await builder.add_depgraph(root)
+    snapshot = builder.snapshot()
+
+    registry.options = "filtered"
+    registry.fetched.clear()
+    builder = DependencyGraph(plugman, aiohttp_session=session, snapshot=snapshot)
+    await builder.add_depgraph(root)
+    assert sorted(registry.fetched) == ["a", "b"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", list(CrawlMode))
+async def test_invalid_child_retried(plugman: pluggy.PluginManager,
+                                     session: aiohttp.ClientSession,
+                                     tmp_path: Path, mode: CrawlMode):
+    registry = FakeRegistry({"a": ["b"], "b": []})
+    registry.failing.add("b")
+    plugman.register(registry)
+    root = Package(name="a", repo_name="fake")
+    child = Package(name="b", repo_name="fake")
+
+    builder = DependencyGraph(plugman, aiohttp_session=session, mode=mode, record=True)
+    await builder.add_depgraph(root)
+    assert builder.graph.nodes[child]["status"] == NodeStatus.INVALID.status
+    builder.snapshot().save(tmp_path / "snapshot.json")
+
+    # The failure was transient.
+    registry.failing.clear()
+    registry.fetched.clear()
+    builder = DependencyGraph(plugman, aiohttp_session=session, mode=mode,
+                              snapshot=Snapshot.load(tmp_path / "snapshot.json"))
+    await builder.add_depgraph(root)
+    assert builder.graph.nodes[child].get("status") is None
+    assert registry.fetched == ["b"]
@@ -0,0 +1,107 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty
+
+import asyncio
+import json
+from collections.abc import AsyncIterator, Awaitable
+from pathlib import Path
+
+import aiohttp
+import pluggy
+import pytest
+
+from how_much_work.core.plugin_api import hook_impl
+from how_much_work.core.types import Package
+from how_much_work.app.depgraph.builder import DependencyGraph
+from how_much_work.app.depgraph.tracing import Phase, Tracer
+
+DEPENDENCIES = {
+    "root": ["lib"],
+    "lib": ["leaf"],
+    "leaf": [],
+}
+
+
+class SlowRegistry:
+    async def _normalize(self, pkg: Package) -> Package:
+        await asyncio.sleep(0.01)
+        return pkg
+
+    async def _children(self, pkg: Package) -> AsyncIterator[Package]:
+        await asyncio.sleep(0.01)
+        for name in DEPENDENCIES[pkg.name]:
+            yield Package(name=name, repo_name="slow")
+
+    @hook_impl
+    def normalize_package(
+        self, pkg: Package, aiohttp_session: aiohttp.ClientSession
+    ) -> Awaitable[Package]:
+        return self._normalize(pkg)
+
+    @hook_impl
+    def get_package_children(
+        self, pkg: Package, aiohttp_session: aiohttp.ClientSession
+    ) -> AsyncIterator[Package]:
+        return self._children(pkg)
+
+
+class RecordingTracer(Tracer):
+    def __init__(self) -> None:
+        super().__init__()
+        self.spans: dict[tuple[str, Phase], tuple[float, float]] = {}
+
+    def record(self, pkg: Package, phase: Phase, start: float, end: float, *,
+               parent: Package | None = None) -> None:
+        super().record(pkg, phase, start, end, parent=parent)
+        self.spans[pkg.name, phase] = (start, end)
+
+
+def test_critical_path(tmp_path: Path):
+    root = Package(name="root", repo_name="pypi")
+    fast = Package(name="fast", repo_name="pypi")
+    slow = Package(name="slow", repo_name="pypi")
+    leaf = Package(name="leaf", repo_name="pypi")
+
+    tracer = Tracer()
+    tracer.record(root, Phase.FETCH, 0.0, 1.0)
+    tracer.record(root, Phase.EXPAND, 0.0, 6.0)
+    tracer.record(fast, Phase.NORMALIZE, 1.0, 1.5, parent=root)
+    tracer.record(fast, Phase.FETCH, 1.5, 2.0)
+    tracer.record(slow, Phase.NORMALIZE, 1.0, 3.0, parent=root)
+    tracer.record(slow, Phase.FETCH, 3.0, 4.0)
+    tracer.record(leaf, Phase.NORMALIZE, 4.5, 5.0, parent=slow)
+    tracer.record(leaf, Phase.FETCH, 5.0, 6.0)
+
+    steps = tracer.critical_path()
+    assert [step.package for step in steps] == [root, slow, leaf]
+    assert steps[2].wait == 0.5
+    assert steps[1].phases == {Phase.NORMALIZE: 2.0, Phase.FETCH: 1.0}
+    assert tracer.summary().startswith("Critical path: 3 packages, 6.000s")
+
+    path = tmp_path / "trace.json"
+    tracer.save(path)
+    events = json.loads(path.read_text())["traceEvents"]
+    spans = [event for event in events if event["ph"] == "X"]
+    assert len(spans) == 4 + 8
+    assert {event["name"] for event in spans
+            if event["cat"] == "package" and event["args"]["critical"]} == {
+        str(root), str(slow), str(leaf),
+    }
+    flows = [event for event in events if event["ph"] in ("s", "f")]
+    assert len(flows) == 6
+
+
+@pytest.mark.asyncio
+async def test_expand_encloses_children(plugman: pluggy.PluginManager,
+                                        session: aiohttp.ClientSession):
+    plugman.register(SlowRegistry())
+    tracer = RecordingTracer()
+    builder = DependencyGraph(plugman, aiohttp_session=session, tracer=tracer)
+    await builder.add_depgraphs([Package(name="root", repo_name="slow")])
+
+    for parent, child in [("root", "lib"), ("lib", "leaf")]:
+        start, end = tracer.spans[parent, Phase.EXPAND]
+        for phase in (Phase.NORMALIZE, Phase.FETCH, Phase.EXPAND):
+            child_start, child_end = tracer.spans[child, phase]
+            assert start <= child_start <= child_end <= end
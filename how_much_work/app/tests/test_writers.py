@@ -0,0 +1,45 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty.
+
+import io
+import json
+from pathlib import Path
+
+import networkx as nx
+
+from how_much_work.core.types import Package
+from how_much_work.app.depgraph.nodes import NodeStatus, NodeTable
+from how_much_work.app.depgraph.writers import DotWriter, JsonLinesWriter
+
+PARENT = Package(name="a", repo_name="pypi")
+CHILD = Package(name="b", repo_name="pypi", condition='extra == "x"')
+
+
+def test_jsonl_writer():
+    output = io.StringIO()
+    table = NodeTable(JsonLinesWriter(output))
+    table.add_edge(PARENT, CHILD)
+    table.add_edge(PARENT, CHILD)
+    table.set_status(CHILD, NodeStatus.INCOMPLETE)
+    table.set_status(CHILD, NodeStatus.INCOMPLETE)
+
+    events = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [event["event"] for event in events] == ["node", "node", "edge", "status"]
+    assert events[1]["condition"] == CHILD.condition
+    assert events[2] == {"event": "edge", "source": str(PARENT), "target": str(CHILD)}
+
+
+def test_dot_writer(tmp_path: Path):
+    path = tmp_path / "graph.dot"
+    with open(path, "w") as output:
+        writer = DotWriter(output)
+        writer.start()
+        table = NodeTable(writer)
+        table.add_edge(PARENT, CHILD)
+        table.set_status(CHILD, NodeStatus.INVALID)
+        writer.finish()
+
+    graph = nx.nx_agraph.read_dot(path)
+    assert (str(PARENT), str(CHILD)) in graph.edges
+    assert graph.nodes[str(CHILD)]["status"] == NodeStatus.INVALID.status
@@ -0,0 +1,223 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty
+
+"""
+Adaptive per-host concurrency control for HTTP requests.
+"""
+
+import asyncio
+import time
+from collections import deque
+from collections.abc import Mapping
+from types import SimpleNamespace
+
+import aiohttp
+from pydantic import BaseModel, ConfigDict, Field
+
+#: HTTP status codes signalling server overload.
+OVERLOAD_STATUSES = frozenset({429, 503})
+
+#: Latency increase (relative to the baseline) treated as congestion.
+LATENCY_TOLERANCE = 2.0
+
+#: Weight of the latest sample in the latency moving average.
+LATENCY_SMOOTHING = 0.2
+
+
+class HostLimit(BaseModel):
+    """
+    Concurrency limits for a single host.
+    """
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
+    #: Number of parallel requests to start with.
+    initial: int = Field(default=4, ge=1)
+
+    #: Upper bound for the number of parallel requests.
+    maximum: int = Field(default=16, ge=1)
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limiter using the AIMD (additive increase, multiplicative
+    decrease) algorithm.
+
+    The limit grows by one after a full window of healthy responses and is
+    halved on overload responses, connection errors and latency spikes, at
+    most once per window.
+    """
+
+    def __init__(self, limits: HostLimit):
+        """
+        :param limits: concurrency limits
+        """
+
+        self._maximum = max(limits.initial, limits.maximum)
+        self._limit = float(limits.initial)
+        self._in_flight = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+
+        self._latency: float | None = None
+        self._baseline: float | None = None
+        self._last_decrease = -float("inf")
+
+    @property
+    def limit(self) -> int:
+        """
+        Current number of allowed parallel requests.
+        """
+
+        return max(1, int(self._limit))
+
+    @property
+    def in_flight(self) -> int:
+        """
+        Current number of running requests.
+        """
+
+        return self._in_flight
+
+    async def acquire(self) -> None:
+        """
+        Wait until a request is allowed to start.
+        """
+
+        if self._in_flight < self.limit and not self._waiters:
+            self._in_flight += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was granted right before cancellation.
+                self._in_flight -= 1
+                self._wake_up()
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self, *, status: int | None = None,
+                latency: float | None = None, failed: bool = False) -> None:
+        """
+        Finish a request and adjust the limit.
+
+        :param status: HTTP response status
+        :param latency: time to response headers in seconds
+        :param failed: whether the request failed on the network level
+        """
+
+        self._in_flight -= 1
+        if failed or status in OVERLOAD_STATUSES:
+            self._decrease()
+        elif latency is not None:
+            self._observe_latency(latency)
+        self._wake_up()
+
+    def _observe_latency(self, latency: float) -> None:
+        if self._latency is None or self._baseline is None:
+            self._latency = self._baseline = latency
+            return
+
+        self._latency += LATENCY_SMOOTHING * (latency - self._latency)
+        if self._latency < self._baseline:
+            self._baseline = self._latency
+        else:
+            # Let the baseline follow slow drifts.
+            self._baseline += LATENCY_SMOOTHING ** 3 * (self._latency - self._baseline)
+
+        if self._latency > self._baseline * LATENCY_TOLERANCE:
+            self._decrease()
+        else:
+            self._limit = min(self._maximum, self._limit + 1 / self._limit)
+
+    def _decrease(self) -> None:
+        now = time.monotonic()
+        window = self._latency or 1.0
+        if now - self._last_decrease < window:
+            return
+
+        self._limit = max(1.0, self._limit / 2)
+        self._last_decrease = now
+
+    def _wake_up(self) -> None:
+        while self._waiters and self._in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._in_flight += 1
+                waiter.set_result(None)
+
+
+class ConcurrencyController:
+    """
+    Per-host concurrency control shared by all HTTP requests of a session.
+    """
+
+    def __init__(self, default: HostLimit | None = None,
+                 hosts: Mapping[str, HostLimit] | None = None):
+        """
+        :param default: limits for hosts not listed in ``hosts``
+        :param hosts: per-host limits
+        """
+
+        self._default = default or HostLimit()
+        self._host_limits = dict(hosts or {})
+        self._limiters: dict[str, AdaptiveLimiter] = {}
+
+    def limiter(self, host: str) -> AdaptiveLimiter:
+        """
+        Get a limiter for the given host.
+
+        :param host: host name
+        """
+
+        if (limiter := self._limiters.get(host)) is None:
+            limits = self._host_limits.get(host, self._default)
+            limiter = self._limiters[host] = AdaptiveLimiter(limits)
+        return limiter
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """
+        Make a trace config that makes requests wait for their host's limiter.
+
+        The slot is held until response headers are received.
+        """
+
+        async def on_request_start(session: aiohttp.ClientSession,
+                                   ctx: SimpleNamespace,
+                                   params: aiohttp.TraceRequestStartParams) -> None:
+            ctx.limiter = self.limiter(params.url.host or "")
+            await ctx.limiter.acquire()
+            ctx.start = time.monotonic()
+
+        async def on_request_end(session: aiohttp.ClientSession,
+                                 ctx: SimpleNamespace,
+                                 params: aiohttp.TraceRequestEndParams) -> None:
+            ctx.limiter.release(status=params.response.status,
+                                latency=time.monotonic() - ctx.start)
+
+        async def on_request_exception(session: aiohttp.ClientSession,
+                                       ctx: SimpleNamespace,
+                                       params: aiohttp.TraceRequestExceptionParams) -> None:
+            if not hasattr(ctx, "start"):
+                # The slot was never acquired.
+                return
+
+            err = params.exception
+            if isinstance(err, aiohttp.ClientResponseError):
+                ctx.limiter.release(status=err.status,
+                                    latency=time.monotonic() - ctx.start)
+            else:
+                ctx.limiter.release(
+                    failed=isinstance(err, (aiohttp.ClientConnectionError,
+                                            asyncio.TimeoutError))
+                )
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        return trace_config
@@ -0,0 +1,394 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty
+
+"""
+Runtime metrics: counters, gauges and latency histograms.
+
+Recording a value is a dictionary lookup and an addition, so metrics are
+always collected.
+"""
+
+import asyncio
+import bisect
+import contextlib
+import json
+import math
+import os
+import tempfile
+import time
+from collections.abc import AsyncIterator, Iterator
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import aiohttp
+
+from how_much_work.core.constants import PACKAGE
+
+#: Upper bounds of histogram buckets, in seconds.
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+#: Prefix of metric names in the Prometheus format.
+PROMETHEUS_PREFIX = PACKAGE.replace("-", "_") + "_"
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class Gauge:
+    """
+    Value going up and down, with its maximum remembered.
+    """
+
+    def __init__(self) -> None:
+        #: Current value.
+        self.value = 0
+
+        #: Maximum value.
+        self.max = 0
+
+    def inc(self) -> None:
+        self.value += 1
+        if self.value > self.max:
+            self.max = self.value
+
+    def dec(self) -> None:
+        self.value -= 1
+
+    @contextlib.contextmanager
+    def track(self) -> Iterator[None]:
+        """
+        Increase the value for the duration of a block.
+        """
+
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+
+class Histogram:
+    """
+    Distribution of observed values over fixed buckets.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        """
+        :param buckets: sorted upper bounds of buckets
+        """
+
+        self.buckets = buckets
+
+        #: Number of observations in each bucket, the last one is unbounded.
+        self.counts = [0] * (len(buckets) + 1)
+
+        #: Sum of all observed values.
+        self.sum = 0.0
+
+        #: Number of observations.
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile as the upper bound of its bucket.
+
+        >>> hist = Histogram((1.0, 2.0, 3.0))
+        >>> for value in (0.5, 1.5, 1.5, 2.5):
+        ...     hist.observe(value)
+        >>> hist.quantile(0.5)
+        2.0
+        >>> hist.quantile(1)
+        3.0
+
+        :param q: quantile between 0 and 1
+
+        :returns: estimated value, ``inf`` if it's above all buckets
+        """
+
+        if self.count == 0:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+def _get_umask() -> int:
+    # The only way to read the umask is to change it.
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+def _format_value(value: float) -> str:
+    """
+    Format a sample value without losing precision.
+
+    >>> _format_value(12345678)
+    '12345678'
+    >>> _format_value(1234567.891)
+    '1234567.891'
+    >>> _format_value(float("inf"))
+    '+Inf'
+    """
+
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value))
+
+
+def _labels(labels: dict[str, str]) -> Labels:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels: Labels, **extra: str) -> str:
+    items = [*labels, *extra.items()]
+    if not items:
+        return ""
+    # Label values are host names and identifiers, escape just in case.
+    return "{" + ",".join(f'{key}="{json.dumps(value)[1:-1]}"'
+                          for key, value in items) + "}"
+
+
+class Metrics:
+    """
+    Registry of named metrics with labels.
+    """
+
+    def __init__(self) -> None:
+        self._counters: dict[tuple[str, Labels], float] = {}
+        self._gauges: dict[tuple[str, Labels], Gauge] = {}
+        self._histograms: dict[tuple[str, Labels], Histogram] = {}
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        """
+        Increase a counter.
+
+        :param name: metric name
+        :param value: increment
+        :param labels: metric labels
+        """
+
+        key = (name, _labels(labels))
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def gauge(self, name: str, **labels: str) -> Gauge:
+        """
+        Get a gauge, creating it if needed.
+
+        :param name: metric name
+        :param labels: metric labels
+        """
+
+        key = (name, _labels(labels))
+        if (result := self._gauges.get(key)) is None:
+            result = self._gauges[key] = Gauge()
+        return result
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """
+        Add a value to a histogram.
+
+        :param name: metric name
+        :param value: observed value
+        :param labels: metric labels
+        """
+
+        key = (name, _labels(labels))
+        if (hist := self._histograms.get(key)) is None:
+            hist = self._histograms[key] = Histogram()
+        hist.observe(value)
+
+    @contextlib.contextmanager
+    def timer(self, name: str, **labels: str) -> Iterator[None]:
+        """
+        Observe the duration of a block in seconds, including failed ones.
+
+        :param name: metric name
+        :param labels: metric labels
+        """
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    @contextlib.asynccontextmanager
+    async def monitor_loop_lag(self, interval: float = 0.05) -> AsyncIterator[None]:
+        """
+        Observe event loop lag in the ``event_loop_lag_seconds`` histogram
+        for the duration of a block.
+
+        Lag is how late a timer set every ``interval`` seconds fires, which
+        is how long other callbacks blocked the loop.
+
+        :param interval: number of seconds between measurements
+        """
+
+        loop = asyncio.get_running_loop()
+
+        async def monitor() -> None:
+            while True:
+                start = loop.time()
+                await asyncio.sleep(interval)
+                self.observe("event_loop_lag_seconds",
+                             max(loop.time() - start - interval, 0.0))
+
+        task = asyncio.create_task(monitor())
+        try:
+            yield
+        finally:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """
+        Make a trace config that records per-host HTTP metrics.
+
+        Request latency is measured until response headers are received. If
+        the session has a concurrency controller, time spent waiting for it
+        is only included when this trace config is added before it.
+        """
+
+        async def on_request_start(session: aiohttp.ClientSession,
+                                   ctx: SimpleNamespace,
+                                   params: aiohttp.TraceRequestStartParams) -> None:
+            ctx.host = params.url.host or ""
+            ctx.start = time.perf_counter()
+            ctx.in_flight = self.gauge("http_requests_in_flight", host=ctx.host)
+            ctx.in_flight.inc()
+
+        async def on_request_end(session: aiohttp.ClientSession,
+                                 ctx: SimpleNamespace,
+                                 params: aiohttp.TraceRequestEndParams) -> None:
+            ctx.in_flight.dec()
+            self.inc("http_requests_total", host=ctx.host,
+                     status=str(params.response.status))
+            self.observe("http_request_seconds", time.perf_counter() - ctx.start,
+                         host=ctx.host)
+
+        async def on_request_exception(session: aiohttp.ClientSession,
+                                       ctx: SimpleNamespace,
+                                       params: aiohttp.TraceRequestExceptionParams) -> None:
+            ctx.in_flight.dec()
+            self.inc("http_requests_total", host=ctx.host,
+                     status=type(params.exception).__name__)
+
+        async def on_response_chunk_received(
+            session: aiohttp.ClientSession, ctx: SimpleNamespace,
+            params: aiohttp.TraceResponseChunkReceivedParams
+        ) -> None:
+            self.inc("http_response_bytes_total", len(params.chunk),
+                     host=params.url.host or "")
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        trace_config.on_response_chunk_received.append(on_response_chunk_received)
+        return trace_config
+
+    def to_json(self) -> dict[str, Any]:
+        """
+        :returns: all metrics as a JSON-serializable object
+        """
+
+        return {
+            "counters": [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ],
+            "gauges": [
+                {"name": name, "labels": dict(labels), "value": gauge.value,
+                 "max": gauge.max}
+                for (name, labels), gauge in sorted(self._gauges.items())
+            ],
+            "histograms": [
+                {"name": name, "labels": dict(labels), "count": hist.count,
+                 "sum": hist.sum, "p50": hist.quantile(0.5),
+                 "p90": hist.quantile(0.9), "p99": hist.quantile(0.99)}
+                for (name, labels), hist in sorted(self._histograms.items())
+            ],
+        }
+
+    def to_prometheus(self) -> str:
+        """
+        :returns: all metrics in the Prometheus text exposition format
+        """
+
+        lines: list[str] = []
+        seen: set[str] = set()
+
+        def add_type(name: str, kind: str) -> None:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(self._counters.items()):
+            name = PROMETHEUS_PREFIX + name
+            add_type(name, "counter")
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        for (name, labels), gauge in sorted(self._gauges.items()):
+            name = PROMETHEUS_PREFIX + name
+            add_type(name, "gauge")
+            lines.append(f"{name}{_format_labels(labels)} {gauge.value}")
+            add_type(name + "_max", "gauge")
+            lines.append(f"{name}_max{_format_labels(labels)} {gauge.max}")
+
+        for (name, labels), hist in sorted(self._histograms.items()):
+            name = PROMETHEUS_PREFIX + name
+            add_type(name, "histogram")
+            cumulative = 0
+            for bound, count in zip((*hist.buckets, "+Inf"), hist.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels, le=str(bound))} "
+                             f"{cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(hist.sum)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {hist.count}")
+
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: Path) -> None:
+        """
+        Atomically write metrics in the Prometheus format, as expected by
+        the node exporter's textfile collector.
+
+        :param path: output file path
+        """
+
+        file = tempfile.NamedTemporaryFile("w", dir=path.parent, prefix=path.name,
+                                           suffix=".tmp", delete=False)
+        try:
+            with file:
+                file.write(self.to_prometheus())
+                # Temporary files are only readable by the owner, while the
+                # exporter usually runs as another user.
+                os.fchmod(file.fileno(), 0o644 & ~_get_umask())
+            os.replace(file.name, path)
+        except BaseException:
+            os.unlink(file.name)
+            raise
+
+
+#: Metrics of the current process.
+metrics = Metrics()
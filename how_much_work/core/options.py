@@ -6,12 +6,14 @@
 Command line options object.
 """
 
+import asyncio
 import aiohttp
 from collections.abc import Awaitable, Callable, Collection
 from typing import Any
 
 from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
 
+from how_much_work.core.concurrency import HostLimit
 from how_much_work.core.types import Package
 
 
@@ -39,6 +41,9 @@ class MainOptions(OptionsBase):
     _pkg_filters: list[
         Callable[[Package], bool]
     ] = PrivateAttr(default_factory=list)
+    _pkg_prefilters: list[
+        Callable[[Package], bool]
+    ] = PrivateAttr(default_factory=list)
     _pkg_distromaps: list[
         Callable[..., Awaitable[Collection[Package]]]
     ] = PrivateAttr(default_factory=list)
@@ -49,14 +54,26 @@ class MainOptions(OptionsBase):
     #: Target repository name.
     to_repo: str = ""
 
-    def add_pkg_filter(self, filter_func: Callable[[Package], bool]) -> None:
+    #: Default per-host concurrency limits.
+    host_limit: HostLimit = Field(default_factory=HostLimit)
+
+    #: Per-host concurrency limits.
+    host_limits: dict[str, HostLimit] = Field(default_factory=dict)
+
+    def add_pkg_filter(self, filter_func: Callable[[Package], bool], *,
+                       cheap: bool = False) -> None:
         """
         Add a callback to allow or block processing of a package.
 
         :param filter_func: package filtering function
+        :param cheap: whether the function decides only from package
+            properties without any I/O, so it can be also applied to packages
+            that are not normalized yet
         """
 
         self._pkg_filters.append(filter_func)
+        if cheap:
+            self._pkg_prefilters.append(filter_func)
 
     def add_pkg_distromap(
         self, distromap_func: Callable[..., Awaitable[Collection[Package]]]
@@ -85,6 +102,19 @@ class MainOptions(OptionsBase):
 
         return all(filter_func(pkg) for filter_func in self._pkg_filters)
 
+    def pkg_prefilter(self, pkg: Package) -> bool:
+        """
+        Package filtering callback function for packages not normalized yet.
+
+        :param pkg: package object to filter
+
+        :returns: the result of all enabled cheap package filtering functions
+            combined with the logical AND operation. If none are enabled,
+            always returns ``True``.
+        """
+
+        return all(filter_func(pkg) for filter_func in self._pkg_prefilters)
+
     async def pkg_distromap(
         self, pkg: Package, *, aiohttp_session: aiohttp.ClientSession
     ) -> Collection[Package]:
@@ -94,8 +124,12 @@ class MainOptions(OptionsBase):
         :param pkg: package object to get replacements for
         :param aiohttp_session: :py:mod:`aiohttp` client session
 
+        All distromap functions are called concurrently, and lower priority
+        ones are cancelled as soon as a result is known.
+
         :returns: the first non-empty result returned by any of enabled
-            distromap functions, and the empty set otherwise
+            distromap functions in order they were added, and the empty set
+            otherwise
         """
 
         if self.to_repo and len(self._pkg_distromaps) == 0:
@@ -103,8 +137,18 @@ class MainOptions(OptionsBase):
                 f"No {self.from_repo}:{self.to_repo} mappings configured"
             )
 
-        for distromap_func in self._pkg_distromaps:
-            pkg_subst = await distromap_func(pkg, aiohttp_session=aiohttp_session)
-            if len(pkg_subst) != 0:
-                return pkg_subst
-        return frozenset()
+        if len(self._pkg_distromaps) == 1:
+            return await self._pkg_distromaps[0](pkg, aiohttp_session=aiohttp_session)
+
+        tasks = [asyncio.ensure_future(distromap_func(pkg, aiohttp_session=aiohttp_session))
+                 for distromap_func in self._pkg_distromaps]
+        try:
+            for task in tasks:
+                if len(pkg_subst := await task) != 0:
+                    return pkg_subst
+            return frozenset()
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Retrieve errors of tasks nobody is waiting for.
+            await asyncio.gather(*tasks, return_exceptions=True)
@@ -6,15 +6,21 @@
 Loadable plug-in interface.
 """
 
-from collections.abc import AsyncIterator, Awaitable
+from collections.abc import AsyncIterator, Awaitable, Sequence
+from typing import TYPE_CHECKING
 
-import aiohttp
-import click
 import pluggy
 
 from how_much_work.core.constants import PACKAGE
-from how_much_work.core.options import MainOptions
-from how_much_work.core.types import Package
+
+if TYPE_CHECKING:
+    # Plug-ins are loaded before any command is run, so heavy modules are
+    # only imported when needed.
+    import aiohttp
+    import click
+
+    from how_much_work.core.options import MainOptions
+    from how_much_work.core.types import Package
 
 hook_spec = pluggy.HookspecMarker(PACKAGE)
 hook_impl = pluggy.HookimplMarker(PACKAGE)
@@ -27,8 +33,8 @@ class PackageRegistryPluginSpec:
 
     @hook_spec(firstresult=True)
     def normalize_package(
-        self, pkg: Package, aiohttp_session: aiohttp.ClientSession
-    ) -> Awaitable[Package] | None:
+        self, pkg: "Package", aiohttp_session: "aiohttp.ClientSession"
+    ) -> "Awaitable[Package] | None":
         """
         Normalize a package.
 
@@ -44,8 +50,8 @@ class PackageRegistryPluginSpec:
 
     @hook_spec(firstresult=True)
     def get_package_children(
-        self, pkg: Package, aiohttp_session: aiohttp.ClientSession
-    ) -> AsyncIterator[Package] | None:
+        self, pkg: "Package", aiohttp_session: "aiohttp.ClientSession"
+    ) -> "AsyncIterator[Package] | None":
         """
         Get direct children of the given package in its dependency graph.
 
@@ -68,8 +74,81 @@ class PackageRegistryPluginSpec:
         :returns: package's direct children
         """
 
+    @hook_spec(firstresult=True)
+    def normalize_packages_batch(
+        self, pkgs: "Sequence[Package]", aiohttp_session: "aiohttp.ClientSession"
+    ) -> "Awaitable[Sequence[Package | None]] | None":
+        """
+        Normalize multiple packages at once.
+
+        Optional batch variant of :py:meth:`normalize_package` for registries
+        that can answer many packages in a single request. All packages are
+        from the same repository. Packages not handled by any implementation
+        are normalized one by one.
+
+        :param pkgs: package objects
+        :param aiohttp_session: :py:mod:`aiohttp` client session
+
+        :returns: normalized packages in the same order, with ``None`` for
+            invalid packages, or ``None``
+        """
+
+    @hook_spec(firstresult=True)
+    def get_packages_children_batch(
+        self, pkgs: "Sequence[Package]", aiohttp_session: "aiohttp.ClientSession"
+    ) -> "Awaitable[Sequence[Sequence[Package] | None]] | None":
+        """
+        Get direct children of multiple packages at once.
+
+        Optional batch variant of :py:meth:`get_package_children` for
+        registries that can answer many packages in a single request, with
+        the same semantics for each package. All packages are from the same
+        repository. Packages not handled by any implementation are processed
+        one by one.
+
+        :param pkgs: packages from the registry
+        :param aiohttp_session: :py:mod:`aiohttp` client session
+
+        :returns: children of each package in the same order, with ``None``
+            for packages whose dependencies could not be fetched, or ``None``
+        """
+
+    @hook_spec(firstresult=True)
+    def get_package_validator(
+        self, pkg: "Package", previous: str | None,
+        aiohttp_session: "aiohttp.ClientSession"
+    ) -> Awaitable[str | None] | None:
+        """
+        Get a token identifying the current state of package metadata.
+
+        Tokens are opaque strings, such as HTTP entity tags or serial
+        numbers, that change whenever children of the package might have
+        changed.
+
+        :param pkg: normalized package from the registry
+        :param previous: previously seen token, can be used to make a
+            conditional request
+        :param aiohttp_session: :py:mod:`aiohttp` client session
+
+        :raises PackageDependenciesFetchError: on network errors
+
+        :returns: token or ``None``
+        """
+
+    @hook_spec
+    def get_registry_options_fingerprint(self) -> str | None:
+        """
+        Describe plugin options that change children returned by the
+        registry, such as the index URL or filters applied by the plugin.
+
+        Children saved in a snapshot are not reused if any of the returned
+        strings changed.
+
+        :returns: string identifying current option values or ``None``
+        """
+
     @hook_spec
-    def setup_registry_plugin_options(self, click_group: click.Group) -> None:
+    def setup_registry_plugin_options(self, click_group: "click.Group") -> None:
         """
         Register plugin-specific command-line options.
 
@@ -83,7 +162,7 @@ class DistromapPluginSpec:
     """
 
     @hook_spec
-    def setup_distromap_plugin(self, options: MainOptions, config: object) -> None:
+    def setup_distromap_plugin(self, options: "MainOptions", config: object) -> None:
         """
         Configure a plugin.
 
@@ -91,6 +170,16 @@ class DistromapPluginSpec:
         :param config: parsed :file:`distromap.toml` configuration file
         """
 
+    @hook_spec
+    def setup_distromap_plugin_commands(self, click_group: "click.Group") -> None:
+        """
+        Register plugin-specific commands.
+
+        Commands are run after :py:meth:`setup_distromap_plugin`.
+
+        :param click_group: Click group of the main application
+        """
+
 
 __all__ = [
     "DistromapPluginSpec",
@@ -0,0 +1,227 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty
+
+"""
+Retries of transient HTTP failures and hedged requests.
+"""
+
+import asyncio
+import email.utils
+import math
+import random
+import time
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timezone
+from typing import TypeVar
+
+import aiohttp
+from pydantic import BaseModel, ConfigDict, Field
+
+from how_much_work.core.metrics import Histogram, metrics
+
+T = TypeVar("T")
+
+#: HTTP status codes of failures worth retrying.
+RETRY_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+#: Number of successful calls to a host needed before hedging starts.
+HEDGE_MIN_SAMPLES = 20
+
+#: Maximum share of calls to a host that get a hedged duplicate.
+HEDGE_BUDGET = 0.1
+
+
+class RetryPolicy(BaseModel):
+    """
+    Retry, hedging and timeout settings.
+    """
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
+    #: Maximum number of attempts, including the first one.
+    attempts: int = Field(default=3, ge=1)
+
+    #: Upper bound of the random delay before the first retry, doubled for
+    #: each next one.
+    backoff: float = Field(default=0.5, ge=0)
+
+    #: Maximum delay between attempts. Failures with a longer ``Retry-After``
+    #: are not retried.
+    max_backoff: float = Field(default=30, ge=0)
+
+    #: Quantile of a host's latency after which a duplicate call is started,
+    #: hedging is disabled if not set.
+    hedge_quantile: float | None = Field(default=None, gt=0, lt=1)
+
+    #: Number of seconds to wait for a connection.
+    connect_timeout: float = Field(default=30, gt=0)
+
+    #: Number of seconds to wait for the next piece of a response.
+    read_timeout: float = Field(default=30, gt=0)
+
+    def client_timeout(self) -> aiohttp.ClientTimeout:
+        """
+        :returns: timeouts for :py:class:`aiohttp.ClientSession`
+        """
+
+        # Total timeout would include time spent waiting for the controller.
+        return aiohttp.ClientTimeout(total=None, sock_connect=self.connect_timeout,
+                                     sock_read=self.read_timeout)
+
+
+def is_transient(err: BaseException) -> bool:
+    """
+    Tell if a failed call might succeed when repeated.
+
+    >>> is_transient(asyncio.TimeoutError())
+    True
+    >>> is_transient(ValueError())
+    False
+
+    :param err: raised exception
+    """
+
+    if isinstance(err, aiohttp.ClientResponseError):
+        return err.status in RETRY_STATUSES
+    return isinstance(err, (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError,
+                            asyncio.TimeoutError))
+
+
+def retry_after(err: BaseException) -> float | None:
+    """
+    Get the delay requested by the server with the ``Retry-After`` header.
+
+    :param err: raised exception
+
+    :returns: number of seconds or ``None``
+    """
+
+    if not isinstance(err, aiohttp.ClientResponseError) or err.headers is None:
+        return None
+    if (value := err.headers.get("Retry-After")) is None:
+        return None
+
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max((date - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class Retrier:
+    """
+    Caller of functions making HTTP requests, retrying transient failures
+    with jittered exponential backoff.
+
+    If hedging is enabled, a duplicate call is started when the first one
+    takes longer than the configured latency quantile of the host, and the
+    first successful result is used.
+    """
+
+    def __init__(self, policy: RetryPolicy | None = None):
+        """
+        :param policy: retry settings
+        """
+
+        #: Retry settings.
+        self.policy = policy or RetryPolicy()
+
+        self._latencies: dict[str, Histogram] = {}
+        self._calls: dict[str, int] = {}
+        self._hedges: dict[str, int] = {}
+
+    def hedge_delay(self, host: str) -> float | None:
+        """
+        :param host: host name
+
+        :returns: number of seconds before a duplicate call is started, or
+            ``None`` if calls to this host are not hedged yet
+        """
+
+        if (quantile := self.policy.hedge_quantile) is None:
+            return None
+        hist = self._latencies.get(host)
+        if hist is None or hist.count < HEDGE_MIN_SAMPLES:
+            return None
+        if self._hedges.get(host, 0) >= HEDGE_BUDGET * self._calls.get(host, 0):
+            return None
+        if math.isinf(delay := hist.quantile(quantile)):
+            return None
+        return delay
+
+    async def call(self, func: Callable[[], Awaitable[T]], *, host: str) -> T:
+        """
+        Call a function, repeating it on transient failures.
+
+        The function must be safe to call several times, also concurrently
+        if hedging is enabled.
+
+        :param func: function making HTTP requests
+        :param host: host the requests are made to
+
+        :returns: result of the function
+        """
+
+        attempt = 1
+        while True:
+            try:
+                return await self._attempt(func, host)
+            except Exception as err:
+                if attempt >= self.policy.attempts or not is_transient(err):
+                    raise
+                delay = retry_after(err)
+                if delay is None:
+                    delay = random.uniform(0, min(self.policy.max_backoff,
+                                                  self.policy.backoff * 2 ** (attempt - 1)))
+                elif delay > self.policy.max_backoff:
+                    raise
+
+                reason = (str(err.status) if isinstance(err, aiohttp.ClientResponseError)
+                          else type(err).__name__)
+                metrics.inc("http_retries_total", host=host, reason=reason)
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    async def _timed(self, func: Callable[[], Awaitable[T]], host: str) -> T:
+        start = time.perf_counter()
+        result = await func()
+        if (hist := self._latencies.get(host)) is None:
+            hist = self._latencies[host] = Histogram()
+        hist.observe(time.perf_counter() - start)
+        return result
+
+    async def _attempt(self, func: Callable[[], Awaitable[T]], host: str) -> T:
+        self._calls[host] = self._calls.get(host, 0) + 1
+        if (delay := self.hedge_delay(host)) is None:
+            return await self._timed(func, host)
+
+        tasks = [asyncio.ensure_future(self._timed(func, host))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                self._hedges[host] = self._hedges.get(host, 0) + 1
+                metrics.inc("http_hedges_total", host=host)
+                tasks.append(asyncio.ensure_future(self._timed(func, host)))
+
+            errors: list[Exception] = []
+            for future in asyncio.as_completed(tasks):
+                try:
+                    return await future
+                except Exception as err:
+                    errors.append(err)
+            raise errors[0]
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+#: Retrier shared by all plugins, configured by the application.
+retrier = Retrier()
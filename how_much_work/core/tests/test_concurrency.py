@@ -0,0 +1,32 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty
+
+import asyncio
+
+import pytest
+
+from how_much_work.core.concurrency import AdaptiveLimiter, HostLimit
+
+
+@pytest.mark.asyncio
+async def test_limiter_aimd() -> None:
+    limiter = AdaptiveLimiter(HostLimit(initial=2, maximum=3))
+
+    await limiter.acquire()
+    await limiter.acquire()
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    assert not waiter.done()
+
+    limiter.release(latency=0.1)
+    await waiter
+    assert limiter.in_flight == 2
+
+    for _ in range(10):
+        limiter.release(latency=0.1)
+        await limiter.acquire()
+    assert limiter.limit == 3
+
+    limiter.release(status=429)
+    assert limiter.limit == 1
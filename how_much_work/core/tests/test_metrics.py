@@ -0,0 +1,68 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty
+
+import os
+from pathlib import Path
+
+import pytest
+
+from how_much_work.core.metrics import Metrics
+
+
+def test_metrics_export(tmp_path: Path) -> None:
+    metrics = Metrics()
+    metrics.inc("requests_total", host="pypi.org")
+    metrics.inc("requests_total", 2, host="pypi.org")
+    with metrics.gauge("in_flight").track():
+        with metrics.gauge("in_flight").track():
+            pass
+    metrics.observe("request_seconds", 0.02)
+    metrics.observe("request_seconds", 100)
+
+    data = metrics.to_json()
+    assert data["counters"] == [
+        {"name": "requests_total", "labels": {"host": "pypi.org"}, "value": 3}
+    ]
+    assert data["gauges"] == [
+        {"name": "in_flight", "labels": {}, "value": 0, "max": 2}
+    ]
+    assert data["histograms"][0]["count"] == 2
+    assert data["histograms"][0]["p50"] == 0.025
+
+    path = tmp_path / "metrics.prom"
+    metrics.write_textfile(path)
+    lines = path.read_text().splitlines()
+    assert 'how_much_work_requests_total{host="pypi.org"} 3' in lines
+    assert "how_much_work_in_flight_max 2" in lines
+    assert 'how_much_work_request_seconds_bucket{le="0.025"} 1' in lines
+    assert 'how_much_work_request_seconds_bucket{le="+Inf"} 2' in lines
+    assert "how_much_work_request_seconds_count 2" in lines
+    assert list(tmp_path.iterdir()) == [path]
+
+    umask = os.umask(0o022)
+    try:
+        metrics.write_textfile(path)
+    finally:
+        os.umask(umask)
+    assert path.stat().st_mode & 0o777 == 0o644
+
+
+def test_textfile_cleanup(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    def replace(src: str, dst: str) -> None:
+        raise OSError("read-only file system")
+
+    monkeypatch.setattr(os, "replace", replace)
+    with pytest.raises(OSError):
+        Metrics().write_textfile(tmp_path / "metrics.prom")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_prometheus_precision() -> None:
+    metrics = Metrics()
+    metrics.inc("response_bytes_total", 12345678)
+    metrics.observe("request_seconds", 1234567.891)
+
+    lines = metrics.to_prometheus().splitlines()
+    assert "how_much_work_response_bytes_total 12345678" in lines
+    assert "how_much_work_request_seconds_sum 1234567.891" in lines
@@ -0,0 +1,47 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty
+
+import asyncio
+from collections.abc import Awaitable, Callable, Collection
+
+import aiohttp
+import pytest
+
+from how_much_work.core.options import MainOptions
+from how_much_work.core.types import Package
+
+
+@pytest.mark.asyncio
+async def test_distromap_priority(session: aiohttp.ClientSession) -> None:
+    foo = Package(name="foo", repo_name="pypi")
+    cancelled: list[str] = []
+
+    def make_distromap(
+        name: str, delay: float, found: bool
+    ) -> Callable[..., Awaitable[Collection[Package]]]:
+        async def distromap(pkg: Package, *,
+                            aiohttp_session: aiohttp.ClientSession) -> Collection[Package]:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                cancelled.append(name)
+                raise
+            if found:
+                return {Package(name=name, repo_name="gentoo")}
+            return frozenset()
+        return distromap
+
+    options = MainOptions(from_repo="pypi", to_repo="gentoo")
+    options.add_pkg_distromap(make_distromap("empty", 0.02, False))
+    options.add_pkg_distromap(make_distromap("slow", 0.05, True))
+    options.add_pkg_distromap(make_distromap("fast", 0, True))
+    options.add_pkg_distromap(make_distromap("never", 10, True))
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    assert await options.pkg_distromap(foo, aiohttp_session=session) == {
+        Package(name="slow", repo_name="gentoo")
+    }
+    assert loop.time() - start < 1
+    assert cancelled == ["never"]
@@ -0,0 +1,76 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty
+
+import asyncio
+
+import aiohttp
+import pytest
+from multidict import CIMultiDict, CIMultiDictProxy
+
+from how_much_work.core.retry import (
+    HEDGE_MIN_SAMPLES,
+    Retrier,
+    RetryPolicy,
+    retry_after,
+)
+
+
+def response_error(status: int, **headers: str) -> aiohttp.ClientResponseError:
+    return aiohttp.ClientResponseError(
+        None, (), status=status,  # type: ignore[arg-type]
+        headers=CIMultiDictProxy(CIMultiDict(headers))
+    )
+
+
+def test_retry_after() -> None:
+    assert retry_after(response_error(503, **{"Retry-After": "2"})) == 2.0
+    assert retry_after(response_error(503, **{
+        "Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"
+    })) == 0.0
+    assert retry_after(response_error(503)) is None
+
+
+@pytest.mark.asyncio
+async def test_retries() -> None:
+    retrier = Retrier(RetryPolicy(attempts=3, backoff=0.01))
+    errors = [response_error(503), asyncio.TimeoutError()]
+
+    async def flaky() -> str:
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    assert await retrier.call(flaky, host="example.org") == "ok"
+
+    async def missing() -> str:
+        raise response_error(404)
+
+    with pytest.raises(aiohttp.ClientResponseError):
+        await retrier.call(missing, host="example.org")
+
+    errors = [response_error(429, **{"Retry-After": "60"})]
+    with pytest.raises(aiohttp.ClientResponseError):
+        await retrier.call(flaky, host="example.org")
+
+
+@pytest.mark.asyncio
+async def test_hedging() -> None:
+    retrier = Retrier(RetryPolicy(hedge_quantile=0.5))
+    calls = 0
+
+    async def request() -> int:
+        nonlocal calls
+        calls += 1
+        # Only the first call is slow.
+        await asyncio.sleep(10 if calls == 1 + HEDGE_MIN_SAMPLES else 0)
+        return calls
+
+    for _ in range(HEDGE_MIN_SAMPLES):
+        await retrier.call(request, host="example.org")
+    assert retrier.hedge_delay("example.org") == 0.001
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    assert await retrier.call(request, host="example.org") == HEDGE_MIN_SAMPLES + 2
+    assert loop.time() - start < 1
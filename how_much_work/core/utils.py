@@ -1,30 +1,57 @@
 # SPDX-License-Identifier: WTFPL
-# SPDX-FileCopyrightText: 2024 Anna <cyber@sysrq.in>
+# SPDX-FileCopyrightText: 2024-2026 Anna <cyber@sysrq.in>
 # No warranty
 
 """
 Utility functions and classes.
 """
 
-from collections.abc import AsyncGenerator
+import os
+from collections.abc import AsyncGenerator, Iterable
 from contextlib import asynccontextmanager
+from pathlib import Path
 
 import aiohttp
 
-from how_much_work.core.constants import USER_AGENT
+from how_much_work.core.concurrency import ConcurrencyController
+from how_much_work.core.constants import PACKAGE, USER_AGENT
+from how_much_work.core.retry import retrier
+
+
+def get_cache_dir() -> Path:
+    """
+    Get the application directory inside the user's XDG cache directory.
+
+    The directory is not created automatically.
+
+    :returns: cache directory path
+    """
+
+    path = Path(os.getenv("XDG_CACHE_HOME", "~/.cache")).expanduser()
+    return path / PACKAGE
 
 
 @asynccontextmanager
-async def aiohttp_session() -> AsyncGenerator[aiohttp.ClientSession, None]:
+async def aiohttp_session(
+    controller: ConcurrencyController | None = None,
+    trace_configs: Iterable[aiohttp.TraceConfig] = ()
+) -> AsyncGenerator[aiohttp.ClientSession, None]:
     """
     Construct an :py:class:`aiohttp.ClientSession` object with out settings.
+
+    :param controller: per-host concurrency controller, a new one with
+        default limits is created if not set
+    :param trace_configs: additional request tracing callbacks
     """
 
+    if controller is None:
+        controller = ConcurrencyController()
+
     headers = {"user-agent": USER_AGENT}
-    timeout = aiohttp.ClientTimeout(total=30)
-    conn = aiohttp.TCPConnector(limit_per_host=1)
+    timeout = retrier.policy.client_timeout()
     session = aiohttp.ClientSession(headers=headers, timeout=timeout,
-                                    connector=conn)
+                                    trace_configs=[controller.trace_config(),
+                                                   *trace_configs])
 
     try:
         yield session
@@ -1,23 +1,29 @@
 # SPDX-License-Identifier: WTFPL
-# SPDX-FileCopyrightText: 2024 Anna <cyber@sysrq.in>
+# SPDX-FileCopyrightText: 2024-2026 Anna <cyber@sysrq.in>
 # No warranty
 
 from collections.abc import AsyncIterator, Awaitable, Callable, Sequence
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
-import aiohttp
 import click
 
-from how_much_work.core.options import MainOptions
 from how_much_work.core.plugin_api import hook_impl
-from how_much_work.core.types import Package
 
 from how_much_work.plugins.pypi.constants import REPO_NAME
 
+if TYPE_CHECKING:
+    # This module is imported on startup, the rest of the plugin is only
+    # imported when hooks are called.
+    import aiohttp
+
+    from how_much_work.core.types import Package
+
 
 @hook_impl
 def normalize_package(
-    pkg: Package, aiohttp_session: aiohttp.ClientSession
-) -> Awaitable[Package] | None:
+    pkg: "Package", aiohttp_session: "aiohttp.ClientSession"
+) -> "Awaitable[Package] | None":
     if pkg.repo_name == REPO_NAME:
         from how_much_work.plugins.pypi.registry import normalize
         return normalize(pkg, session=aiohttp_session)
@@ -26,24 +32,43 @@ def normalize_package(
 
 @hook_impl
 def get_package_children(
-    pkg: Package, aiohttp_session: aiohttp.ClientSession
-) -> AsyncIterator[Package] | None:
+    pkg: "Package", aiohttp_session: "aiohttp.ClientSession"
+) -> "AsyncIterator[Package] | None":
     if pkg.repo_name == REPO_NAME:
         from how_much_work.plugins.pypi.registry import get_children
         return get_children(pkg, session=aiohttp_session)
     return None
 
 
+@hook_impl
+def get_package_validator(
+    pkg: "Package", previous: str | None, aiohttp_session: "aiohttp.ClientSession"
+) -> Awaitable[str | None] | None:
+    if pkg.repo_name == REPO_NAME:
+        from how_much_work.plugins.pypi.registry import get_validator
+        return get_validator(pkg, previous, session=aiohttp_session)
+    return None
+
+
+@hook_impl
+def get_registry_options_fingerprint() -> str:
+    from how_much_work.plugins.pypi.options import plugin_options
+
+    options = plugin_options.model_dump_json(include={"index_url", "target_env"})
+    return f"{REPO_NAME}:{options}"
+
+
 def pypi_filter_extras_option() -> Callable[[click.Group], click.Group]:
 
     def callback(ctx: click.Context, param: click.Option, value: Sequence[str]) -> None:
+        from how_much_work.core.options import MainOptions
         from how_much_work.plugins.pypi.filters import exclude_python_extras
 
         if not value or ctx.resilient_parsing:
             return
         ctx.ensure_object(MainOptions)
         options: MainOptions = ctx.obj
-        options.add_pkg_filter(exclude_python_extras(*value))
+        options.add_pkg_filter(exclude_python_extras(*value), cheap=True)
 
     return click.option("--pypi-filter-extras", metavar="GLOB", multiple=True,
                         expose_value=False, callback=callback,
@@ -51,8 +76,120 @@ def pypi_filter_extras_option() -> Callable[[click.Group], click.Group]:
                              "matching a pattern.")
 
 
+def pypi_target_env_option() -> Callable[[click.Group], click.Group]:
+
+    def callback(ctx: click.Context, param: click.Option, value: Sequence[str]) -> None:
+        from how_much_work.plugins.pypi.environment import parse_target_env
+        from how_much_work.plugins.pypi.options import plugin_options
+
+        if not value or ctx.resilient_parsing:
+            return
+
+        target_env: dict[str, str] = {}
+        for spec in value:
+            try:
+                target_env |= parse_target_env(spec)
+            except ValueError as err:
+                raise click.BadParameter(str(err), ctx, param) from err
+        plugin_options.target_env = target_env
+
+    return click.option("--pypi-target-env", metavar="SPEC", multiple=True,
+                        expose_value=False, callback=callback,
+                        help="Skip Python dependencies that can't be installed "
+                             "in the target environment, given as comma-"
+                             "separated presets (linux, macos, windows, "
+                             "cpython, pypy) and NAME=VALUE marker values.")
+
+
+def pypi_index_url_option() -> Callable[[click.Group], click.Group]:
+
+    def callback(ctx: click.Context, param: click.Option, value: str | None) -> None:
+        from how_much_work.plugins.pypi.options import plugin_options
+
+        if value is None or ctx.resilient_parsing:
+            return
+        plugin_options.index_url = value
+
+    return click.option("--pypi-index-url", metavar="URL", expose_value=False,
+                        callback=callback,
+                        help="Base URL of a package index with PyPI JSON API "
+                             "(default: https://pypi.org).")
+
+
+def pypi_cache_options() -> Callable[[click.Group], click.Group]:
+
+    def callback(ctx: click.Context, param: click.Parameter, value: Any) -> None:
+        from how_much_work.plugins.pypi.options import plugin_options
+
+        if value is None or param.name is None or ctx.resilient_parsing:
+            return
+        plugin_options[param.name.removeprefix("pypi_")] = value
+
+    def decorator(click_group: click.Group) -> click.Group:
+        click_group = click.option(
+            "--pypi-cache/--pypi-no-cache", default=True, expose_value=False,
+            callback=callback,
+            help="Use the persistent PyPI metadata cache (default: enabled)."
+        )(click_group)
+        click_group = click.option(
+            "--pypi-cache-path", metavar="FILE", expose_value=False,
+            type=click.Path(dir_okay=False, path_type=Path), callback=callback,
+            help="PyPI metadata cache location."
+        )(click_group)
+        click_group = click.option(
+            "--pypi-cache-ttl", metavar="SECONDS", expose_value=False,
+            type=click.FloatRange(min=0), callback=callback,
+            help="Use cached PyPI metadata without revalidation for this "
+                 "long (default: 3600)."
+        )(click_group)
+        click_group = click.option(
+            "--pypi-cache-size", metavar="N", expose_value=False,
+            type=click.IntRange(min=1), callback=callback,
+            help="Maximum number of projects in the PyPI metadata cache "
+                 "(default: 10000)."
+        )(click_group)
+        return click_group
+
+    return decorator
+
+
+def pypi_parse_options() -> Callable[[click.Group], click.Group]:
+
+    def callback(ctx: click.Context, param: click.Parameter, value: Any) -> None:
+        from how_much_work.plugins.pypi.options import plugin_options
+
+        if value is None or param.name is None or ctx.resilient_parsing:
+            return
+        plugin_options[param.name.removeprefix("pypi_")] = value
+
+    def decorator(click_group: click.Group) -> click.Group:
+        click_group = click.option(
+            "--pypi-parse-pool", type=click.Choice(["inline", "thread", "process"]),
+            expose_value=False, callback=callback,
+            help="Parse PyPI metadata on the event loop, in a thread pool or "
+                 "in a process pool (default: inline)."
+        )(click_group)
+        click_group = click.option(
+            "--pypi-parse-workers", metavar="N", expose_value=False,
+            type=click.IntRange(min=1), callback=callback,
+            help="Number of PyPI metadata parsing workers (default: chosen "
+                 "by the pool)."
+        )(click_group)
+        return click_group
+
+    return decorator
+
+
 @hook_impl
 def setup_registry_plugin_options(click_group: click.Group) -> None:
     with_pypi_filter_extras_option = pypi_filter_extras_option()
+    with_pypi_target_env_option = pypi_target_env_option()
+    with_pypi_index_url_option = pypi_index_url_option()
+    with_pypi_cache_options = pypi_cache_options()
+    with_pypi_parse_options = pypi_parse_options()
 
     click_group = with_pypi_filter_extras_option(click_group)
+    click_group = with_pypi_target_env_option(click_group)
+    click_group = with_pypi_index_url_option(click_group)
+    click_group = with_pypi_cache_options(click_group)
+    click_group = with_pypi_parse_options(click_group)
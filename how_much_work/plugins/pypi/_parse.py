@@ -0,0 +1,41 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty
+
+"""
+Parsing stage of project information, runnable in worker threads and
+processes.
+"""
+
+from how_much_work.plugins.pypi._types import JsonProjectInfo
+from how_much_work.plugins.pypi.index import RequirementIndex
+
+
+def parse_project_info(raw: bytes) -> tuple[JsonProjectInfo, RequirementIndex | None]:
+    """
+    Validate project information and build its requirement index.
+
+    >>> info, index = parse_project_info(b'{"name": "a", "requires_dist": ["b"]}')
+    >>> info.name, index.listing
+    ('a', (Package(name='b', repo_name='pypi', condition=None),))
+
+    :param raw: raw ``info`` object from PyPI JSON API
+
+    :raises ValueError: on invalid project information
+
+    :returns: project information and requirement index, if requirements
+        could be parsed
+    """
+
+    try:
+        info = JsonProjectInfo.model_validate_json(raw)
+    except ValueError as err:
+        # Validation errors don't survive pickling between processes.
+        raise ValueError(str(err)) from None
+
+    try:
+        index = RequirementIndex.from_requirements(info.requires_dist or ())
+    except ValueError:
+        # Invalid requirements are reported when children are requested.
+        index = None
+    return info, index
@@ -0,0 +1,147 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty
+
+"""
+Incremental extraction of the ``info`` object from PyPI JSON API responses.
+"""
+
+import re
+
+import aiohttp
+
+from how_much_work.core.metrics import metrics
+
+# Structural characters outside of strings.
+_token_re = re.compile(rb'[{}\[\]",:]')
+
+# Characters terminating a plain run of string contents.
+_string_special_re = re.compile(rb'["\\]')
+
+# Maximum size of a chunk read from the network.
+_CHUNK_SIZE = 64 * 1024
+
+# Maximum number of bytes read after the ``info`` object, so that the
+# connection can be reused.
+_DRAIN_LIMIT = 256 * 1024
+
+
+class InfoExtractor:
+    """
+    Push parser finding the raw value of the top-level ``info`` key.
+
+    Only the JSON structure is tracked, values are not decoded.
+
+    >>> extractor = InfoExtractor()
+    >>> extractor.feed(b'{"info": {"name": "a}"')
+    >>> extractor.feed(b', "x": [1]}, "releases": {')
+    b'{"name": "a}", "x": [1]}'
+    """
+
+    def __init__(self) -> None:
+        self._buf = bytearray()
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._string_start = 0
+        self._last_string: bytes | None = None
+        self._key: bytes | None = None
+        self._info_start: int | None = None
+
+    def feed(self, chunk: bytes) -> bytes | None:
+        """
+        Process the next chunk of data.
+
+        :param chunk: response body chunk
+
+        :returns: raw ``info`` value once it's complete, ``None`` otherwise
+        """
+
+        self._discard_processed()
+        buf = self._buf
+        buf += chunk
+
+        while True:
+            if self._in_string:
+                match = _string_special_re.search(buf, self._pos)
+                if match is None:
+                    self._pos = len(buf)
+                    return None
+                if match.group() == b"\\":
+                    if match.end() == len(buf):
+                        # Escaped character is in the next chunk.
+                        self._pos = match.start()
+                        return None
+                    self._pos = match.end() + 1
+                    continue
+
+                self._in_string = False
+                self._pos = match.end()
+                if self._depth == 1:
+                    self._last_string = bytes(buf[self._string_start:self._pos])
+                continue
+
+            match = _token_re.search(buf, self._pos)
+            if match is None:
+                self._pos = len(buf)
+                return None
+
+            token = match.group()
+            self._pos = match.end()
+            if token == b'"':
+                self._in_string = True
+                self._string_start = match.start()
+            elif token in (b"{", b"["):
+                if self._depth == 1 and self._key == b'"info"':
+                    self._info_start = match.start()
+                self._depth += 1
+            elif token in (b"}", b"]"):
+                self._depth -= 1
+                if self._depth == 1 and self._info_start is not None:
+                    return bytes(buf[self._info_start:self._pos])
+            elif self._depth == 1:
+                # Either a key-value separator or a pair separator.
+                self._key = self._last_string if token == b":" else None
+
+    def _discard_processed(self) -> None:
+        # Drop data not needed anymore to keep memory usage low.
+        if self._info_start is not None:
+            return
+
+        keep_from = self._string_start if self._in_string else self._pos
+        del self._buf[:keep_from]
+        self._pos -= keep_from
+        self._string_start -= keep_from
+
+
+async def read_project_info(response: aiohttp.ClientResponse) -> bytes:
+    """
+    Read a PyPI JSON API response until the ``info`` object is complete.
+
+    The rest of the response is read too if it's small, because connections
+    with unread data can't be reused. Larger ones are abandoned, as a new
+    connection costs less than downloading the releases of a big project.
+
+    :param response: response object
+
+    :raises ValueError: if there is no ``info`` object in the response
+
+    :returns: raw ``info`` value
+    """
+
+    extractor = InfoExtractor()
+    info: bytes | None = None
+    drained = 0
+    async for chunk in response.content.iter_chunked(_CHUNK_SIZE):
+        # Streamed reads are not reported to trace configs.
+        metrics.inc("http_response_bytes_total", len(chunk),
+                    host=response.url.host or "")
+        if info is None:
+            info = extractor.feed(chunk)
+        elif (drained := drained + len(chunk)) > _DRAIN_LIMIT:
+            metrics.inc("pypi_responses_abandoned_total")
+            break
+
+    if info is None:
+        raise ValueError("No project information in the response")
+    return info
@@ -1,5 +1,5 @@
 # SPDX-License-Identifier: WTFPL
-# SPDX-FileCopyrightText: 2024 Anna <cyber@sysrq.in>
+# SPDX-FileCopyrightText: 2024-2026 Anna <cyber@sysrq.in>
 # No warranty
 
 """
@@ -18,8 +18,8 @@ class JsonProjectInfo(BaseModel):
     #: Canonical project name.
     name: str = Field(min_length=1)
 
-    #: Dependencies.
-    requires_dist: frozenset[str] | None = None
+    #: Dependencies, in order they are listed in project metadata.
+    requires_dist: tuple[str, ...] | None = None
 
 
 class JsonProject(BaseModel):
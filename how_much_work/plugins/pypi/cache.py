@@ -0,0 +1,181 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty
+
+"""
+Persistent on-disk cache for PyPI project metadata.
+"""
+
+import dataclasses
+import sqlite3
+import time
+from pathlib import Path
+
+from how_much_work.plugins.pypi._types import JsonProjectInfo
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    key TEXT PRIMARY KEY,
+    info TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched REAL NOT NULL,
+    accessed REAL NOT NULL
+)
+"""
+
+
+@dataclasses.dataclass(frozen=True)
+class CacheEntry:
+    """
+    Cached project metadata with HTTP validators.
+    """
+
+    #: Parsed project information.
+    info: JsonProjectInfo
+
+    #: Value of the ``ETag`` response header.
+    etag: str | None
+
+    #: Value of the ``Last-Modified`` response header.
+    last_modified: str | None
+
+    #: Time (seconds since the Epoch) of the last successful validation.
+    fetched: float
+
+    def is_fresh(self, ttl: float) -> bool:
+        """
+        Check whether the entry can be used without revalidation.
+
+        :param ttl: maximum entry age in seconds
+        """
+
+        return time.time() - self.fetched < ttl
+
+    def conditional_headers(self) -> dict[str, str]:
+        """
+        Build request headers for a conditional request.
+        """
+
+        headers: dict[str, str] = {}
+        if self.etag is not None:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified is not None:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ProjectCache:
+    """
+    SQLite-backed project metadata cache.
+
+    Least recently used entries are evicted once the size limit is exceeded.
+    """
+
+    def __init__(self, path: Path, *, max_size: int = 10_000):
+        """
+        :param path: database file path, parent directories are created
+            automatically
+        :param max_size: maximum number of stored projects
+        """
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._max_size = max_size
+        self._db = sqlite3.connect(path, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(_SCHEMA)
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS projects_accessed ON projects (accessed)"
+        )
+        (self._size,) = self._db.execute("SELECT COUNT(*) FROM projects").fetchone()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def get(self, key: str) -> CacheEntry | None:
+        """
+        Look up a project and update its access time.
+
+        :param key: normalized project name
+
+        :returns: cache entry or ``None``
+        """
+
+        row = self._db.execute(
+            "SELECT info, etag, last_modified, fetched FROM projects WHERE key = ?",
+            (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        info, etag, last_modified, fetched = row
+        try:
+            project_info = JsonProjectInfo.model_validate_json(info)
+        except ValueError:
+            # Stale schema or corrupted data, treat as a miss.
+            self._delete(key)
+            return None
+
+        self._db.execute("UPDATE projects SET accessed = ? WHERE key = ?",
+                         (time.time(), key))
+        return CacheEntry(project_info, etag, last_modified, fetched)
+
+    def put(self, key: str, info: JsonProjectInfo, *,
+            etag: str | None = None, last_modified: str | None = None) -> None:
+        """
+        Store a freshly downloaded project.
+
+        :param key: normalized project name
+        :param info: parsed project information
+        :param etag: value of the ``ETag`` response header
+        :param last_modified: value of the ``Last-Modified`` response header
+        """
+
+        now = time.time()
+        existed = self._db.execute(
+            "SELECT 1 FROM projects WHERE key = ?", (key,)
+        ).fetchone() is not None
+        self._db.execute(
+            "INSERT OR REPLACE INTO projects VALUES (?, ?, ?, ?, ?, ?)",
+            (key, info.model_dump_json(), etag, last_modified, now, now)
+        )
+        if not existed:
+            self._size += 1
+            self._evict()
+
+    def touch(self, key: str) -> None:
+        """
+        Mark a project as successfully revalidated.
+
+        :param key: normalized project name
+        """
+
+        now = time.time()
+        self._db.execute(
+            "UPDATE projects SET fetched = ?, accessed = ? WHERE key = ?",
+            (now, now, key)
+        )
+
+    def close(self) -> None:
+        """
+        Close the database connection.
+        """
+
+        self._db.close()
+
+    def _delete(self, key: str) -> None:
+        cursor = self._db.execute("DELETE FROM projects WHERE key = ?", (key,))
+        self._size -= cursor.rowcount
+
+    def _evict(self) -> None:
+        excess = self._size - self._max_size
+        if excess <= 0:
+            return
+
+        cursor = self._db.execute(
+            "DELETE FROM projects WHERE key IN "
+            "(SELECT key FROM projects ORDER BY accessed LIMIT ?)",
+            (excess,)
+        )
+        self._size -= cursor.rowcount
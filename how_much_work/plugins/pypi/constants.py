@@ -1,5 +1,5 @@
 # SPDX-License-Identifier: WTFPL
-# SPDX-FileCopyrightText: 2024 Anna <cyber@sysrq.in>
+# SPDX-FileCopyrightText: 2024-2026 Anna <cyber@sysrq.in>
 # No warranty
 
 """
@@ -11,3 +11,45 @@ PYPI_URL = "https://pypi.org"
 
 #: Displayed repository name.
 REPO_NAME = "pypi"
+
+#: Environment marker variables defined by :pep:`508` (except ``extra``).
+MARKER_VARIABLES = frozenset({
+    "implementation_name",
+    "implementation_version",
+    "os_name",
+    "platform_machine",
+    "platform_python_implementation",
+    "platform_release",
+    "platform_system",
+    "platform_version",
+    "python_full_version",
+    "python_version",
+    "sys_platform",
+})
+
+#: Named sets of environment marker values.
+TARGET_ENV_PRESETS: dict[str, dict[str, str]] = {
+    "linux": {
+        "os_name": "posix",
+        "platform_system": "Linux",
+        "sys_platform": "linux",
+    },
+    "macos": {
+        "os_name": "posix",
+        "platform_system": "Darwin",
+        "sys_platform": "darwin",
+    },
+    "windows": {
+        "os_name": "nt",
+        "platform_system": "Windows",
+        "sys_platform": "win32",
+    },
+    "cpython": {
+        "implementation_name": "cpython",
+        "platform_python_implementation": "CPython",
+    },
+    "pypy": {
+        "implementation_name": "pypy",
+        "platform_python_implementation": "PyPy",
+    },
+}
@@ -0,0 +1,99 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty
+
+"""
+Evaluation of environment markers against a partially known target
+environment.
+"""
+
+from collections.abc import Mapping
+
+from lru import LRU
+
+from how_much_work.plugins.pypi.constants import (
+    MARKER_VARIABLES,
+    TARGET_ENV_PRESETS,
+)
+from how_much_work.plugins.pypi.parsing import parse_cache
+
+
+def parse_target_env(spec: str) -> dict[str, str]:
+    """
+    Parse a target environment specification.
+
+    >>> parse_target_env("linux,python_version=3.12")["sys_platform"]
+    'linux'
+
+    :param spec: comma-separated list of presets and ``NAME=VALUE`` pairs
+
+    :raises ValueError: on unknown presets or marker variables
+
+    :returns: environment marker values
+    """
+
+    result: dict[str, str] = {}
+    for item in filter(None, map(str.strip, spec.split(","))):
+        name, sep, value = item.partition("=")
+        if not sep:
+            if (preset := TARGET_ENV_PRESETS.get(name)) is None:
+                raise ValueError(f"Unknown preset: {name}")
+            result |= preset
+        elif (name := name.strip()) not in MARKER_VARIABLES:
+            raise ValueError(f"Unknown marker variable: {name}")
+        else:
+            result[name] = value.strip()
+    return result
+
+
+class TargetEnvironment:
+    """
+    Target environment with some marker values known.
+
+    Markers are evaluated only for known variables, everything else is
+    assumed to match.
+    """
+
+    def __init__(self, values: Mapping[str, str]):
+        """
+        :param values: known environment marker values
+        """
+
+        self._values = dict(values)
+        self._results: "LRU[str, bool]" = LRU(4096)
+
+    @property
+    def values(self) -> Mapping[str, str]:
+        """
+        Known environment marker values.
+        """
+
+        return self._values
+
+    def may_match(self, condition: str) -> bool:
+        """
+        Check whether a condition can be true in the target environment.
+
+        >>> env = TargetEnvironment({"sys_platform": "linux"})
+        >>> env.may_match('sys_platform == "win32" and extra == "a"')
+        False
+        >>> env.may_match('sys_platform == "win32" or extra == "a"')
+        True
+
+        :param condition: :pep:`508` environment marker
+
+        :returns: ``False`` if the condition never matches, ``True`` otherwise
+        """
+
+        if not self._values:
+            return True
+
+        if (result := self._results.get(condition)) is None:
+            marker = parse_cache.marker(condition).only(*self._values)
+            try:
+                result = marker.validate(self._values)
+            except Exception:
+                # Can't be evaluated, so keep it.
+                result = True
+            self._results[condition] = result
+        return result
@@ -1,23 +1,24 @@
 # SPDX-License-Identifier: WTFPL
-# SPDX-FileCopyrightText: 2024-2025 Anna <cyber@sysrq.in>
+# SPDX-FileCopyrightText: 2024-2026 Anna <cyber@sysrq.in>
 # No warranty
 
 """
 Package filters for PyPI packages.
 """
 
+import functools
 from collections.abc import Callable, Iterator
 from fnmatch import fnmatch
 
 from poetry.core.version.markers import (
     BaseMarker,
     SingleMarker,
-    parse_marker,
 )
 
 from how_much_work.core.types import Package
 
 from how_much_work.plugins.pypi.constants import REPO_NAME
+from how_much_work.plugins.pypi.parsing import parse_cache
 
 
 def _walk_marker(marker: BaseMarker) -> Iterator[SingleMarker]:
@@ -41,14 +42,9 @@ def exclude_python_extras(*extras: str) -> Callable[[Package], bool]:
     :returns: package filter function
     """
 
-    def pkg_filter(pkg: Package) -> bool:
-        if pkg.repo_name != REPO_NAME:
-            return True
-
-        if not pkg.condition:
-            return True
-
-        for marker in _walk_marker(parse_marker(pkg.condition)):
+    @functools.lru_cache(maxsize=4096)
+    def condition_filter(condition: str) -> bool:
+        for marker in _walk_marker(parse_cache.marker(condition)):
             if (
                 marker.name == "extra"
                 and marker.operator == "=="
@@ -57,4 +53,13 @@ def exclude_python_extras(*extras: str) -> Callable[[Package], bool]:
                 return False
         return True
 
+    def pkg_filter(pkg: Package) -> bool:
+        if pkg.repo_name != REPO_NAME:
+            return True
+
+        if not pkg.condition:
+            return True
+
+        return condition_filter(pkg.condition)
+
     return pkg_filter
@@ -0,0 +1,93 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty
+
+"""
+Per-project index of requirements grouped by environment marker.
+"""
+
+import dataclasses
+from collections.abc import Iterable, Iterator, Mapping
+
+from poetry.core.version.markers import SingleMarker
+from poetry.core.version.requirements import Requirement
+
+from how_much_work.core.types import Package
+
+from how_much_work.plugins.pypi.constants import REPO_NAME
+from how_much_work.plugins.pypi.parsing import parse_cache
+
+
+def _dependency_with_extras(req: Requirement) -> Iterator[Package]:
+    yield Package(name=req.name, repo_name=REPO_NAME)
+    for selected_feature in req.extras:
+        marker = SingleMarker("extra", selected_feature)
+        yield Package(name=req.name, repo_name=REPO_NAME,
+                      condition=str(marker))
+
+
+@dataclasses.dataclass(frozen=True)
+class RequirementIndex:
+    """
+    Project requirements grouped by environment marker.
+    """
+
+    #: Unconditional dependencies and dependency-defining conditions (as
+    #: canonical marker strings), in order they are encountered.
+    listing: tuple[Package | str, ...]
+
+    #: Dependencies pulled by each condition, keyed by canonical marker
+    #: string.
+    by_marker: Mapping[str, tuple[Package, ...]]
+
+    @classmethod
+    def from_requirements(cls, requires_dist: Iterable[str]) -> "RequirementIndex":
+        """
+        Parse and group requirements.
+
+        :param requires_dist: :pep:`508` dependency specifications
+
+        :returns: new index
+        """
+
+        listing: dict[Package | str, None] = {}
+        by_marker: dict[str, list[Package]] = {}
+        for req in map(parse_cache.requirement, requires_dist):
+            if not req.marker:
+                listing.update(dict.fromkeys(_dependency_with_extras(req)))
+            else:
+                condition = parse_cache.canonical_marker(str(req.marker))
+                listing[condition] = None
+                by_marker.setdefault(condition, []).extend(
+                    _dependency_with_extras(req)
+                )
+
+        return cls(
+            listing=tuple(listing),
+            by_marker={condition: tuple(deps)
+                       for condition, deps in by_marker.items()},
+        )
+
+    def children(self, pkg: Package) -> Iterator[Package]:
+        """
+        Get direct children of a package.
+
+        :param pkg: package this index was built for
+
+        :returns: dependencies pulled by the package's condition or, if there
+            is no condition, the full listing
+        """
+
+        if pkg.condition:
+            # Select only dependencies pulled by this condition.
+            condition = parse_cache.canonical_marker(pkg.condition)
+            yield from self.by_marker.get(condition, ())
+            return
+
+        # Select all variants of the package with dependency-defining
+        # conditions as well as unconditional dependencies.
+        for item in self.listing:
+            if isinstance(item, str):
+                yield Package(name=pkg.name, repo_name=REPO_NAME, condition=item)
+            else:
+                yield item
@@ -0,0 +1,69 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty
+
+"""
+PyPI plugin options.
+"""
+
+from enum import StrEnum
+from pathlib import Path
+
+from pydantic import Field
+
+from how_much_work.core.options import OptionsBase
+from how_much_work.core.utils import get_cache_dir
+
+from how_much_work.plugins.pypi.constants import PYPI_URL
+
+
+class ParsePool(StrEnum):
+    """
+    Where project information is parsed.
+    """
+
+    #: On the event loop.
+    INLINE = "inline"
+
+    #: In a thread pool.
+    THREAD = "thread"
+
+    #: In a process pool.
+    PROCESS = "process"
+
+
+class PypiOptions(OptionsBase):
+    """
+    PyPI plugin options.
+    """
+
+    #: Base URL of the package index serving the JSON API.
+    index_url: str = PYPI_URL
+
+    #: Enable the persistent project metadata cache.
+    cache: bool = False
+
+    #: Persistent cache database location.
+    cache_path: Path = Field(
+        default_factory=lambda: get_cache_dir() / "pypi.sqlite3"
+    )
+
+    #: Number of seconds cached metadata is used without revalidation.
+    cache_ttl: float = Field(default=3600, ge=0)
+
+    #: Maximum number of projects in the persistent cache.
+    cache_size: int = Field(default=10_000, gt=0)
+
+    #: Pool parsing downloaded project information.
+    parse_pool: ParsePool = ParsePool.INLINE
+
+    #: Number of parsing workers, chosen by the pool if not set.
+    parse_workers: int | None = Field(default=None, gt=0)
+
+    #: Known environment marker values of the target environment.
+    target_env: dict[str, str] = Field(default_factory=dict)
+
+
+#: Options shared by all parts of the plugin, modified by command-line
+#: options.
+plugin_options = PypiOptions()
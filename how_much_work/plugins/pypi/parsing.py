@@ -0,0 +1,156 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty
+
+"""
+Cached parsing of :pep:`508` requirement and marker strings.
+"""
+
+import sys
+
+from lru import LRU
+from poetry.core.version.markers import (
+    BaseMarker,
+    MarkerUnion,
+    MultiMarker,
+    SingleMarker,
+    parse_marker,
+)
+from poetry.core.version.requirements import Requirement
+
+from how_much_work.core.metrics import metrics
+
+
+def _expand_marker(marker: BaseMarker) -> BaseMarker:
+    # Compound markers for a single variable are represented as special
+    # classes by poetry-core, convert them to regular ones.
+    if (
+        not isinstance(marker, (SingleMarker, MultiMarker, MarkerUnion))
+        and (expand := getattr(marker, "expand", None)) is not None
+    ):
+        return expand()
+    return marker
+
+
+def canonicalize_marker(marker: BaseMarker) -> str:
+    """
+    Convert a marker to its canonical string representation.
+
+    Operands of conjunctions and disjunctions are deduplicated and sorted, so
+    logically same markers written differently get the same representation.
+    Quoting is normalized and redundant parentheses are removed.
+
+    >>> canonicalize_marker(parse_marker("(sys_platform=='win32' and extra=='a')"))
+    'extra == "a" and sys_platform == "win32"'
+    >>> canonicalize_marker(parse_marker("os_name=='nt' and (extra=='b' or extra=='a')"))
+    '(extra == "a" or extra == "b") and os_name == "nt"'
+
+    :param marker: parsed marker, simplified by the parser
+
+    :returns: canonical marker string
+    """
+
+    marker = _expand_marker(marker)
+
+    if isinstance(marker, MultiMarker):
+        operands = set()
+        for submarker in map(_expand_marker, marker.markers):
+            operand = canonicalize_marker(submarker)
+            if isinstance(submarker, MarkerUnion):
+                operand = f"({operand})"
+            operands.add(operand)
+        return " and ".join(sorted(operands))
+
+    if isinstance(marker, MarkerUnion):
+        operands = {canonicalize_marker(submarker) for submarker in marker.markers}
+        return " or ".join(sorted(operands))
+
+    return str(marker)
+
+
+class ParseCache:
+    """
+    Bounded cache mapping requirement and marker strings to parsed objects.
+
+    Canonical marker strings are interned, so equal conditions share a single
+    string object.
+
+    Parsed objects are shared between callers and must not be modified.
+
+    Lookups are counted in the ``cache_requests_total`` metric, except for
+    ones made in a process pool.
+    """
+
+    def __init__(self, size: int = 4096):
+        """
+        :param size: maximum number of items in each of internal caches
+        """
+
+        self._requirements: "LRU[str, Requirement]" = LRU(size)
+        self._markers: "LRU[str, BaseMarker]" = LRU(size)
+        self._canonical: "LRU[str, str]" = LRU(size)
+
+    def requirement(self, value: str) -> Requirement:
+        """
+        Parse a requirement string.
+
+        :param value: :pep:`508` dependency specification
+
+        :raises InvalidRequirementError: on invalid requirements
+
+        :returns: parsed requirement
+        """
+
+        if (result := self._requirements.get(value)) is None:
+            metrics.inc("cache_requests_total", cache="pypi-requirements", result="miss")
+            result = self._requirements[value] = Requirement(value)
+        else:
+            metrics.inc("cache_requests_total", cache="pypi-requirements", result="hit")
+        return result
+
+    def marker(self, value: str) -> BaseMarker:
+        """
+        Parse a marker string.
+
+        :param value: :pep:`508` environment marker
+
+        :raises InvalidMarkerError: on invalid markers
+
+        :returns: parsed marker
+        """
+
+        if (result := self._markers.get(value)) is None:
+            metrics.inc("cache_requests_total", cache="pypi-markers", result="miss")
+            result = self._markers[value] = parse_marker(value)
+        else:
+            metrics.inc("cache_requests_total", cache="pypi-markers", result="hit")
+        return result
+
+    def canonical_marker(self, value: str) -> str:
+        """
+        Normalize a marker string.
+
+        .. seealso:: :py:func:`canonicalize_marker`
+
+        :param value: :pep:`508` environment marker
+
+        :raises InvalidMarkerError: on invalid markers
+
+        :returns: interned canonical string representation of the marker
+        """
+
+        if (result := self._canonical.get(value)) is None:
+            metrics.inc("cache_requests_total", cache="pypi-canonical-markers",
+                        result="miss")
+            result = sys.intern(canonicalize_marker(self.marker(value)))
+            self._canonical[value] = result
+            # Canonical strings are canonical to themselves.
+            self._canonical[result] = result
+        else:
+            metrics.inc("cache_requests_total", cache="pypi-canonical-markers",
+                        result="hit")
+        return result
+
+
+#: Cache shared by all parts of the plugin.
+parse_cache = ParseCache()
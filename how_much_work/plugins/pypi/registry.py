@@ -1,5 +1,5 @@
 # SPDX-License-Identifier: WTFPL
-# SPDX-FileCopyrightText: 2024 Anna <cyber@sysrq.in>
+# SPDX-FileCopyrightText: 2024-2026 Anna <cyber@sysrq.in>
 # No warranty.
 
 """
@@ -7,46 +7,204 @@ PyPI (Python Package Index) registry.
 """
 
 import asyncio
+import dataclasses
+import functools
+import multiprocessing
 import re
-from collections.abc import AsyncIterator, Iterator
+import time
+import urllib.parse
+from collections.abc import AsyncIterator, Mapping
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 
 import aiohttp
 from lru import LRU
-from poetry.core.version.markers import (
-    SingleMarker,
-    parse_marker,
-)
-from poetry.core.version.requirements import Requirement
 
 from how_much_work.core.exceptions import (
     PackageDependenciesFetchError,
     PackageValidationError,
 )
+from how_much_work.core.metrics import metrics
+from how_much_work.core.retry import retrier
 from how_much_work.core.types import Package
 
-from how_much_work.plugins.pypi.constants import (
-    PYPI_URL,
-    REPO_NAME,
-)
-from how_much_work.plugins.pypi._types import (
-    JsonProject,
-    JsonProjectInfo,
-)
+from how_much_work.plugins.pypi.constants import REPO_NAME
+from how_much_work.plugins.pypi._parse import parse_project_info
+from how_much_work.plugins.pypi._stream import read_project_info
+from how_much_work.plugins.pypi._types import JsonProjectInfo
+from how_much_work.plugins.pypi.cache import ProjectCache
+from how_much_work.plugins.pypi.environment import TargetEnvironment
+from how_much_work.plugins.pypi.index import RequirementIndex
+from how_much_work.plugins.pypi.options import ParsePool, plugin_options
+from how_much_work.plugins.pypi.parsing import parse_cache
 
 # Acceptable project name separator regex.
 _name_separator_re = re.compile(r"[-_.]+")
 
+
+@dataclasses.dataclass
+class _Project:
+    #: Project information.
+    info: JsonProjectInfo
+
+    #: Entity tag of the project information.
+    etag: str | None = None
+
+    #: Requirement index built together with the project information.
+    parsed_index: RequirementIndex | None = None
+
+    #: Time (seconds since the Epoch) of the last successful validation.
+    fetched: float = dataclasses.field(default_factory=time.time)
+
+    def is_fresh(self, ttl: float) -> bool:
+        """
+        Check whether the project information can be used without
+        revalidation.
+
+        :param ttl: maximum age in seconds
+        """
+
+        return time.time() - self.fetched < ttl
+
+    @functools.cached_property
+    def index(self) -> RequirementIndex:
+        """
+        Requirement index, built on first access if it wasn't parsed yet.
+        """
+
+        if self.parsed_index is not None:
+            return self.parsed_index
+        return RequirementIndex.from_requirements(self.info.requires_dist or ())
+
+
 # Static variable, modifications are shared between all instances.
 # Dictionary is LRU so it doesn't grow to infinite size.
-_projects: "LRU[str, JsonProjectInfo]" = LRU(100)
+_projects: "LRU[str, _Project]" = LRU(100)
 
 # Another static variable, used to track if the same project was
 # requested simultaneously.
 _in_processing: dict[str, asyncio.Event] = {}
 
+# Persistent cache, opened on first use if enabled.
+_disk_cache: ProjectCache | None = None
+
+# Pool parsing project information, created on first use if enabled.
+_executor: Executor | None = None
+
+# Target environment, rebuilt on changes.
+_target_env = TargetEnvironment({})
+
+
+def _get_target_env() -> TargetEnvironment:
+    global _target_env
+
+    if _target_env.values != plugin_options.target_env:
+        _target_env = TargetEnvironment(plugin_options.target_env)
+    return _target_env
+
+
+def _get_disk_cache() -> ProjectCache | None:
+    global _disk_cache
+
+    if _disk_cache is None and plugin_options.cache:
+        _disk_cache = ProjectCache(plugin_options.cache_path,
+                                   max_size=plugin_options.cache_size)
+    return _disk_cache
+
+
+def _get_executor() -> Executor | None:
+    global _executor
+
+    if _executor is None:
+        match plugin_options.parse_pool:
+            case ParsePool.THREAD:
+                _executor = ThreadPoolExecutor(plugin_options.parse_workers,
+                                               thread_name_prefix="pypi-parse")
+            case ParsePool.PROCESS:
+                # Forking a process with running threads is unsafe.
+                _executor = ProcessPoolExecutor(plugin_options.parse_workers,
+                                                mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+async def _parse_project_info(raw: bytes) -> tuple[JsonProjectInfo, RequirementIndex | None]:
+    with metrics.timer("pypi_parse_seconds"):
+        if (executor := _get_executor()) is None:
+            return parse_project_info(raw)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, parse_project_info, raw)
+
+
+async def _request_project_info(
+    url: str, headers: Mapping[str, str], *, session: aiohttp.ClientSession
+) -> tuple[Mapping[str, str], tuple[JsonProjectInfo, RequirementIndex | None] | None]:
+    # Returns response headers and parsed project information, if modified.
+    async with session.get(url, headers=headers, raise_for_status=True) as response:
+        if response.status == 304:
+            return response.headers, None
+        # Releases take most of the document and are not needed.
+        return response.headers, await _parse_project_info(
+            await read_project_info(response)
+        )
+
+
+async def _fetch_project_info(pkg_name: str, key: str, *,
+                              session: aiohttp.ClientSession,
+                              etag: str | None = None) -> _Project | None:
+
+    headers: dict[str, str] = {}
+    disk_cache = _get_disk_cache()
+    entry = disk_cache.get(key) if disk_cache is not None else None
+    if entry is not None and etag in (None, entry.etag):
+        if entry.is_fresh(plugin_options.cache_ttl):
+            metrics.inc("cache_requests_total", cache="pypi-disk", result="hit")
+            return _Project(entry.info, entry.etag, fetched=entry.fetched)
+        headers.update(entry.conditional_headers())
+    else:
+        if disk_cache is not None:
+            metrics.inc("cache_requests_total", cache="pypi-disk", result="miss")
+        entry = None
+        if etag is not None:
+            headers["If-None-Match"] = etag
+
+    url = plugin_options.index_url.rstrip("/") + f"/pypi/{pkg_name}/json"
+    try:
+        response_headers, parsed = await retrier.call(
+            functools.partial(_request_project_info, url, headers, session=session),
+            host=urllib.parse.urlsplit(url).hostname or ""
+        )
+    except ValueError as err:
+        # JSON decode error
+        pkg = Package(name=pkg_name, repo_name=REPO_NAME)
+        raise PackageValidationError(pkg) from err
+
+    if parsed is None:
+        if disk_cache is not None and entry is not None:
+            # Not modified, revalidated successfully.
+            metrics.inc("cache_requests_total", cache="pypi-disk",
+                        result="revalidated")
+            disk_cache.touch(key)
+            return _Project(entry.info, entry.etag)
+        # Caller-provided entity tag is still current.
+        return None
+
+    if entry is not None:
+        metrics.inc("cache_requests_total", cache="pypi-disk", result="stale")
+
+    result, index = parsed
+    new_etag = response_headers.get("ETag")
+    if disk_cache is not None:
+        disk_cache.put(key, result, etag=new_etag,
+                       last_modified=response_headers.get("Last-Modified"))
+    return _Project(result, new_etag, index)
 
-async def _get_project_info(pkg_name: str, *,
-                            session: aiohttp.ClientSession) -> JsonProjectInfo:
+
+def _project_key(pkg_name: str) -> str:
+    # Perform package name "normalization" as defined in PEP 503.
+    return _name_separator_re.sub("-", pkg_name).lower()
+
+
+async def _get_project(pkg_name: str, *,
+                       session: aiohttp.ClientSession) -> _Project:
 
     def _finish_processing() -> None:
         # Notify waiting coroutines that they can grab project info from cache.
@@ -54,33 +212,43 @@ async def _get_project_info(pkg_name: str, *,
             _in_processing[key].set()
             del _in_processing[key]
 
-    # Perform package name "normalization" as defined in PEP 503.
-    key = _name_separator_re.sub("-", pkg_name).lower()
+    key = _project_key(pkg_name)
 
+    waited = False
     if key not in _in_processing:
         # Start a new "processing session" for this package.
         _in_processing[key] = asyncio.Event()
     else:
         # Wait for the "processing session" to finish, then grab from the cache.
         await _in_processing[key].wait()
+        waited = True
 
-    if key in _projects:
+    # Entries are revalidated once expired, so long-running processes see
+    # updates. Entries that were just fetched are used as is.
+    project = _projects.get(key)
+    if project is not None and (waited or project.is_fresh(plugin_options.cache_ttl)):
+        metrics.inc("cache_requests_total", cache="pypi-memory", result="hit")
         _finish_processing()
-        return _projects[key]
-
-    url = PYPI_URL + f"/pypi/{pkg_name}/json"
-    async with session.get(url, raise_for_status=True) as response:
-        raw_data = await response.read()
+        return project
 
+    metrics.inc("cache_requests_total", cache="pypi-memory",
+                result="miss" if project is None else "stale")
     try:
-        result = JsonProject.model_validate_json(raw_data).info
-    except ValueError as err:
-        # JSON decode error
-        pkg = Package(name=pkg_name, repo_name=REPO_NAME)
-        raise PackageValidationError(pkg) from err
+        result = await _fetch_project_info(
+            pkg_name, key, session=session,
+            etag=project.etag if project is not None else None
+        )
     finally:
         _finish_processing()
 
+    if result is None:
+        # Conditional requests are not made without a known entity tag.
+        if project is None:
+            raise PackageValidationError(Package(name=pkg_name, repo_name=REPO_NAME))
+        # Not modified.
+        project.fetched = time.time()
+        result = project
+
     _projects[key] = result
     return result
 
@@ -97,8 +265,9 @@ async def normalize(pkg: Package, *,
     - Canonical project name is used instead of :pep:`503`: "normalized"
       project name.
 
-    - Logically same conditions can be recognized as different, potentially
-      resulting in duplicate nodes.
+    - Conditions are canonicalized, so logically same conditions written
+      differently result in the same node. Equivalence of conditions is not
+      proven in general though, only common rewritings are recognized.
 
     :param pkg: PyPI package
     :param session: :external+aiohttp:py:mod:`aiohttp` client session
@@ -109,7 +278,7 @@ async def normalize(pkg: Package, *,
     """
 
     try:
-        project = await _get_project_info(pkg.name, session=session)
+        project = (await _get_project(pkg.name, session=session)).info
     except (aiohttp.ClientResponseError, asyncio.TimeoutError) as err:
         # Usually "Project Not Found"
         raise PackageValidationError(pkg) from err
@@ -117,7 +286,7 @@ async def normalize(pkg: Package, *,
     if (condition := pkg.condition) is not None:
         try:
             # do a roundtrip
-            condition = str(parse_marker(condition))
+            condition = parse_cache.canonical_marker(condition)
         except Exception as err:
             raise PackageValidationError(pkg) from err
 
@@ -152,6 +321,9 @@ async def get_children(pkg: Package, *,
 
     - Build dependencies are *not* returned by PyPI JSON API.
 
+    - Children with conditions that can never match the configured target
+      environment are not returned.
+
     :param pkg: PyPI package
     :param session: :external+aiohttp:py:mod:`aiohttp` client session
 
@@ -160,35 +332,48 @@ async def get_children(pkg: Package, *,
     :returns: package's direct children
     """
 
-    def _dependency_with_extras(req: Requirement) -> Iterator[Package]:
-        yield Package(name=req.name, repo_name=REPO_NAME)
-        for selected_feature in req.extras:
-            marker = SingleMarker("extra", selected_feature)
-            yield Package(name=req.name, repo_name=REPO_NAME,
-                          condition=str(marker))
-
     try:
-        project = await _get_project_info(pkg.name, session=session)
+        project = await _get_project(pkg.name, session=session)
     except (aiohttp.ClientResponseError, asyncio.TimeoutError) as err:
         raise PackageDependenciesFetchError(pkg) from err
-    if not project.requires_dist:
-        # No dependencies defined.
-        return
-
-    if pkg.condition:
-        # Select only dependencies pulled by this condition.
-        pkg_marker = parse_marker(pkg.condition)
-        for req in map(Requirement, project.requires_dist):
-            if req.marker == pkg_marker:
-                for child_pkg in _dependency_with_extras(req):
-                    yield child_pkg
-    else:
-        # Select all variants of the package with dependency-defining
-        # conditions as well as unconditional dependencies.
-        for req in map(Requirement, project.requires_dist):
-            if req.marker:
-                yield Package(name=pkg.name, repo_name=REPO_NAME,
-                              condition=str(req.marker))
-            else:
-                for child_pkg in _dependency_with_extras(req):
-                    yield child_pkg
+
+    target_env = _get_target_env()
+    for child_pkg in project.index.children(pkg):
+        if child_pkg.condition is None or target_env.may_match(child_pkg.condition):
+            yield child_pkg
+
+
+async def get_validator(pkg: Package, previous: str | None, *,
+                        session: aiohttp.ClientSession) -> str | None:
+    """
+    Get entity tag of the PyPI project information.
+
+    If the previous entity tag is given, a conditional request is made, so
+    unchanged project information is not downloaded again.
+
+    :param pkg: PyPI package
+    :param previous: previously seen entity tag
+    :param session: :external+aiohttp:py:mod:`aiohttp` client session
+
+    :raises PackageDependenciesFetchError: on network errors
+
+    :returns: entity tag or ``None`` if it's not provided by the server
+    """
+
+    key = _project_key(pkg.name)
+    try:
+        if previous is None or key in _projects or key in _in_processing:
+            return (await _get_project(pkg.name, session=session)).etag
+
+        project = await _fetch_project_info(pkg.name, key, session=session,
+                                            etag=previous)
+    except (aiohttp.ClientResponseError, asyncio.TimeoutError,
+            PackageValidationError) as err:
+        raise PackageDependenciesFetchError(pkg) from err
+
+    if project is None:
+        # Not modified.
+        return previous
+
+    _projects[key] = project
+    return project.etag
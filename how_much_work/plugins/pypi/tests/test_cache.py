@@ -0,0 +1,39 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty
+
+from pathlib import Path
+
+from how_much_work.plugins.pypi._types import JsonProjectInfo
+from how_much_work.plugins.pypi.cache import ProjectCache
+
+
+def test_cache_revalidation(tmp_path: Path):
+    cache = ProjectCache(tmp_path / "cache.sqlite3")
+    info = JsonProjectInfo(name="Example", requires_dist=("foo",))
+
+    assert cache.get("example") is None
+    cache.put("example", info, etag='"abc"')
+    cache.close()
+
+    cache = ProjectCache(tmp_path / "cache.sqlite3")
+    entry = cache.get("example")
+    assert entry is not None
+    assert entry.info == info
+    assert entry.is_fresh(60)
+    assert not entry.is_fresh(0)
+    assert entry.conditional_headers() == {"If-None-Match": '"abc"'}
+
+
+def test_cache_eviction(tmp_path: Path):
+    cache = ProjectCache(tmp_path / "cache.sqlite3", max_size=2)
+    for name in ("a", "b"):
+        cache.put(name, JsonProjectInfo(name=name))
+
+    cache.get("a")
+    cache.put("c", JsonProjectInfo(name="c"))
+
+    assert len(cache) == 2
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
@@ -1,16 +1,26 @@
 # SPDX-License-Identifier: WTFPL
-# SPDX-FileCopyrightText: 2024-2025 Anna <cyber@sysrq.in>
+# SPDX-FileCopyrightText: 2024-2026 Anna <cyber@sysrq.in>
 # No warranty
 
 import asyncio
+from types import SimpleNamespace
+from typing import Any
 
 import aiohttp
 import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
 
+from how_much_work.core.metrics import metrics
 from how_much_work.core.tests.utils import to_list
 from how_much_work.core.types import Package
 
+from how_much_work.plugins.pypi._stream import read_project_info
 from how_much_work.plugins.pypi.filters import exclude_python_extras
+from how_much_work.plugins.pypi.environment import parse_target_env
+from how_much_work.plugins.pypi.index import RequirementIndex
+from how_much_work.plugins.pypi.options import plugin_options
+from how_much_work.plugins.pypi.parsing import ParseCache
 from how_much_work.plugins.pypi.registry import normalize, get_children
 
 
@@ -31,6 +41,48 @@ def test_filter_extras():
     assert not pkg_filter(pkg.model_copy(update={"condition": "extra=='all'"}))
 
 
+def requirement_lookups() -> tuple[float, float]:
+    counters = {
+        counter["labels"]["result"]: counter["value"]
+        for counter in metrics.to_json()["counters"]
+        if counter["labels"].get("cache") == "pypi-requirements"
+    }
+    return counters.get("hit", 0), counters.get("miss", 0)
+
+
+def test_parse_cache():
+    cache = ParseCache()
+
+    condition = cache.canonical_marker("extra=='socks'")
+    assert condition == 'extra == "socks"'
+    assert cache.canonical_marker('extra == "socks"') is condition
+
+    condition = cache.canonical_marker("(python_version<'3.8') and extra=='socks'")
+    assert cache.canonical_marker('extra == "socks" and python_version < "3.8"') == condition
+
+    before = requirement_lookups()
+    assert cache.requirement("PySocks>=1.5.6") is cache.requirement("PySocks>=1.5.6")
+    assert requirement_lookups() == (before[0] + 1, before[1] + 1)
+
+
+def test_requirement_index():
+    index = RequirementIndex.from_requirements([
+        "a>=1", "b[x]; extra == 'test'", "c; extra=='test'",
+    ])
+    pkg = Package(name="example", repo_name="pypi")
+    pkg_test = pkg.model_copy(update={"condition": 'extra == "test"'})
+
+    assert list(index.children(pkg)) == [
+        Package(name="a", repo_name="pypi"),
+        pkg_test,
+    ]
+    assert list(index.children(pkg_test)) == [
+        Package(name="b", repo_name="pypi"),
+        Package(name="b", repo_name="pypi", condition='extra == "x"'),
+        Package(name="c", repo_name="pypi"),
+    ]
+
+
 @pytest.mark.vcr
 @pytest.mark.asyncio
 async def test_normalize(session: aiohttp.ClientSession):
@@ -59,3 +111,67 @@ async def test_get_children(session: aiohttp.ClientSession):
 
     only_for_socks = set(ch_socks) - set(ch)
     assert Package(name="PySocks", repo_name="pypi") in only_for_socks
+
+
+@pytest.mark.asyncio
+@pytest.mark.block_network(allowed_hosts=["127.0.0.1"])
+async def test_read_project_info_connections():
+    async def project_json(request: web.Request) -> web.Response:
+        size = int(request.match_info["size"])
+        return web.json_response({"info": {"name": "example"},
+                                  "releases": {"1.0": "x" * size}})
+
+    connections = 0
+
+    async def on_connection_create_end(session: aiohttp.ClientSession,
+                                       ctx: SimpleNamespace, params: Any) -> None:
+        nonlocal connections
+        connections += 1
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+
+    app = web.Application()
+    app.router.add_get("/{size}", project_json)
+    async with (
+        TestServer(app) as server,
+        aiohttp.ClientSession(trace_configs=[trace_config]) as session,
+    ):
+        # Small responses are read to the end to reuse the connection, the
+        # large one is abandoned.
+        for size, expected in [(100_000, 1), (100_000, 1), (10_000_000, 1), (0, 2)]:
+            async with session.get(server.make_url(f"/{size}")) as response:
+                assert await read_project_info(response) == b'{"name": "example"}'
+            assert connections == expected
+
+
+@pytest.mark.asyncio
+@pytest.mark.block_network(allowed_hosts=["127.0.0.1"])
+async def test_get_children_target_env(session: aiohttp.ClientSession,
+                                       monkeypatch: pytest.MonkeyPatch):
+    async def project_json(request: web.Request) -> web.Response:
+        return web.json_response({"info": {"name": "target-env-example", "requires_dist": [
+            "pywin32; sys_platform == 'win32'",
+            "uvloop; sys_platform == 'linux'",
+            "pytest; extra == 'test'",
+            "colorama; sys_platform == 'win32' and extra == 'test'",
+        ]}})
+
+    app = web.Application()
+    app.router.add_get("/pypi/{name}/json", project_json)
+    async with TestServer(app) as server:
+        monkeypatch.setattr(plugin_options, "index_url", str(server.make_url("/")))
+        monkeypatch.setattr(plugin_options, "target_env", parse_target_env("linux"))
+
+        pkg = Package(name="target-env-example", repo_name="pypi")
+        pkg_test = pkg.model_copy(update={"condition": 'extra == "test"'})
+        children = await to_list(get_children(pkg, session=session))
+        children_test = await to_list(get_children(pkg_test, session=session))
+
+    # Variants that can't match the target environment are dropped, extras
+    # are kept.
+    assert children == [
+        pkg.model_copy(update={"condition": 'sys_platform == "linux"'}),
+        pkg_test,
+    ]
+    assert children_test == [Package(name="pytest", repo_name="pypi")]
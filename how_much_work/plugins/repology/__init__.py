@@ -2,56 +2,78 @@
 # SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
 # No warranty
 
-from collections.abc import Collection, Sequence
-from typing import Awaitable, Callable
-import warnings
+from pathlib import Path
+from typing import TYPE_CHECKING
 
-import aiohttp
-import repology_client
-from pydantic import TypeAdapter, ValidationError
-from repology_client.exceptions.resolve import ProjectNotFound
+import click
 
-from how_much_work.core.options import MainOptions
 from how_much_work.core.plugin_api import hook_impl
-from how_much_work.core.types import Package
 
-from how_much_work.plugins.repology.types import DistromapConfig
+if TYPE_CHECKING:
+    # This module is imported on startup, the rest of the plugin is only
+    # imported when hooks are called.
+    from how_much_work.core.options import MainOptions
 
 
-def make_distromap_func(
-    from_repo: str, target_repos: Sequence[str]
-) -> Callable[..., Awaitable[Collection[Package]]]:
+@hook_impl
+def setup_distromap_plugin(options: "MainOptions", config: object) -> None:
+    from how_much_work.plugins.repology.distromap import setup
+    setup(options, config)
 
-    async def callback(
-        pkg: Package, *, aiohttp_session: aiohttp.ClientSession
-    ) -> Collection[Package]:
-        try:
-            pkg_list = await repology_client.resolve_package(
-                from_repo, pkg.name, session=aiohttp_session
-            )
-        except ProjectNotFound:
-            return {}
 
-        return {Package(name=other.visiblename, repo_name=other.repo)
-                for other in pkg_list
-                if other.repo in target_repos}
+@click.group()
+def repology() -> None:
+    """
+    Manage Repology package mapping.
+    """
 
-    return callback
 
+@click.option("--from-file", metavar="FILE",
+              type=click.Path(exists=True, dir_okay=False, path_type=Path),
+              help="Load a local dump of the projects listing (JSON or JSON "
+                   "Lines) instead of downloading it.")
+@repology.command()
+def sync(from_file: Path | None) -> None:
+    """
+    Update the offline Repology index for the selected repositories.
 
-@hook_impl
-def setup_distromap_plugin(options: MainOptions, config: object) -> None:
+    Only projects present in the source repository are downloaded. The
+    update is resumed if it was interrupted.
+    """
+    import asyncio
+
+    from how_much_work.core.utils import aiohttp_session
+    from how_much_work.plugins.repology import distromap
+    from how_much_work.plugins.repology.index import RepologyIndex
+    from how_much_work.plugins.repology.sync import load_dump, sync_index
+
+    if (selected := distromap.selected) is None:
+        raise click.UsageError("No Repology mapping is configured for "
+                               "the selected repositories.")
+
+    repos = {selected.from_repo, *selected.target_repos}
+    index = RepologyIndex(distromap.index_path())
     try:
-        config = TypeAdapter(DistromapConfig).validate_python(config)
-    except ValidationError:
-        warnings.warn("Parsing Repology configuration failed")
-        return
-
-    if (plugin_config := config.get("repology")) is not None:
-        repo_config = plugin_config["from_repo"].get(options.from_repo)
-        if repo_config is not None:
-            target_repos = repo_config["to_repo"].get(options.to_repo, [])
-            if len(target_repos) != 0:
-                options.add_pkg_distromap(
-                    make_distromap_func(repo_config["repo_name"], target_repos)
-                )
+        if from_file is not None:
+            with from_file.open("rb") as file:
+                try:
+                    count = load_dump(index, file, repos)
+                except ValueError as err:
+                    raise click.ClickException(f"Invalid dump: {err}")
+        else:
+            async def run() -> int:
+                async with aiohttp_session() as session:
+                    return await sync_index(
+                        index, selected.from_repo, repos, session=session,
+                        limiter=distromap.make_limiter(selected.config)
+                    )
+            count = asyncio.run(run())
+    finally:
+        index.close()
+
+    click.echo(f"Indexed {count} projects", err=True)
+
+
+@hook_impl
+def setup_distromap_plugin_commands(click_group: click.Group) -> None:
+    click_group.add_command(repology)
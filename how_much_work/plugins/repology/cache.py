@@ -0,0 +1,124 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty
+
+"""
+Persistent on-disk cache for Repology package lookups.
+"""
+
+import dataclasses
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS resolved (
+    repo TEXT NOT NULL,
+    name TEXT NOT NULL,
+    packages TEXT,
+    fetched REAL NOT NULL,
+    PRIMARY KEY (repo, name)
+)
+"""
+
+#: Package as a pair of repository and visible name.
+RepoPackage = tuple[str, str]
+
+
+@dataclasses.dataclass(frozen=True)
+class ResolveEntry:
+    """
+    Cached lookup result.
+    """
+
+    #: Packages of the same project in all repositories, ``None`` if the
+    #: project was not found.
+    packages: frozenset[RepoPackage] | None
+
+    #: Time (seconds since the Epoch) of the lookup.
+    fetched: float
+
+    def is_fresh(self, ttl: float, negative_ttl: float) -> bool:
+        """
+        Check whether the entry can be used.
+
+        :param ttl: maximum age in seconds of found entries
+        :param negative_ttl: maximum age in seconds of not found entries
+        """
+
+        max_age = ttl if self.packages is not None else negative_ttl
+        return time.time() - self.fetched < max_age
+
+
+class ResolveCache:
+    """
+    SQLite-backed cache of Repology package lookups.
+    """
+
+    def __init__(self, path: Path):
+        """
+        :param path: database file path, parent directories are created
+            automatically
+        """
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(_SCHEMA)
+
+    def get(self, repo: str, name: str) -> ResolveEntry | None:
+        """
+        Look up a package.
+
+        :param repo: source repository name on Repology
+        :param name: package name in the source repository
+
+        :returns: cache entry or ``None``
+        """
+
+        row = self._db.execute(
+            "SELECT packages, fetched FROM resolved WHERE repo = ? AND name = ?",
+            (repo, name)
+        ).fetchone()
+        if row is None:
+            return None
+
+        packages, fetched = row
+        if packages is None:
+            return ResolveEntry(None, fetched)
+
+        try:
+            return ResolveEntry(
+                frozenset((other_repo, other_name)
+                          for other_repo, other_name in json.loads(packages)),
+                fetched
+            )
+        except ValueError:
+            # Corrupted data, treat as a miss.
+            return None
+
+    def put(self, repo: str, name: str,
+            packages: frozenset[RepoPackage] | None) -> None:
+        """
+        Store a lookup result.
+
+        :param repo: source repository name on Repology
+        :param name: package name in the source repository
+        :param packages: packages of the same project, ``None`` if the project
+            was not found
+        """
+
+        data = json.dumps(sorted(packages)) if packages is not None else None
+        self._db.execute(
+            "INSERT OR REPLACE INTO resolved VALUES (?, ?, ?, ?)",
+            (repo, name, data, time.time())
+        )
+
+    def close(self) -> None:
+        """
+        Close the database connection.
+        """
+
+        self._db.close()
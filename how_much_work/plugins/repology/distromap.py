@@ -0,0 +1,120 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty
+
+"""
+Repology distromap setup.
+"""
+
+from collections.abc import Collection, Sequence
+from pathlib import Path
+from typing import Awaitable, Callable, NamedTuple
+import warnings
+
+import aiohttp
+from pydantic import TypeAdapter, ValidationError
+
+from how_much_work.core.options import MainOptions
+from how_much_work.core.types import Package
+from how_much_work.core.utils import get_cache_dir
+
+from how_much_work.plugins.repology.cache import ResolveCache
+from how_much_work.plugins.repology.index import RepologyIndex
+from how_much_work.plugins.repology.ratelimit import TokenBucket
+from how_much_work.plugins.repology.resolver import Resolver
+from how_much_work.plugins.repology.types import (
+    DistromapConfig,
+    RepologyDistromapConfig,
+)
+
+
+class SelectedRepos(NamedTuple):
+    """
+    Repositories selected on the command line, as named on Repology.
+    """
+
+    #: Plugin configuration.
+    config: RepologyDistromapConfig
+
+    #: Source repository name.
+    from_repo: str
+
+    #: Target repository names.
+    target_repos: list[str]
+
+
+#: Repositories of the current run, set by :py:func:`setup`.
+selected: SelectedRepos | None = None
+
+
+def index_path() -> Path:
+    """
+    Get the offline index location inside the cache directory.
+
+    :returns: offline index file path
+    """
+
+    return get_cache_dir() / "repology-index.sqlite3"
+
+
+def make_limiter(config: RepologyDistromapConfig) -> TokenBucket:
+    # Repology asks API users not to make more than one request per second.
+    return TokenBucket(config.get("rate_limit", 1.0), config.get("burst", 1))
+
+
+def make_resolver(config: RepologyDistromapConfig) -> Resolver:
+    if config.get("index", False):
+        return Resolver(index=RepologyIndex(index_path()))
+
+    cache = None
+    if config.get("cache", True):
+        cache = ResolveCache(get_cache_dir() / "repology.sqlite3")
+
+    return Resolver(cache=cache, limiter=make_limiter(config),
+                    ttl=config.get("cache_ttl", 86400),
+                    negative_ttl=config.get("negative_cache_ttl", 3600))
+
+
+def make_distromap_func(
+    resolver: Resolver, from_repo: str, target_repos: Sequence[str]
+) -> Callable[..., Awaitable[Collection[Package]]]:
+
+    async def callback(
+        pkg: Package, *, aiohttp_session: aiohttp.ClientSession
+    ) -> Collection[Package]:
+        pkg_list = await resolver.resolve(from_repo, pkg.name,
+                                          session=aiohttp_session)
+        return {Package(name=name, repo_name=repo)
+                for repo, name in pkg_list
+                if repo in target_repos}
+
+    return callback
+
+
+def setup(options: MainOptions, config: object) -> None:
+    """
+    Add a distromap function for the selected repositories, if configured.
+
+    :param options: main application options
+    :param config: parsed :file:`distromap.toml` configuration file
+    """
+
+    global selected
+
+    try:
+        config = TypeAdapter(DistromapConfig).validate_python(config)
+    except ValidationError:
+        warnings.warn("Parsing Repology configuration failed")
+        return
+
+    if (plugin_config := config.get("repology")) is not None:
+        repo_config = plugin_config["from_repo"].get(options.from_repo)
+        if repo_config is not None:
+            target_repos = repo_config["to_repo"].get(options.to_repo, [])
+            if len(target_repos) != 0:
+                selected = SelectedRepos(plugin_config, repo_config["repo_name"],
+                                         target_repos)
+                options.add_pkg_distromap(
+                    make_distromap_func(make_resolver(plugin_config),
+                                        selected.from_repo, target_repos)
+                )
@@ -0,0 +1,155 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty
+
+"""
+Offline index of Repology projects.
+"""
+
+import contextlib
+import sqlite3
+from collections.abc import Iterable, Iterator, Mapping
+from pathlib import Path
+
+from how_much_work.plugins.repology.cache import RepoPackage
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS packages (
+    project TEXT NOT NULL,
+    repo TEXT NOT NULL,
+    srcname TEXT,
+    visiblename TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS packages_srcname ON packages (repo, srcname);
+CREATE INDEX IF NOT EXISTS packages_project ON packages (project);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Size of the memory-mapped part of the database file.
+_MMAP_SIZE = 1 << 30
+
+#: Package row as a tuple of repository, source package name and visible
+#: name.
+IndexedPackage = tuple[str, str | None, str]
+
+
+class RepologyIndex:
+    """
+    SQLite table mapping packages to packages of the same project in other
+    repositories.
+
+    The database file is memory-mapped, so lookups don't copy pages into the
+    process. It's updated page by page, and each page replaces the projects
+    in its name range, so an interrupted update leaves a usable index.
+    """
+
+    def __init__(self, path: Path):
+        """
+        :param path: database file path, parent directories are created
+            automatically
+        """
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(f"PRAGMA mmap_size={_MMAP_SIZE}")
+        self._db.executescript(_SCHEMA)
+
+    def __len__(self) -> int:
+        (result,) = self._db.execute(
+            "SELECT COUNT(DISTINCT project) FROM packages"
+        ).fetchone()
+        return result
+
+    def lookup(self, repo: str, name: str) -> frozenset[RepoPackage]:
+        """
+        Find packages of the same project in all indexed repositories.
+
+        :param repo: source repository name on Repology
+        :param name: source package name in the repository
+
+        :returns: pairs of repository and package name, empty if the package
+            is not indexed
+        """
+
+        rows = self._db.execute(
+            "SELECT DISTINCT other.repo, other.visiblename "
+            "FROM packages AS this JOIN packages AS other "
+            "ON this.project = other.project "
+            "WHERE this.repo = ? AND this.srcname = ?",
+            (repo, name)
+        )
+        return frozenset(rows)
+
+    def replace_projects(self, projects: Mapping[str, Iterable[IndexedPackage]], *,
+                         first: str = "", last: str | None = None) -> None:
+        """
+        Atomically replace all projects in a name range.
+
+        :param projects: packages by project name
+        :param first: name of the first project in the range
+        :param last: name of the last project in the range, ``None`` for no
+            upper bound
+        """
+
+        with self._transaction():
+            if last is None:
+                self._db.execute("DELETE FROM packages WHERE project >= ?",
+                                 (first,))
+            else:
+                self._db.execute(
+                    "DELETE FROM packages WHERE project BETWEEN ? AND ?",
+                    (first, last)
+                )
+            self._db.executemany(
+                "INSERT INTO packages VALUES (?, ?, ?, ?)",
+                ((project, *pkg)
+                 for project, packages in projects.items()
+                 for pkg in packages)
+            )
+
+    def get_state(self, key: str) -> str | None:
+        """
+        Get a value saved by the updater.
+
+        :param key: value name
+        """
+
+        row = self._db.execute("SELECT value FROM state WHERE key = ?",
+                               (key,)).fetchone()
+        return row[0] if row is not None else None
+
+    def set_state(self, key: str, value: str | None) -> None:
+        """
+        Save or delete a value used by the updater.
+
+        :param key: value name
+        :param value: new value, ``None`` to delete
+        """
+
+        if value is None:
+            self._db.execute("DELETE FROM state WHERE key = ?", (key,))
+        else:
+            self._db.execute("INSERT OR REPLACE INTO state VALUES (?, ?)",
+                             (key, value))
+
+    def close(self) -> None:
+        """
+        Close the database connection.
+        """
+
+        self._db.close()
+
+    @contextlib.contextmanager
+    def _transaction(self) -> Iterator[None]:
+        self._db.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
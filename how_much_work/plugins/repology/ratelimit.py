@@ -0,0 +1,49 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty
+
+"""
+Request rate limiting.
+"""
+
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter.
+
+    Tokens are added at a constant rate up to the bucket capacity, and each
+    request takes one token. Waiting requests are served in order.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        :param rate: number of tokens added per second
+        :param burst: bucket capacity
+        """
+
+        self._rate = rate
+        self._burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self._burst,
+                           self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """
+        Wait until a token is available and take it.
+        """
+
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+                self._refill()
+            self._tokens -= 1
@@ -0,0 +1,147 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty
+
+"""
+Cached and rate-limited Repology package lookups.
+"""
+
+import asyncio
+import time
+import urllib.parse
+from collections.abc import Set
+from typing import Any
+
+import aiohttp
+import repology_client
+from lru import LRU
+from repology_client.constants import TOOL_PROJECT_BY_URL
+from repology_client.exceptions.resolve import ProjectNotFound
+from repology_client.types import Package as RepologyPackage
+
+from how_much_work.core.metrics import metrics
+from how_much_work.core.retry import retrier
+
+from how_much_work.plugins.repology.cache import RepoPackage, ResolveCache, ResolveEntry
+from how_much_work.plugins.repology.index import RepologyIndex
+from how_much_work.plugins.repology.ratelimit import TokenBucket
+
+# Host resolve requests are made to.
+_host = urllib.parse.urlsplit(TOOL_PROJECT_BY_URL).hostname or ""
+
+
+class Resolver:
+    """
+    Package resolver sharing lookups between all distromap functions.
+
+    Results are cached in memory and, optionally, on disk, until they
+    expire. Concurrent lookups of the same package are coalesced into a
+    single request.
+
+    If an offline index is given, packages are looked up in it and no
+    requests are made at all.
+    """
+
+    def __init__(self, *, index: RepologyIndex | None = None,
+                 cache: ResolveCache | None = None,
+                 limiter: TokenBucket | None = None,
+                 ttl: float = 86400, negative_ttl: float = 3600,
+                 memory_size: int = 10_000):
+        """
+        :param index: offline index
+        :param cache: persistent cache
+        :param limiter: rate limiter for API requests
+        :param ttl: number of seconds found packages are cached
+        :param negative_ttl: number of seconds packages not found are cached
+        :param memory_size: maximum number of lookups cached in memory
+        """
+
+        self._index = index
+        self._cache = cache
+        self._limiter = limiter
+        self._ttl = ttl
+        self._negative_ttl = negative_ttl
+
+        # Dictionary is LRU so it doesn't grow to infinite size.
+        self._results: "LRU[tuple[str, str], ResolveEntry]" = LRU(memory_size)
+
+        # Lookups being made, waited for by one or more callers.
+        self._in_flight: dict[tuple[str, str],
+                              asyncio.Task[frozenset[RepoPackage]]] = {}
+
+    async def resolve(self, repo: str, name: str, *,
+                      session: aiohttp.ClientSession) -> frozenset[RepoPackage]:
+        """
+        Find packages of the same project in all repositories.
+
+        Lookups are not cancelled with callers, so other callers waiting for
+        the same package still get the result.
+
+        :param repo: source repository name on Repology
+        :param name: package name in the source repository
+        :param session: :external+aiohttp:py:mod:`aiohttp` client session
+
+        :raises aiohttp.ClientResponseError: on HTTP errors (except 404)
+
+        :returns: pairs of repository and package name, empty if the project
+            was not found
+        """
+
+        key = (repo, name)
+        entry = self._results.get(key)
+        if entry is not None and entry.is_fresh(self._ttl, self._negative_ttl):
+            metrics.inc("cache_requests_total", cache="repology-memory", result="hit")
+            return entry.packages or frozenset()
+
+        if (task := self._in_flight.get(key)) is not None:
+            metrics.inc("cache_requests_total", cache="repology-memory",
+                        result="coalesced")
+        else:
+            metrics.inc("cache_requests_total", cache="repology-memory",
+                        result="miss" if entry is None else "stale")
+            task = asyncio.ensure_future(self._resolve(repo, name, session=session))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda task: self._finish(key, task))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: tuple[str, str], task: asyncio.Task[Any]) -> None:
+        del self._in_flight[key]
+        # Callers might have been cancelled while the lookup was made.
+        if not task.cancelled():
+            task.exception()
+
+    async def _resolve(self, repo: str, name: str, *,
+                       session: aiohttp.ClientSession) -> frozenset[RepoPackage]:
+        entry = await self._lookup(repo, name, session=session)
+        self._results[repo, name] = entry
+        return entry.packages or frozenset()
+
+    async def _lookup(self, repo: str, name: str, *,
+                      session: aiohttp.ClientSession) -> ResolveEntry:
+        if self._index is not None:
+            return ResolveEntry(self._index.lookup(repo, name), time.time())
+
+        if self._cache is not None:
+            entry = self._cache.get(repo, name)
+            if entry is not None and entry.is_fresh(self._ttl, self._negative_ttl):
+                metrics.inc("cache_requests_total", cache="repology-disk", result="hit")
+                return entry
+            metrics.inc("cache_requests_total", cache="repology-disk", result="miss")
+
+        async def request() -> Set[RepologyPackage]:
+            if self._limiter is not None:
+                await self._limiter.acquire()
+            return await repology_client.resolve_package(repo, name, session=session)
+
+        packages: frozenset[RepoPackage] | None
+        try:
+            pkg_list = await retrier.call(request, host=_host)
+        except ProjectNotFound:
+            packages = None
+        else:
+            packages = frozenset((other.repo, other.visiblename)
+                                 for other in pkg_list)
+
+        if self._cache is not None:
+            self._cache.put(repo, name, packages)
+        return ResolveEntry(packages, time.time())
@@ -0,0 +1,125 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty
+
+"""
+Offline Repology index updates.
+"""
+
+import json
+import urllib.parse
+from collections.abc import Collection, Iterable, Mapping, Set
+from typing import IO, Any
+
+import aiohttp
+import repology_client
+from repology_client.constants import API_V1_URL, MAX_PROJECTS
+from repology_client.exceptions import EmptyResponse
+from repology_client.types import Package as RepologyPackage
+
+from how_much_work.core.retry import retrier
+
+from how_much_work.plugins.repology.index import IndexedPackage, RepologyIndex
+from how_much_work.plugins.repology.ratelimit import TokenBucket
+
+# State key of the last fully processed project of an unfinished update.
+_CHECKPOINT_KEY = "checkpoint"
+
+# Host API requests are made to.
+_host = urllib.parse.urlsplit(API_V1_URL).hostname or ""
+
+
+def _select_packages(
+    projects: Mapping[str, Iterable[RepologyPackage]], repos: Collection[str]
+) -> dict[str, list[IndexedPackage]]:
+    return {
+        project: [(pkg.repo, pkg.srcname, pkg.visiblename)
+                  for pkg in packages if pkg.repo in repos]
+        for project, packages in projects.items()
+    }
+
+
+async def sync_index(index: RepologyIndex, source_repo: str,
+                     repos: Collection[str], *,
+                     session: aiohttp.ClientSession,
+                     limiter: TokenBucket | None = None) -> int:
+    """
+    Update the index from the Repology projects listing.
+
+    Only projects present in the source repository are requested, and only
+    packages from the given repositories are stored. Interrupted updates are
+    resumed from the last stored page.
+
+    :param index: offline index
+    :param source_repo: source repository name on Repology
+    :param repos: repository names on Repology to store packages from
+    :param session: :external+aiohttp:py:mod:`aiohttp` client session
+    :param limiter: rate limiter for API requests
+
+    :raises aiohttp.ClientResponseError: on HTTP errors
+
+    :returns: number of processed projects
+    """
+
+    start = index.get_state(_CHECKPOINT_KEY) or ""
+    total = 0
+
+    async def request() -> Mapping[str, Set[RepologyPackage]]:
+        if limiter is not None:
+            await limiter.acquire()
+        return await repology_client.get_projects(
+            start, count=MAX_PROJECTS, session=session, inrepo=source_repo
+        )
+
+    while True:
+        try:
+            batch = await retrier.call(request, host=_host)
+        except EmptyResponse:
+            batch = {}
+
+        # Pages start with the last project of the previous page.
+        total += len(batch) - (start in batch)
+        if len(batch) < MAX_PROJECTS:
+            # Last page, remove everything after it.
+            index.replace_projects(_select_packages(batch, repos), first=start)
+            index.set_state(_CHECKPOINT_KEY, None)
+            return total
+
+        last = max(batch)
+        index.replace_projects(_select_packages(batch, repos),
+                               first=start, last=last)
+        index.set_state(_CHECKPOINT_KEY, last)
+        start = last
+
+
+def load_dump(index: RepologyIndex, file: IO[bytes],
+              repos: Collection[str]) -> int:
+    """
+    Replace the index contents with a local dump.
+
+    The dump is a JSON object or a sequence of JSON Lines objects mapping
+    project names to lists of packages, as returned by the Repology projects
+    listing.
+
+    :param index: offline index
+    :param file: dump file
+    :param repos: repository names on Repology to store packages from
+
+    :raises ValueError: on invalid dumps
+
+    :returns: number of loaded projects
+    """
+
+    projects: dict[str, list[RepologyPackage]] = {}
+    for line in file:
+        if not line.strip():
+            continue
+        data: dict[str, list[Any]] = json.loads(line)
+        for project, packages in data.items():
+            projects.setdefault(project, []).extend(
+                map(RepologyPackage.model_validate, packages)
+            )
+
+    index.replace_projects(_select_packages(projects, repos))
+    index.set_state(_CHECKPOINT_KEY, None)
+    return len(projects)
@@ -0,0 +1,78 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty
+
+import io
+import json
+from pathlib import Path
+
+import aiohttp
+import pytest
+import repology_client
+from repology_client.exceptions import EmptyResponse
+from repology_client.types import Package
+
+from how_much_work.plugins.repology.index import RepologyIndex
+from how_much_work.plugins.repology.resolver import Resolver
+from how_much_work.plugins.repology.sync import load_dump, sync_index
+
+
+def pkg(repo: str, srcname: str, visiblename: str) -> dict[str, str]:
+    return {"repo": repo, "srcname": srcname, "visiblename": visiblename,
+            "version": "1", "status": "newest"}
+
+
+@pytest.mark.asyncio
+async def test_load_dump(tmp_path: Path, session: aiohttp.ClientSession):
+    dump = "\n".join([
+        json.dumps({"python:foo": [pkg("pypi", "foo", "Foo"),
+                                   pkg("gentoo", "dev-python/foo", "dev-python/foo"),
+                                   pkg("arch", "python-foo", "python-foo")]}),
+        json.dumps({"python:bar": [pkg("pypi", "bar", "bar")]}),
+    ])
+
+    index = RepologyIndex(tmp_path / "index.sqlite3")
+    assert load_dump(index, io.BytesIO(dump.encode()), {"pypi", "gentoo"}) == 2
+    assert len(index) == 2
+
+    resolver = Resolver(index=index)
+    assert await resolver.resolve("pypi", "foo", session=session) == {
+        ("pypi", "Foo"), ("gentoo", "dev-python/foo"),
+    }
+    assert await resolver.resolve("pypi", "bar", session=session) == {
+        ("pypi", "bar"),
+    }
+    assert not await resolver.resolve("pypi", "baz", session=session)
+
+
+@pytest.mark.asyncio
+async def test_sync_index(monkeypatch: pytest.MonkeyPatch, tmp_path: Path,
+                          session: aiohttp.ClientSession):
+    projects = {f"p{i:03}": {Package.model_validate(pkg("pypi", f"p{i}", f"p{i}"))}
+                for i in range(250)}
+    fail = True
+
+    async def get_projects(start="", end="", count=200, **kwargs):
+        nonlocal fail
+        if start and fail:
+            fail = False
+            raise aiohttp.ClientError
+        names = sorted(name for name in projects if name >= start)[:count]
+        if not names:
+            raise EmptyResponse
+        return {name: projects[name] for name in names}
+
+    monkeypatch.setattr(repology_client, "get_projects", get_projects)
+
+    index = RepologyIndex(tmp_path / "index.sqlite3")
+    index.replace_projects({"zzz": [("pypi", "stale", "stale")]})
+
+    with pytest.raises(aiohttp.ClientError):
+        await sync_index(index, "pypi", {"pypi"}, session=session)
+    assert len(index) == 201
+
+    # Resumed from the last stored page.
+    assert await sync_index(index, "pypi", {"pypi"}, session=session) == 50
+    assert len(index) == 250
+    assert index.lookup("pypi", "p249") == {("pypi", "p249")}
+    assert not index.lookup("pypi", "stale")
@@ -0,0 +1,96 @@
+# SPDX-License-Identifier: WTFPL
+# SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
+# No warranty
+
+import asyncio
+from pathlib import Path
+
+import aiohttp
+import pytest
+import repology_client
+from repology_client.exceptions.resolve import ProjectNotFound
+from repology_client.types import Package, ResolvePackageType, _ResolvePkg
+
+from how_much_work.plugins.repology.cache import ResolveCache
+from how_much_work.plugins.repology.ratelimit import TokenBucket
+from how_much_work.plugins.repology.resolver import Resolver
+
+
+@pytest.fixture
+def calls(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    result: list[str] = []
+
+    async def resolve_package(repo, name, **kwargs):
+        result.append(name)
+        await asyncio.sleep(0.01)
+        if name == "missing":
+            raise ProjectNotFound(_ResolvePkg(
+                repo=repo, name=name, name_type=ResolvePackageType.SOURCE
+            ))
+        return {Package(repo="gentoo", visiblename=f"dev-python/{name}",
+                        version="1", status="newest")}
+
+    monkeypatch.setattr(repology_client, "resolve_package", resolve_package)
+    return result
+
+
+@pytest.mark.asyncio
+async def test_resolver_coalescing(calls: list[str],
+                                   session: aiohttp.ClientSession):
+    resolver = Resolver()
+    results = await asyncio.gather(
+        *(resolver.resolve("pypi", "foo", session=session) for _ in range(5))
+    )
+
+    assert calls == ["foo"]
+    assert all(result == {("gentoo", "dev-python/foo")} for result in results)
+
+
+@pytest.mark.asyncio
+async def test_resolver_cancelled_owner(calls: list[str],
+                                        session: aiohttp.ClientSession):
+    resolver = Resolver()
+    owner = asyncio.create_task(resolver.resolve("pypi", "foo", session=session))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(resolver.resolve("pypi", "foo", session=session))
+    await asyncio.sleep(0)
+
+    owner.cancel()
+    assert await waiter == {("gentoo", "dev-python/foo")}
+    assert owner.cancelled()
+    assert calls == ["foo"]
+
+
+@pytest.mark.asyncio
+async def test_resolver_cache(calls: list[str], session: aiohttp.ClientSession,
+                              tmp_path: Path):
+    for _ in range(2):
+        resolver = Resolver(cache=ResolveCache(tmp_path / "repology.sqlite3"))
+        assert await resolver.resolve("pypi", "foo", session=session)
+        assert not await resolver.resolve("pypi", "missing", session=session)
+    assert calls == ["foo", "missing"]
+
+    resolver = Resolver(cache=ResolveCache(tmp_path / "repology.sqlite3"),
+                        negative_ttl=0)
+    assert not await resolver.resolve("pypi", "missing", session=session)
+    assert calls == ["foo", "missing", "missing"]
+
+
+@pytest.mark.asyncio
+async def test_resolver_expiry(calls: list[str], session: aiohttp.ClientSession):
+    resolver = Resolver(ttl=0)
+    for _ in range(2):
+        assert await resolver.resolve("pypi", "foo", session=session)
+        assert not await resolver.resolve("pypi", "missing", session=session)
+    assert calls == ["foo", "missing", "foo"]
+
+
+@pytest.mark.asyncio
+async def test_token_bucket():
+    bucket = TokenBucket(rate=100, burst=2)
+    loop = asyncio.get_running_loop()
+
+    start = loop.time()
+    for _ in range(4):
+        await bucket.acquire()
+    assert loop.time() - start >= 0.015
@@ -2,7 +2,13 @@
 # SPDX-FileCopyrightText: 2026 Anna <cyber@sysrq.in>
 # No warranty
 
-from typing import TypedDict
+import sys
+
+if sys.version_info >= (3, 12):
+    from typing import NotRequired, TypedDict
+else:
+    # Pydantic requires TypedDict from typing_extensions on Python < 3.12.
+    from typing_extensions import NotRequired, TypedDict
 
 
 class SourceRepoConfig(TypedDict):
@@ -13,6 +19,25 @@ class SourceRepoConfig(TypedDict):
 class RepologyDistromapConfig(TypedDict):
     from_repo: dict[str, SourceRepoConfig]
 
+    #: Enable the persistent lookup cache.
+    cache: NotRequired[bool]
+
+    #: Number of seconds found packages are cached.
+    cache_ttl: NotRequired[float]
+
+    #: Number of seconds packages not found are cached.
+    negative_cache_ttl: NotRequired[float]
+
+    #: Maximum number of API requests per second.
+    rate_limit: NotRequired[float]
+
+    #: Maximum number of API requests made at once after a pause.
+    burst: NotRequired[int]
+
+    #: Resolve packages from the offline index only, without API requests.
+    #: The index is updated with the ``repology sync`` command.
+    index: NotRequired[bool]
+
 
 class DistromapConfig(TypedDict, total=False):
     repology: RepologyDistromapConfig